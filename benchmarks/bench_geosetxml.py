@@ -0,0 +1,96 @@
+"""Benchmark serial and parallel decoding in `geoutil.geosetxml.fromxml`.
+
+A synthetic geoset (circular polygons with many vertices, each with a few
+attributes) is written to a temporary geoset XML file and parsed once; the
+time spent in `fromxml` is then measured for several numbers of workers
+and both types of worker pool, and reported with the speedup relative to
+the serial decode. The decoded geoset is checked to be the same as the
+serial one.
+
+Usage::
+
+    python benchmarks/bench_geosetxml.py [--items N] [--vertices N]
+        [--workers N [N ...]] [--repeat N]
+
+"""
+from collections import OrderedDict
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import timeit
+
+from shapely import geometry
+
+from geoutil import _geoset, geosetxml
+
+
+def make_geoset(nitems, nvertices):
+    """Return a geoset of `nitems` items with one circular geo each."""
+    items = []
+    for i in range(nitems):
+        poly = geometry.Point(i % 100, i // 100).buffer(
+            0.4, resolution=max(1, nvertices // 4))
+        attrs = OrderedDict([('name', 'item{0:d}'.format(i)), ('index', i)])
+        items.append(_geoset.Item(_geoset.Geo(poly, attrs=attrs),
+                                  attrs=attrs))
+    return _geoset.Geoset(items, attrs=OrderedDict([('survey', 'bench')]))
+
+
+def same_geosets(geoset1, geoset2):
+    """Test if two geosets have the same items, attributes and geometries."""
+    if len(geoset1.items) != len(geoset2.items):
+        return False
+    for item1, item2 in zip(geoset1.items, geoset2.items):
+        if item1.attrs != item2.attrs or len(item1.geos) != len(item2.geos):
+            return False
+        for geo1, geo2 in zip(item1.geos, item2.geos):
+            if geo1.attrs != geo2.attrs or not geo1.geo.equals(geo2.geo):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--vertices', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    ncpu = multiprocessing.cpu_count()
+    workers_list = args.workers or sorted(set([2, 4, max(2, ncpu)]))
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'bench.xml')
+        geosetxml.write(make_geoset(args.items, args.vertices), path)
+        tree = geosetxml.etree.parse(path).getroot()
+        size = os.path.getsize(path) / 2.**20
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print('{0:d} items, {1:d} vertices per polygon, {2:.1f} MiB, '
+          '{3:d} CPUs'.format(args.items, args.vertices, size, ncpu))
+    reference = geosetxml.fromxml(tree)
+    serial = min(timeit.repeat(lambda: geosetxml.fromxml(tree),
+                               number=1, repeat=args.repeat))
+    print('{0:>8s} {1:>7s} {2:>9s} {3:>7s}'.format(
+        'pool', 'workers', 'time (s)', 'speedup'))
+    print('{0:>8s} {1:7d} {2:9.3f} {3:7.2f}'.format('serial', 1, serial, 1))
+    for pool in ['thread', 'process']:
+        for workers in workers_list:
+            out = geosetxml.fromxml(tree, workers=workers, pool=pool)
+            if not same_geosets(reference, out):
+                raise RuntimeError(
+                    'parallel decode ({0:s}, {1:d} workers) differs from '
+                    'the serial one'.format(pool, workers))
+            elapsed = min(timeit.repeat(
+                lambda: geosetxml.fromxml(tree, workers=workers, pool=pool),
+                number=1, repeat=args.repeat))
+            print('{0:>8s} {1:7d} {2:9.3f} {3:7.2f}'.format(
+                pool, workers, elapsed, serial / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark the cold-start time of ``import geoutil``.
+
+Each measurement runs in a fresh interpreter, so nothing is cached in
+`sys.modules`. The lazy import (``import geoutil`` alone, which defers the
+interface modules and astropy until they are used) is compared with an
+eager import of everything the package imported at start-up before the
+interface modules were loaded lazily (the interface modules themselves,
+plus `astropy.io.fits` and `astropy.wcs`).
+
+Usage::
+
+    python benchmarks/bench_import.py [--repeat N]
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY = 'import geoutil'
+EAGER = ('import geoutil\n'
+         'import geoutil.geosetxml, geoutil.ds9regfile, geoutil.polylistxml\n'
+         'import astropy.io.fits, astropy.wcs')
+
+# The statements are timed inside the child process, which excludes the
+# start-up time of the interpreter itself.
+_TIMER = ('import time\n'
+          't0 = time.perf_counter()\n'
+          '{0:s}\n'
+          'print(time.perf_counter() - t0)')
+
+
+def import_time(code):
+    """Return the time (s) needed to run the import statements `code` in a
+    fresh interpreter.
+
+    """
+    out = subprocess.check_output(
+        [sys.executable, '-W', 'ignore', '-c', _TIMER.format(code)],
+        cwd=ROOT)
+    return float(out.decode().split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Warm up the OS file cache
+    import_time(EAGER)
+    times = {}
+    for name, code in [('lazy', LAZY), ('eager', EAGER)]:
+        times[name] = min(import_time(code) for n in range(args.repeat))
+    print('{0:>6s} {1:>9s}'.format('import', 'time (s)'))
+    for name in ['lazy', 'eager']:
+        print('{0:>6s} {1:9.3f}'.format(name, times[name]))
+    print('speedup: {0:.1f}x'.format(times['eager'] / times['lazy']))
+
+
+if __name__ == '__main__':
+    main()
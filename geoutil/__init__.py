@@ -31,14 +31,25 @@ instances.
 Modules
 -------
 
-I/O interfacing with |Geoset| instances is handled by modules imported in
+I/O interfacing with |Geoset| instances is handled by modules available in
 `geoutil`, where each module reads and writes in a specific file format.
+The interface modules (and their dependencies, e.g., `astropy` and `lxml`)
+are only imported when first accessed, e.g., ``geoutil.geosetxml``, which
+keeps ``import geoutil`` fast.
 New interface modules can be written (modeled after `geoutil.geosetxml`) to
 support additional file formats. Having a dedicated interface module for
 each file format keep similar functions for different interfaces nicely
 organized in separate namespaces, e.g., `geosetxml.write` is distinct from
 `newinterfacemodule.write`.
 
+The format-independent functions |read| and |write| choose the interface
+module automatically, by sniffing the first bytes of a file when reading
+and by file extension when writing. New interface modules can make
+themselves available to |read| and |write| with |register_format|.
+
+Parsed files can be cached on disk so that repeated reads of the same file
+skip parsing; see |configure_cache|.
+
 ============= =============================================================
 `geosetxml`   Interface |Geoset| instances with files in geoset XML format.
 `ds9regfile`  Interface |Geoset| instances with files in DS9 region format.
@@ -46,30 +57,48 @@ organized in separate namespaces, e.g., `geosetxml.write` is distinct from
               (polylist XML is the precursor of the geoset XML format and
               is deprecated. It is retained for backwards compatibility
               with older projects.)
+`geosetbin`   Interface |Geoset| instances with files in native binary
+              geoset format (memory-mapped; for intermediate products).
+`geosetfits`  Interface |Geoset| instances with FITS files (binary table).
+`migrate`     Convert polylist XML files to geoset XML format (also a
+              command line tool, ``python -m geoutil.migrate``).
+`footprint`   Overlap index of the footprints of many images (item-by-image
+              membership of a |Geoset|).
 ============= =============================================================
 
 
 Classes
 -------
 
-======== ==========================================
-|Geo|    Container for a single geometry object.
-|Item|   Container for a group of |Geo| instances.
-|Geoset| Container for a group of |Item| instances.
-======== ==========================================
+========== ==========================================================
+|Geo|      Container for a single geometry object.
+|LazyGeo|  |Geo| whose geometry object is created on first access.
+|Item|     Container for a group of |Geo| instances.
+|Geoset|   Container for a group of |Item| instances.
+========== ==========================================================
 
 
 Functions
 ---------
 
-================ ========================================================
-|validate_poly|  Test if a polygon is valid and attempt to fix it if not.
-|poly_pix2world| Convert polygon vertices from pixel coordinates to world
-                 coordinates.
-|poly_world2pix| Convert polygon vertices from world coordinates to pixel
-                 coordinates.
-|poly_translate| Translate polygon coordinates by dx and dy.
-================ ========================================================
+================= =======================================================
+|read|            Return a |Geoset| instance from a file in any registered
+                  format.
+|write|           Write a |Geoset| instance to a file in any registered
+                  format.
+|register_format| Register an interface module for a file format.
+|detect_format|   Return the name of the format of a file.
+|configure_cache| Enable, disable, or reconfigure the on-disk cache of
+                  parsed |Geoset| instances.
+|cache_stats|     Return the hit/miss statistics of the cache.
+|clear_cache|     Remove all snapshots from the cache directory.
+|validate_poly|   Test if a polygon is valid and attempt to fix it if not.
+|poly_pix2world|  Convert polygon vertices from pixel coordinates to world
+                  coordinates.
+|poly_world2pix|  Convert polygon vertices from world coordinates to pixel
+                  coordinates.
+|poly_translate|  Translate polygon coordinates by dx and dy.
+================= =======================================================
 
 
 
@@ -81,24 +110,58 @@ Module Index
 - `geoutil.geosetxml`
 - `geoutil.ds9regfile`
 - `geoutil.polylistxml`
+- `geoutil.geosetbin`
+- `geoutil.geosetfits`
+- `geoutil.migrate`
+- `geoutil.footprint`
 - `geoutil._utils`
+- `geoutil._fileio`
+- `geoutil._geoarrays`
+- `geoutil._registry`
+- `geoutil._cache`
+- `geoutil._index`
 
 
 .. references
 
 .. |Geo| replace:: `~geoutil._geoset.Geo`
+.. |LazyGeo| replace:: `~geoutil._geoset.LazyGeo`
 .. |Item| replace:: `~geoutil._geoset.Item`
 .. |Geoset| replace:: `~geoutil._geoset.Geoset`
 
+.. |read| replace:: `~geoutil._registry.read`
+.. |write| replace:: `~geoutil._registry.write`
+.. |register_format| replace:: `~geoutil._registry.register_format`
+.. |detect_format| replace:: `~geoutil._registry.detect_format`
+.. |configure_cache| replace:: `~geoutil._cache.configure_cache`
+.. |cache_stats| replace:: `~geoutil._cache.cache_stats`
+.. |clear_cache| replace:: `~geoutil._cache.clear_cache`
 .. |validate_poly| replace:: `~geoutil._utils.validate_poly`
 .. |poly_pix2world| replace:: `~geoutil._utils.poly_pix2world`
 .. |poly_world2pix| replace:: `~geoutil._utils.poly_world2pix`
 .. |poly_translate| replace:: `~geoutil._utils.poly_translate`
 
 """
-from ._geoset import Geo, Geoset, Item
+import importlib
+
+from ._cache import cache_stats, clear_cache, configure_cache
+from ._geoset import Geo, Geoset, Item, LazyGeo
+from ._registry import detect_format, read, register_format, write
 from ._utils import (poly_pix2world, poly_world2pix, poly_translate,
                      validate_poly)
-from . import geosetxml
-from . import ds9regfile
-from . import polylistxml
+
+
+# Interface modules, imported on first access (see __getattr__)
+_SUBMODULES = ['geosetxml', 'ds9regfile', 'polylistxml', 'geosetbin',
+               'geosetfits', 'migrate', 'footprint']
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
@@ -0,0 +1,267 @@
+"""
+
+================
+`geoutil._cache`
+================
+
+On-disk cache of parsed |Geoset| instances.
+
+Parsing text formats such as geoset XML or DS9 region files is expensive.
+When the cache is enabled, the ``read`` functions of the interface modules
+store each parsed |Geoset| as a snapshot in binary geoset format (see
+`geoutil.geosetbin`) in a cache directory, and later reads of the same file
+load the (memory-mapped) snapshot instead of parsing the file again.
+
+Snapshots are keyed by the format, the absolute path, size, modification
+time and content hash (SHA-1) of the file, and the reader's keyword
+arguments that affect the result, so a modified file is never served from
+the cache. Only files given by path (a `str` or `os.PathLike` object) are
+cached; file objects are always parsed. FITS files (see
+`geoutil.geosetfits`) are not cached, since they are memory-mapped and
+their geometries are only decoded when accessed anyway.
+
+The cache is disabled by default. It is enabled with `configure_cache`, or
+for all processes by setting the ``GEOUTIL_CACHE_DIR`` environment variable
+(and optionally ``GEOUTIL_CACHE_SIZE``, in bytes) before `geoutil` is
+imported. Several processes may share a cache directory: snapshots are
+written to temporary files and atomically renamed, and snapshots that
+disappear (e.g., evicted by another process) are treated as misses. When
+the total size of the snapshots exceeds the size limit, the least recently
+used snapshots are removed.
+
+.. note:: Snapshots store attributes as JSON, so tuple values are returned
+   as lists.
+
+Functions
+---------
+
+================= =========================================================
+`configure_cache` Enable, disable, or reconfigure the cache.
+`cache_stats`     Return the hit/miss statistics of the cache.
+`clear_cache`     Remove all snapshots from the cache directory.
+`cached`          Decorator adding caching to the ``read`` function of an
+                  interface module.
+================= =========================================================
+
+
+.. references
+
+.. |Geoset| replace:: `~geoutil._geoset.Geoset`
+
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+
+
+_SUFFIX = '.gsb'
+_BLOCKSIZE = 1 << 20
+
+# Reader keyword arguments that do not affect the parsed result
+_IGNORED_KWARGS = frozenset(['workers', 'pool', 'chunksize'])
+
+_CONFIG = {
+    'directory': os.environ.get('GEOUTIL_CACHE_DIR') or None,
+    'max_size': int(os.environ.get('GEOUTIL_CACHE_SIZE', 1 << 30)),
+    }
+_STATS = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0,
+          'errors': 0}
+_LOCK = threading.Lock()
+
+
+def configure_cache(directory=None, max_size=1 << 30):
+    """Enable, disable, or reconfigure the cache.
+
+    Parameters
+    ----------
+    directory : str or None, optional
+        Path to the cache directory; created if needed. If None, the cache
+        is disabled. Default value is None.
+    max_size : int, optional
+        Maximum total size of the snapshots in bytes. Snapshots are evicted
+        immediately if the directory already exceeds the new limit. Default
+        value is 1 GiB.
+
+    """
+    if directory is not None:
+        directory = os.path.abspath(directory)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        _evict(directory, max_size)
+    _CONFIG['directory'] = directory
+    _CONFIG['max_size'] = max_size
+
+
+def cache_stats(reset=False):
+    """Return the hit/miss statistics of the cache.
+
+    Statistics are counted per process.
+
+    Parameters
+    ----------
+    reset : bool, optional
+        If True, all counters are reset to zero afterwards. Default value
+        is False.
+
+    Returns
+    -------
+    out : dict
+        Numbers of cache hits, misses, snapshots written, snapshots
+        evicted, and errors (snapshots that could not be written or read).
+
+    """
+    with _LOCK:
+        stats = dict(_STATS)
+        if reset:
+            for key in _STATS:
+                _STATS[key] = 0
+    return stats
+
+
+def _count(key):
+    with _LOCK:
+        _STATS[key] += 1
+
+
+def _snapshots(directory):
+    """Return a list of (mtime, size, path) tuples for all snapshots."""
+    out = []
+    for name in os.listdir(directory):
+        if not name.endswith(_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        out.append((stat.st_mtime, stat.st_size, path))
+    return out
+
+
+def clear_cache():
+    """Remove all snapshots from the cache directory."""
+    directory = _CONFIG['directory']
+    if directory is None or not os.path.isdir(directory):
+        return
+    for mtime, size, path in _snapshots(directory):
+        _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        return False
+    return True
+
+
+def _evict(directory, max_size):
+    """Remove the least recently used snapshots until the total size is
+    within `max_size`.
+
+    """
+    snapshots = sorted(_snapshots(directory))
+    total = sum(size for mtime, size, path in snapshots)
+    for mtime, size, path in snapshots:
+        if total <= max_size:
+            break
+        if _remove(path):
+            _count('evictions')
+        total -= size
+
+
+def _file_key(fmt, filename, args, kwargs):
+    """Return the cache key of a file, including a hash of its contents."""
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        block = f.read(_BLOCKSIZE)
+        while block:
+            digest.update(block)
+            block = f.read(_BLOCKSIZE)
+    options = sorted((key, repr(val)) for key, val in kwargs.items()
+                     if key not in _IGNORED_KWARGS)
+    key = json.dumps([fmt, path, stat.st_size, stat.st_mtime,
+                      digest.hexdigest(), repr(args), options])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _load(path):
+    from . import geosetbin
+    geoset = geosetbin.read(path)
+    # Mark the snapshot as recently used
+    os.utime(path, None)
+    return geoset
+
+
+def _store(geoset, path):
+    from . import geosetbin
+    tmp = '{0:s}.{1:d}.{2:d}.tmp'.format(path, os.getpid(),
+                                         threading.current_thread().ident)
+    try:
+        geosetbin.write(geoset, tmp, compression=None)
+        os.replace(tmp, path)
+    finally:
+        _remove(tmp)
+
+
+def cached(fmt):
+    """Decorator adding caching to the ``read`` function of an interface
+    module.
+
+    The decorated function is called as usual when the cache is disabled,
+    when the file is given as a file object, or on a cache miss. Formats
+    whose files are memory-mapped should not be decorated, since a
+    snapshot would decode all of their geometries.
+
+    Parameters
+    ----------
+    fmt : str
+        Name of the format (see `geoutil._registry.register_format`), used
+        in the cache key.
+
+    Returns
+    -------
+    out : callable
+        Decorator.
+
+    """
+    def decorator(read):
+        @functools.wraps(read)
+        def wrapper(filename, *args, **kwargs):
+            directory = _CONFIG['directory']
+            if directory is None or not isinstance(filename,
+                                                   (str, os.PathLike)):
+                return read(filename, *args, **kwargs)
+
+            key = _file_key(fmt, os.fspath(filename), args, kwargs)
+            path = os.path.join(directory,
+                                '{0:s}-{1:s}{2:s}'.format(fmt, key, _SUFFIX))
+            if os.path.exists(path):
+                try:
+                    geoset = _load(path)
+                except (IOError, OSError, ValueError):
+                    # E.g., evicted by another process in the meantime
+                    _count('errors')
+                else:
+                    _count('hits')
+                    return geoset
+
+            _count('misses')
+            geoset = read(filename, *args, **kwargs)
+            try:
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+                _store(geoset, path)
+            except (IOError, OSError, TypeError, ValueError):
+                # E.g., unsupported geometry types or attribute values
+                _count('errors')
+            else:
+                _count('writes')
+                _evict(directory, _CONFIG['max_size'])
+            return geoset
+        return wrapper
+    return decorator
@@ -0,0 +1,236 @@
+"""
+
+=================
+`geoutil._fileio`
+=================
+
+File handling shared by the interface modules.
+
+All interface modules open their files through `open_file`, which accepts
+either a path or an already open file object (including in-memory buffers
+such as `io.BytesIO`) and transparently handles compressed files. Data is
+compressed and decompressed as a stream, so no temporary files are written
+and decompression overlaps with parsing.
+
+Supported compression formats are:
+
+======== ======================= ======================================
+name     extension(s)            module
+======== ======================= ======================================
+'gzip'   ``.gz``, ``.gzip``      `gzip`
+'bz2'    ``.bz2``                `bz2`
+'xz'     ``.xz``, ``.lzma``      `lzma`
+'zstd'   ``.zst``, ``.zstd``     `zstandard` (optional; only available
+                                 if installed)
+======== ======================= ======================================
+
+Functions
+---------
+
+=================== ==========================================================
+`infer_compression` Return the compression format implied by a file name.
+`sniff_compression` Return the compression format implied by the first bytes
+                    of a file.
+`open_file`         Context manager returning a (decompressed) file object.
+`peek`              Return the first bytes of a (decompressed) file without
+                    consuming them.
+=================== ==========================================================
+
+"""
+import bz2
+import contextlib
+import gzip
+import io
+import os
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.lzma': 'xz',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+    }
+
+
+COMPRESSION_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    ]
+
+
+def is_fileobj(file):
+    """Return True if `file` is an open file object rather than a path."""
+    return hasattr(file, 'read') or hasattr(file, 'write')
+
+
+def infer_compression(filename):
+    """Return the compression format implied by a file name.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to a file. If `filename` is an open file object, its `name`
+        attribute is used if it has one.
+
+    Returns
+    -------
+    out : str or None
+        Name of the compression format (see the module documentation), or
+        None if the file name does not have a recognized extension.
+
+    """
+    if is_fileobj(filename):
+        filename = getattr(filename, 'name', None)
+        if not isinstance(filename, str):
+            return None
+    ext = os.path.splitext(filename)[1].lower()
+    return COMPRESSION_EXTENSIONS.get(ext)
+
+
+def sniff_compression(head):
+    """Return the compression format implied by the first bytes of a file.
+
+    Parameters
+    ----------
+    head : bytes
+        The first few bytes of a file.
+
+    Returns
+    -------
+    out : str or None
+        Name of the compression format (see the module documentation), or
+        None if the bytes do not start with a known magic number.
+
+    """
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def _open_compressed(file, mode, compression):
+    """Open a path or binary file object with a compression codec."""
+    if compression == 'gzip':
+        if is_fileobj(file):
+            return gzip.GzipFile(fileobj=file, mode=mode)
+        return gzip.GzipFile(file, mode=mode)
+    elif compression == 'bz2':
+        return bz2.BZ2File(file, mode=mode)
+    elif compression == 'xz':
+        if lzma is None:
+            raise ValueError('xz compression requires the lzma module')
+        return lzma.LZMAFile(file, mode=mode)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstd compression requires the zstandard '
+                             'package')
+        return zstandard.open(file, mode=mode, closefd=not is_fileobj(file))
+    else:
+        raise ValueError(
+            'unknown compression format: {0!r}'.format(compression))
+
+
+@contextlib.contextmanager
+def open_file(file, mode='rb', compression=None):
+    """Context manager returning a (decompressed) file object.
+
+    Paths are opened (and closed on exit). File objects passed in are used
+    as-is and are left open on exit, so that callers can write to or read
+    from in-memory buffers.
+
+    Parameters
+    ----------
+    file : str or file object
+        Path to a file, or an open file object.
+    mode : {'rb'|'wb'|'r'|'w'}, optional
+        Binary or text mode for reading or writing. Text mode uses UTF-8
+        encoding. Default value is 'rb'.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format. If None, the format is inferred from the
+        extension of `file` (see `infer_compression`), and file objects
+        without a recognized `name` are assumed to be uncompressed.
+        Default value is None.
+
+    Yields
+    ------
+    out : file object
+        A file object in the requested mode; decompression and compression
+        are performed on the fly.
+
+    """
+    text = 'b' not in mode
+    bmode = mode[0] + 'b'
+    if compression is None:
+        compression = infer_compression(file)
+
+    opened = []
+    if compression is not None:
+        f = _open_compressed(file, bmode, compression)
+        opened.append(f)
+    elif is_fileobj(file):
+        f = file
+    else:
+        f = io.open(file, bmode)
+        opened.append(f)
+
+    wrapper = None
+    if text and not isinstance(f, io.TextIOBase):
+        f = wrapper = io.TextIOWrapper(f, encoding='utf-8')
+
+    try:
+        yield f
+    finally:
+        # Detach rather than close the text wrapper so that file objects
+        # passed in by the caller are not closed.
+        if wrapper is not None:
+            if not wrapper.closed:
+                wrapper.flush()
+                wrapper.detach()
+        for f in reversed(opened):
+            f.close()
+
+
+def peek(file, size=4096, compression=None):
+    """Return the first bytes of a (decompressed) file without consuming
+    them.
+
+    Parameters
+    ----------
+    file : str or file object
+        Path to a file, or an open, seekable binary file object. The
+        position of a file object is restored afterwards.
+    size : int, optional
+        Maximum number of (decompressed) bytes to return. Default value is
+        4096.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format; see `open_file`. Default value is None.
+
+    Returns
+    -------
+    out : bytes
+
+    """
+    pos = file.tell() if is_fileobj(file) else None
+    try:
+        with open_file(file, 'rb', compression) as f:
+            head = f.read(size)
+    finally:
+        if pos is not None:
+            file.seek(pos)
+    if isinstance(head, str):
+        head = head.encode('utf-8')
+    return head
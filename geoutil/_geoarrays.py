@@ -0,0 +1,231 @@
+"""
+
+====================
+`geoutil._geoarrays`
+====================
+
+Flat array representation of lists of geometry objects.
+
+A list of `shapely.geometry` objects is represented by a handful of flat
+numpy arrays, which can be stored in binary files and memory-mapped:
+
+================ ======= ==================================================
+array            dtype   contents
+================ ======= ==================================================
+``types``        int8    Geometry type code of each geometry (see
+                         `TYPE_CODES`).
+``geo_offsets``  int64   Index range in ``part_offsets`` for each geometry
+                         (length: number of geometries + 1).
+``part_offsets`` int64   Index range in ``ring_offsets`` for each part,
+                         i.e., each member of a multi-geometry
+                         (length: number of parts + 1).
+``ring_offsets`` int64   Index range in ``coords`` for each ring, i.e., each
+                         exterior or interior ring of a polygon or each
+                         line string (length: number of rings + 1).
+``coords``       float64 x, y coordinates of all vertices, shape (N, 2).
+================ ======= ==================================================
+
+Single geometries (`Point`, `LineString`, `Polygon`) have one part, or
+zero parts if empty. Points and line strings have one ring per part;
+polygons have the exterior followed by the interiors. Only two-dimensional
+coordinates are supported.
+
+Classes
+-------
+
+============ ===========================================================
+`GeoArrays`  Flat array representation of a list of geometry objects.
+============ ===========================================================
+
+"""
+import numpy as np
+from shapely import geometry
+
+
+TYPE_CODES = {
+    None: 0,
+    'Point': 1,
+    'LineString': 2,
+    'Polygon': 3,
+    'MultiPoint': 4,
+    'MultiLineString': 5,
+    'MultiPolygon': 6,
+    }
+TYPE_NAMES = dict((code, name) for name, code in TYPE_CODES.items())
+
+
+def _parts(geom):
+    """Return the list of single-geometry parts of a geometry."""
+    if geom.is_empty:
+        return []
+    elif geom.geom_type.startswith('Multi'):
+        return list(geom.geoms)
+    else:
+        return [geom]
+
+
+def _rings(part):
+    """Return the list of coordinate arrays of a single geometry."""
+    if part.geom_type == 'Polygon':
+        rings = [part.exterior] + list(part.interiors)
+    else:
+        rings = [part]
+    return [np.asarray(ring.coords, dtype='f8').reshape(-1, 2)
+            for ring in rings]
+
+
+class GeoArrays(object):
+
+    """Flat array representation of a list of geometry objects.
+
+    See the module documentation for a description of the arrays. Use
+    `from_geoms` to build an instance from geometry objects; the arrays may
+    also be passed in directly, e.g., as `numpy.memmap` instances, in which
+    case nothing is read until a geometry is requested.
+
+    Parameters
+    ----------
+    types, geo_offsets, part_offsets, ring_offsets, coords : array_like
+        Initialize the corresponding instance variables.
+
+    Attributes
+    ----------
+    types, geo_offsets, part_offsets, ring_offsets, coords : array
+        See the module documentation.
+
+    Methods
+    -------
+    from_geoms
+    geometry
+    geometries
+    bounds
+
+    """
+
+    def __init__(self, types, geo_offsets, part_offsets, ring_offsets,
+                 coords):
+        self.types = types
+        self.geo_offsets = geo_offsets
+        self.part_offsets = part_offsets
+        self.ring_offsets = ring_offsets
+        self.coords = coords
+
+    def __len__(self):
+        return len(self.types)
+
+    @classmethod
+    def from_geoms(cls, geom_list):
+        """Build an instance from a list of geometry objects.
+
+        Parameters
+        ----------
+        geom_list : list
+            List of zero or more `shapely.geometry` objects (or None). Each
+            object must be one of the types listed in `TYPE_CODES`.
+
+        Returns
+        -------
+        out : `GeoArrays`
+
+        """
+        types = np.zeros(len(geom_list), dtype='i1')
+        geo_offsets, part_offsets, ring_offsets = [0], [0], [0]
+        coords = []
+        nparts, nrings, ncoords = 0, 0, 0
+        for i, geom in enumerate(geom_list):
+            if geom is not None:
+                geom_type = geom.geom_type
+                if geom_type not in TYPE_CODES:
+                    raise ValueError('unsupported geometry type: {0:s}'
+                                     .format(geom_type))
+                if geom.has_z:
+                    raise ValueError('only 2D geometries are supported')
+                types[i] = TYPE_CODES[geom_type]
+                for part in _parts(geom):
+                    for xy in _rings(part):
+                        coords.append(xy)
+                        ncoords += len(xy)
+                        ring_offsets.append(ncoords)
+                        nrings += 1
+                    part_offsets.append(nrings)
+                    nparts += 1
+            geo_offsets.append(nparts)
+
+        if coords:
+            coords = np.concatenate(coords)
+        else:
+            coords = np.zeros((0, 2), dtype='f8')
+        return cls(types, np.array(geo_offsets, dtype='i8'),
+                   np.array(part_offsets, dtype='i8'),
+                   np.array(ring_offsets, dtype='i8'), coords)
+
+    def _part_rings(self, p):
+        r1, r2 = self.part_offsets[p], self.part_offsets[p+1]
+        return [np.array(self.coords[self.ring_offsets[r]:
+                                     self.ring_offsets[r+1]])
+                for r in range(r1, r2)]
+
+    def geometry(self, i):
+        """Return geometry number `i` as a `shapely.geometry` object.
+
+        Parameters
+        ----------
+        i : int
+            Index of the geometry.
+
+        Returns
+        -------
+        out : `shapely.geometry` object or None
+
+        """
+        name = TYPE_NAMES[int(self.types[i])]
+        if name is None:
+            return None
+        parts = [self._part_rings(p)
+                 for p in range(self.geo_offsets[i], self.geo_offsets[i+1])]
+
+        if name == 'Point':
+            return (geometry.Point(parts[0][0][0]) if parts
+                    else geometry.Point())
+        elif name == 'LineString':
+            return (geometry.LineString(parts[0][0]) if parts
+                    else geometry.LineString())
+        elif name == 'Polygon':
+            return (geometry.Polygon(parts[0][0], parts[0][1:]) if parts
+                    else geometry.Polygon())
+        elif name == 'MultiPoint':
+            return geometry.MultiPoint([rings[0][0] for rings in parts])
+        elif name == 'MultiLineString':
+            return geometry.MultiLineString([rings[0] for rings in parts])
+        else:
+            return geometry.MultiPolygon(
+                [geometry.Polygon(rings[0], rings[1:]) for rings in parts])
+
+    def geometries(self):
+        """Return a list of all geometries (see `geometry`)."""
+        return [self.geometry(i) for i in range(len(self))]
+
+    def bounds(self):
+        """Return the bounding boxes of all geometries.
+
+        The bounds are computed directly from the coordinate arrays without
+        creating any geometry objects.
+
+        Returns
+        -------
+        out : array
+            Array of shape (N, 4) with columns minx, miny, maxx, maxy. Rows
+            for None or empty geometries are NaN.
+
+        """
+        out = np.full((len(self), 4), np.nan)
+        if not len(self.coords):
+            return out
+        starts = np.asarray(self.ring_offsets)[
+            np.asarray(self.part_offsets)[np.asarray(self.geo_offsets)]]
+        nonempty = starts[1:] > starts[:-1]
+        idx = starts[:-1][nonempty]
+        coords = np.asarray(self.coords)
+        out[nonempty, :2] = np.minimum.reduceat(coords, idx, axis=0)
+        out[nonempty, 2:] = np.maximum.reduceat(coords, idx, axis=0)
+        return out
@@ -16,21 +16,48 @@ model.
 Classes
 -------
 
-======== ==========================================
-`Geo`    Container for a single geometry object.
-`Item`   Container for a group of `Geo` instances.
-`Geoset` Container for a group of `Item` instances.
-======== ==========================================
+========== ==========================================================
+`Geo`      Container for a single geometry object.
+`LazyGeo`  `Geo` whose geometry object is created on first access.
+`Item`     Container for a group of `Geo` instances.
+`Geoset`   Container for a group of `Item` instances.
+========== ==========================================================
 
 """
 from collections import OrderedDict
 
-from astropy import wcs
+import numpy as np
 from shapely import geometry
 
 from . import _utils
 
 
+def _copy_attrs(attrs):
+    """Return a copy of an attribute dictionary as an `OrderedDict`."""
+    if attrs is None:
+        return None
+    return OrderedDict((key, val) for key, val in attrs.items())
+
+
+def _reduce_attrs(attrs_list, reducers):
+    """Aggregate a list of attribute dictionaries.
+
+    For each key in `reducers`, the reducer is called with the list of the
+    values of that key (skipping dictionaries without the key), in order.
+    Returns None if there are no reducers or no values.
+
+    """
+    if not reducers:
+        return None
+    out = OrderedDict()
+    for key, reducer in reducers.items():
+        values = [attrs[key] for attrs in attrs_list
+                  if attrs is not None and key in attrs]
+        if values:
+            out[key] = reducer(values)
+    return out or None
+
+
 class Geo(object):
 
     """Container for a single geometry object.
@@ -107,9 +134,9 @@ class Geo(object):
 
         Parameters
         ----------
-        hdr : `astropy.io.fits.Header`
+        hdr : `astropy.io.fits.Header` or `astropy.wcs.WCS`
             Transform coordinates according to the WCS information in the
-            FITS header.
+            FITS header (or the given WCS).
 
         Returns
         -------
@@ -122,10 +149,7 @@ class Geo(object):
             geo = None
         else:
             geo = _utils.poly_pix2world([self.geo], hdr)[0]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Geo(geo, attrs=attrs)
 
     def world2pix(self, hdr):
@@ -136,9 +160,9 @@ class Geo(object):
 
         Parameters
         ----------
-        hdr : `astropy.io.fits.Header`
+        hdr : `astropy.io.fits.Header` or `astropy.wcs.WCS`
             Transform coordinates according to the WCS information in the
-            FITS header.
+            FITS header (or the given WCS).
 
         Returns
         -------
@@ -151,10 +175,7 @@ class Geo(object):
             geo = None
         else:
             geo = _utils.poly_world2pix([self.geo], hdr)[0]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Geo(geo, attrs=attrs)
 
     def translate(self, dx, dy):
@@ -176,10 +197,7 @@ class Geo(object):
             geo = None
         else:
             geo = _utils.poly_translate([self.geo], dx, dy)[0]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Geo(geo, attrs=attrs)
 
     def copy(self):
@@ -203,13 +221,60 @@ class Geo(object):
             geo = None
         else:
             geo = self.geo.union(geometry.Point())
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Geo(geo, attrs=attrs)
 
 
+class LazyGeo(Geo):
+
+    """`Geo` whose geometry object is created on first access.
+
+    Readers use this class to defer decoding geometries (e.g., from WKT or
+    from coordinate arrays) until they are actually needed. Apart from
+    that, a `LazyGeo` behaves exactly like a `Geo`.
+
+    Parameters
+    ----------
+    loader : callable
+        Function called without arguments to create the geometry object.
+        It is called at most once; the result is stored.
+    attrs : optional
+        Initializes the `attrs` instance variable. Default value is None.
+
+    Attributes
+    ----------
+    geo
+    attrs : dict-like or None
+        Attributes as key-value pairs (typically an `OrderedDict`). None if
+        no attributes.
+    is_loaded
+
+    """
+
+    def __init__(self, loader, attrs=None):
+        self._loader = loader
+        self._geo = None
+        self.attrs = attrs
+
+    @property
+    def geo(self):
+        """Geometry object, created by the loader on first access."""
+        if self._loader is not None:
+            self._geo = self._loader()
+            self._loader = None
+        return self._geo
+
+    @geo.setter
+    def geo(self, geo):
+        self._geo = geo
+        self._loader = None
+
+    @property
+    def is_loaded(self):
+        """True if the geometry object has been created."""
+        return self._loader is None
+
+
 class Item(object):
 
     """Container for a group of `Geo` instances.
@@ -241,6 +306,7 @@ class Item(object):
     world2pix
     translate
     copy
+    dissolve
 
     """
 
@@ -292,9 +358,9 @@ class Item(object):
 
         Parameters
         ----------
-        hdr : `astropy.io.fits.Header`
+        hdr : `astropy.io.fits.Header` or `astropy.wcs.WCS`
             Transform coordinates according to the WCS information in the
-            FITS header.
+            FITS header (or the given WCS).
 
         Returns
         -------
@@ -304,10 +370,7 @@ class Item(object):
 
         """
         geos = [geo.pix2world(hdr) for geo in self.geos]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Item(geos, attrs=attrs)
 
     def world2pix(self, hdr):
@@ -318,9 +381,9 @@ class Item(object):
 
         Parameters
         ----------
-        hdr : `astropy.io.fits.Header`
+        hdr : `astropy.io.fits.Header` or `astropy.wcs.WCS`
             Transform coordinates according to the WCS information in the
-            FITS header.
+            FITS header (or the given WCS).
 
         Returns
         -------
@@ -330,10 +393,7 @@ class Item(object):
 
         """
         geos = [geo.world2pix(hdr) for geo in self.geos]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Item(geos, attrs=attrs)
 
     def translate(self, dx, dy):
@@ -352,10 +412,7 @@ class Item(object):
 
         """
         geos = [geo.translate(dx, dy) for geo in self.geos]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Item(geos, attrs=attrs)
 
     def copy(self):
@@ -376,12 +433,35 @@ class Item(object):
 
         """
         geos = [geo.copy() for geo in self.geos]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
+        attrs = _copy_attrs(self.attrs)
         return Item(geos, attrs=attrs)
 
+    def dissolve(self, reducers=None):
+        """Return a copy with all geometries merged into a single `Geo`.
+
+        The geometries are merged with a single cascaded union (see
+        `geoutil._utils.union_groups`).
+
+        Parameters
+        ----------
+        reducers : dict or None, optional
+            Attributes of the merged `Geo`, as a mapping from attribute keys
+            to functions that take the list of values of that key in the
+            original geos (in order) and return a single value, e.g.,
+            ``{'area': sum, 'name': lambda v: v[0]}``. If None, the merged
+            `Geo` has no attributes. Default value is None.
+
+        Returns
+        -------
+        out : `Item`
+            Copy of the original with a single `Geo`, whose geometry is None
+            if there were no geometries. The item attributes are copied.
+
+        """
+        geo = _utils.union_groups([[geo.geo for geo in self.geos]])[0]
+        attrs = _reduce_attrs([geo.attrs for geo in self.geos], reducers)
+        return Item([Geo(geo, attrs=attrs)], attrs=_copy_attrs(self.attrs))
+
 
 class Geoset(object):
 
@@ -400,7 +480,10 @@ class Geoset(object):
     attrs : optional
         Initialize the `attrs` instance variable. Default value is None.
     hdr : optional
-        Initialize the `hdr` instance variable. Default value is None.
+        Initialize the `hdr` attribute. Besides an `astropy.io.fits.Header`
+        instance, the header may be given in raw form, either as a single
+        string (see `Header.fromstring`) or as a tuple of (keyword, value)
+        pairs; it is then parsed on first access. Default value is None.
 
     Attributes
     ----------
@@ -410,10 +493,10 @@ class Geoset(object):
     attrs : dict-like or None
         Attributes as key-value pairs (typically an `OrderedDict`). None if
         no attributes.
-    hdr : `astropy.io.fits.header.Header` or None
-        FITS header that relates to the stored geometries, e.g. WCS
-        information for transforming between pixel and sky coordinates.
-        None if no header.
+    hdr
+    wcs
+
+    has_hdr
 
     Methods
     -------
@@ -421,6 +504,18 @@ class Geoset(object):
     world2pix
     translate
     copy
+    difference
+    validate
+    clean
+    dissolve
+    sort
+    clip
+    clip_many
+    build_lod
+    lod
+    contains_points
+    nearest
+    plot
 
     Notes
     -----
@@ -497,6 +592,58 @@ class Geoset(object):
         self.attrs = attrs
         self.hdr = hdr
         self._geos = None
+        self._lod = None
+
+    @property
+    def hdr(self):
+        """FITS header that relates to the stored geometries, e.g. WCS
+        information for transforming between pixel and sky coordinates.
+
+        `astropy.io.fits.Header` instance, or None if no header. A header
+        given in raw form (see the `Geoset` parameters) is parsed on first
+        access using `geoutil._utils.parse_header`, so geosets with
+        identical raw headers are only parsed once, but each geoset gets its
+        own copy of the header (and its own WCS).
+
+        """
+        if self._hdr is None and self._hdr_src is not None:
+            self._hdr = _utils.parse_header(self._hdr_src)
+        return self._hdr
+
+    @hdr.setter
+    def hdr(self, hdr):
+        if isinstance(hdr, (str, tuple)):
+            self._hdr, self._hdr_src = None, hdr
+        else:
+            self._hdr, self._hdr_src = hdr, None
+        self._wcs = None
+
+    @property
+    def wcs(self):
+        """`astropy.wcs.WCS` instance built from `hdr` (read-only).
+
+        The WCS is built on first access and cached; it is reset when `hdr`
+        is replaced, but not when the header is modified in place. None if
+        no header.
+
+        """
+        if self._wcs is None and self.has_hdr:
+            self._wcs = _utils.header_wcs(self.hdr)
+        return self._wcs
+
+    @property
+    def has_hdr(self):
+        """True if the geoset has a FITS header, without parsing it."""
+        return self._hdr is not None or self._hdr_src is not None
+
+    def _copy_hdr(self):
+        """Return a copy of the header, keeping it in raw form if it has
+        not been parsed yet.
+
+        """
+        if self._hdr is None:
+            return self._hdr_src
+        return self._hdr.copy()
 
     def __str__(self):
         if not self.items:
@@ -511,7 +658,7 @@ class Geoset(object):
         else:
             attrstr = ', {0:d} attr(s)'.format(len(self.attrs))
 
-        hdrstr = '' if self.hdr is None else ', FITS header'
+        hdrstr = ', FITS header' if self.has_hdr else ''
 
         lines = ['Geoset' + itemsstr + geosstr + attrstr + hdrstr]
         n = 0
@@ -531,8 +678,8 @@ class Geoset(object):
         ----------
         hdr : `astropy.io.fits.Header` or None, optional
             Transform coordinates according to the WCS information in the
-            FITS header. If None, the header stored in the geoset is used.
-            Default value is None.
+            FITS header. If None, the header stored in the geoset is used
+            (via the cached `wcs`). Default value is None.
 
         Returns
         -------
@@ -542,17 +689,10 @@ class Geoset(object):
 
         """
         if hdr is None:
-            hdr = self.hdr
+            hdr = self.wcs
         items = [item.pix2world(hdr) for item in self.items]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
-        if self.hdr is None:
-            hdr = None
-        else:
-            hdr = self.hdr.copy()
-        return Geoset(items, attrs=attrs, hdr=hdr)
+        attrs = _copy_attrs(self.attrs)
+        return Geoset(items, attrs=attrs, hdr=self._copy_hdr())
 
     def world2pix(self, hdr=None):
         """Return a copy with coordinates converted to the pixel system.
@@ -564,8 +704,8 @@ class Geoset(object):
         ----------
         hdr : `astropy.io.fits.Header` or None, optional
             Transform coordinates according to the WCS information in the
-            FITS header. If None, the header stored in the geoset is used.
-            Default value is None.
+            FITS header. If None, the header stored in the geoset is used
+            (via the cached `wcs`). Default value is None.
 
         Returns
         -------
@@ -575,17 +715,10 @@ class Geoset(object):
 
         """
         if hdr is None:
-            hdr = self.hdr
+            hdr = self.wcs
         items = [item.world2pix(hdr) for item in self.items]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
-        if self.hdr is None:
-            hdr = None
-        else:
-            hdr = self.hdr.copy()
-        return Geoset(items, attrs=attrs, hdr=hdr)
+        attrs = _copy_attrs(self.attrs)
+        return Geoset(items, attrs=attrs, hdr=self._copy_hdr())
 
     def translate(self, dx, dy):
         """Return a copy with coordinates translated by dx and dy.
@@ -603,15 +736,8 @@ class Geoset(object):
 
         """
         items = [item.translate(dx, dy) for item in self.items]
-        if self.attrs is None:
-            attrs = None
-        else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
-        if self.hdr is None:
-            hdr = None
-        else:
-            hdr = self.hdr.copy()
-        return Geoset(items, attrs=attrs, hdr=hdr)
+        attrs = _copy_attrs(self.attrs)
+        return Geoset(items, attrs=attrs, hdr=self._copy_hdr())
 
     def copy(self):
         """Return a deep copy.
@@ -631,15 +757,536 @@ class Geoset(object):
 
         """
         items = [item.copy() for item in self.items]
-        if self.attrs is None:
-            attrs = None
+        attrs = _copy_attrs(self.attrs)
+        return Geoset(items, attrs=attrs, hdr=self._copy_hdr())
+
+    def _replace_geos(self, geo_list):
+        """Return a copy with the geometry objects of all `Geo` instances
+        (in the order of `geos`) replaced by those in `geo_list`.
+
+        """
+        geo_list = iter(geo_list)
+        items = []
+        for item in self.items:
+            geos = [Geo(next(geo_list), attrs=_copy_attrs(geo.attrs))
+                    for geo in item.geos]
+            items.append(Item(geos, attrs=_copy_attrs(item.attrs)))
+        return Geoset(items, attrs=_copy_attrs(self.attrs),
+                      hdr=self._copy_hdr())
+
+    def _select_geos(self, geo_map):
+        """Return a copy with only the `Geo` instances whose index in `geos`
+        is a key of `geo_map`, with their geometry objects replaced by the
+        corresponding values. Items left without geos are dropped.
+
+        """
+        items = []
+        k = 0
+        for item in self.items:
+            geos = []
+            for geo in item.geos:
+                if k in geo_map:
+                    geos.append(Geo(geo_map[k], attrs=_copy_attrs(geo.attrs)))
+                k += 1
+            if geos:
+                items.append(Item(geos, attrs=_copy_attrs(item.attrs)))
+        return Geoset(items, attrs=_copy_attrs(self.attrs),
+                      hdr=self._copy_hdr())
+
+    def difference(self, masks, workers=1, pool='thread'):
+        """Return a copy with a set of masks subtracted from every geometry.
+
+        Uses `geoutil._utils.batch_difference`, so each geometry is only
+        compared against the masks that overlap it.
+
+        Parameters
+        ----------
+        masks : list or `Geoset`
+            List of `shapely.geometry.Polygon` or
+            `shapely.geometry.MultiPolygon` instances, or a `Geoset` whose
+            geometries are used as masks.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Default
+            value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        Returns
+        -------
+        out : `Geoset`
+            Copy of the original with the masks subtracted from each
+            geometry.
+
+        """
+        if isinstance(masks, Geoset):
+            masks = [geo.geo for geo in masks.geos]
+        geo_list = _utils.batch_difference(
+            [geo.geo for geo in self.geos], masks, workers=workers,
+            pool=pool)
+        return self._replace_geos(geo_list)
+
+    def validate(self, method='buffer', poly_buffer=0, workers=1,
+                 pool='thread'):
+        """Test if the geometries are valid and fix the invalid ones in
+        place.
+
+        Uses `geoutil._utils.validate_polys`, so validity is checked in bulk
+        and only invalid geometries are repaired.
+
+        Parameters
+        ----------
+        method : {'buffer'|'make_valid'}, optional
+            Repair method; see `geoutil._utils.validate_polys`. Default
+            value is 'buffer'.
+        poly_buffer : int or float, optional
+            Buffer distance for the 'buffer' method; see
+            `geoutil._utils.validate_poly`. Default value is 0.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Default
+            value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        Returns
+        -------
+        out : list
+            List of (i, j, old type, new type) tuples for the repaired
+            geometries, where `i` is the index of the item and `j` the
+            index of the geo within the item.
+
+        """
+        locations = [(i, j) for i, item in enumerate(self.items)
+                     for j in range(len(item.geos))]
+        geos = self.geos
+        geo_list, report = _utils.validate_polys(
+            [geo.geo for geo in geos], method=method,
+            poly_buffer=poly_buffer, workers=workers, pool=pool)
+        out = []
+        for k, old_type, new_type in report:
+            geos[k].geo = geo_list[k]
+            out.append(locations[k] + (old_type, new_type))
+        return out
+
+    def clean(self):
+        """Return a copy with extraneous geometries removed from all
+        polygons.
+
+        Uses `geoutil._utils.clean_polys` to process all geometries in one
+        call. Unchanged geometry objects are shared with the original.
+
+        Returns
+        -------
+        out : `Geoset`
+            Copy of the original with cleaned geometries.
+
+        """
+        return self._replace_geos(
+            _utils.clean_polys([geo.geo for geo in self.geos]))
+
+    def dissolve(self, by=None, reducers=None, workers=1, pool='thread'):
+        """Return a copy with geometries merged per item or per group of
+        items.
+
+        Each group of geometries is merged with a single cascaded union
+        (see `geoutil._utils.union_groups`); groups are processed in
+        parallel if `workers` is not 1.
+
+        Parameters
+        ----------
+        by : str or None, optional
+            If None, the geos of each item are merged (see `Item.dissolve`).
+            Otherwise, items are grouped by the value of this attribute key
+            (items without it form the group None), and all geos of each
+            group are merged into a single item. Default value is None.
+        reducers : dict or None, optional
+            Mapping from attribute keys to functions that aggregate a list
+            of values (see `Item.dissolve`). If `by` is None, they are
+            applied to the geo attributes of each item; otherwise, to the
+            item attributes of each group. Default value is None.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Default
+            value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        Returns
+        -------
+        out : `Geoset`
+            Copy of the original with one `Geo` per item. If `by` is given,
+            there is one item per group, in order of first appearance, with
+            the group value stored under `by` followed by the reduced
+            attributes; the merged geos have no attributes.
+
+        """
+        if by is None:
+            groups = [[item] for item in self.items]
+        else:
+            groups = OrderedDict()
+            for item in self.items:
+                key = None if item.attrs is None else item.attrs.get(by)
+                groups.setdefault(key, []).append(item)
+
+        geo_list = _utils.union_groups(
+            [[geo.geo for item in group for geo in item.geos]
+             for group in (groups if by is None else groups.values())],
+            workers=workers, pool=pool)
+
+        items = []
+        if by is None:
+            for item, geo in zip(self.items, geo_list):
+                attrs = _reduce_attrs([g.attrs for g in item.geos], reducers)
+                items.append(Item([Geo(geo, attrs=attrs)],
+                                  attrs=_copy_attrs(item.attrs)))
         else:
-            attrs = OrderedDict((key, val) for key, val in self.attrs.items())
-        if self.hdr is None:
-            hdr = None
+            for (key, group), geo in zip(groups.items(), geo_list):
+                attrs = OrderedDict([(by, key)])
+                attrs.update(_reduce_attrs([item.attrs for item in group],
+                                           reducers) or {})
+                items.append(Item([Geo(geo)], attrs=attrs))
+        return Geoset(items, attrs=_copy_attrs(self.attrs),
+                      hdr=self._copy_hdr())
+
+    def _item_centroids(self):
+        """Return the centroid of each item: the area-weighted mean of the
+        centroids of its geometries (or their plain mean if none of them
+        has an area), NaN for items without geometries.
+
+        """
+        geo_list, item_ids = [], []
+        for i, item in enumerate(self.items):
+            for geo in item.geos:
+                geo_list.append(geo.geo)
+                item_ids.append(i)
+        centroids = _utils.geom_centroids(geo_list)
+        valid = ~np.isnan(centroids[:,0])
+        centroids, item_ids = centroids[valid], np.array(item_ids)[valid]
+        areas = np.array([geo.area for geo, ok in zip(geo_list, valid)
+                          if ok])
+
+        out = np.full((len(self.items), 2), np.nan)
+        for weights in (np.ones(len(areas)), areas):
+            total = np.bincount(item_ids, weights=weights,
+                                minlength=len(self.items))
+            for axis in range(2):
+                sums = np.bincount(item_ids,
+                                   weights=weights * centroids[:,axis],
+                                   minlength=len(self.items))
+                out[total > 0, axis] = sums[total > 0] / total[total > 0]
+        return out
+
+    def sort(self, key='hilbert', reverse=False, order=16):
+        """Return a copy with the items sorted spatially or by an
+        attribute.
+
+        Sorting spatially puts items that are close to each other in space
+        close to each other in `items`, which improves the locality of
+        queries and the efficiency of reading parts of files (see the
+        `sort` argument of `geoutil._registry.write`).
+
+        Parameters
+        ----------
+        key : str or callable, optional
+            'hilbert' or 'morton' to sort the item centroids along a
+            space-filling curve (see `geoutil._utils.curve_keys`), 'x' or
+            'y' to sort them by coordinate, any other string to sort by the
+            value of that item attribute (items without it come last), or
+            a function that takes an `Item` and returns a sort key. Default
+            value is 'hilbert'.
+        reverse : bool, optional
+            If True, sort in descending order. Default value is False.
+        order : int, optional
+            Number of bits per coordinate for the space-filling curves.
+            Default value is 16.
+
+        Returns
+        -------
+        out : `Geoset`
+            Copy of the original with the items reordered. The sort is
+            stable, and items without geometries come last for spatial
+            keys. The `Item` instances are shared with the original, not
+            copied.
+
+        """
+        if callable(key):
+            keys = [key(item) for item in self.items]
+            idx = sorted(range(len(keys)), key=keys.__getitem__,
+                         reverse=reverse)
+        elif key in ('hilbert', 'morton', 'x', 'y'):
+            centroids = self._item_centroids()
+            missing = np.isnan(centroids[:,0])
+            if key in ('x', 'y'):
+                keys = centroids[:,'xy'.index(key)]
+            else:
+                keys = _utils.curve_keys(centroids[:,0], centroids[:,1],
+                                         curve=key, order=order)
+            if reverse:
+                keys = -keys
+            idx = np.lexsort((keys, missing))
         else:
-            hdr = self.hdr.copy()
-        return Geoset(items, attrs=attrs, hdr=hdr)
+            values = [None if item.attrs is None else item.attrs.get(key)
+                      for item in self.items]
+            present = [i for i, val in enumerate(values) if val is not None]
+            idx = sorted(present, key=values.__getitem__, reverse=reverse)
+            idx += [i for i, val in enumerate(values) if val is None]
+        return Geoset([self.items[i] for i in idx],
+                      attrs=_copy_attrs(self.attrs), hdr=self._copy_hdr())
+
+    def clip(self, hdr, world=True, workers=1, pool='thread'):
+        """Return a copy clipped to the footprint of an image.
+
+        See `clip_many`.
+
+        Parameters
+        ----------
+        hdr : `astropy.io.fits.Header` or `astropy.wcs.WCS`
+            FITS image header defining the footprint; see
+            `geoutil._utils.header_footprint`.
+        world : bool, optional
+            If True, the geometries are in world coordinates and the
+            footprint is converted using the WCS of `hdr`. Otherwise, the
+            geometries are in the pixel coordinates of the image. Default
+            value is True.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Default
+            value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        Returns
+        -------
+        out : `Geoset`
+            Copy of the original with only the parts of the geometries
+            inside the footprint.
+
+        """
+        return self.clip_many([hdr], world=world, workers=workers,
+                              pool=pool)[0]
+
+    def clip_many(self, hdr_list, world=True, workers=1, pool='thread'):
+        """Return copies clipped to the footprints of several images.
+
+        All images are handled in a single pass with
+        `geoutil._utils.clip_polys`: geometries entirely inside a footprint
+        are kept unchanged and only those crossing its boundary are
+        intersected with it. Geos that do not overlap a footprint are
+        dropped, as are items left without geos.
+
+        Parameters
+        ----------
+        hdr_list : list
+            List of `astropy.io.fits.Header` or `astropy.wcs.WCS` instances
+            defining the footprints; see `geoutil._utils.header_footprint`.
+        world : bool, optional
+            If True, the geometries are in world coordinates and each
+            footprint is converted using the WCS of its header. Otherwise,
+            the geometries are in the pixel coordinates of the images.
+            Default value is True.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Default
+            value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        Returns
+        -------
+        out : list
+            One clipped copy of the original (`Geoset`) per header. Each
+            copy keeps the attributes and header of the original.
+
+        """
+        footprints = [_utils.header_footprint(hdr, world=world)
+                      for hdr in hdr_list]
+        results = _utils.clip_polys([geo.geo for geo in self.geos],
+                                    footprints, workers=workers, pool=pool)
+        return [self._select_geos(dict(pairs)) for pairs in results]
+
+    def build_lod(self, tolerances, preserve_topology=True, workers=1,
+                  pool='thread'):
+        """Build and cache simplified versions of all geometries at several
+        levels of detail.
+
+        Each level is built with `geoutil._utils.simplify_polys`, so the
+        boundaries of the simplified geometries are approximately within
+        the tolerance of the level from the original boundaries. The
+        regions where each level differs from full resolution are stored
+        as well, for exact queries. Levels are used by `lod`,
+        `contains_points`, and `plot`. The cache is tied to the current
+        geometry objects; call `build_lod` again after modifying the
+        geoset.
+
+        Parameters
+        ----------
+        tolerances : list
+            Tolerances of the levels of detail, in the units of the
+            coordinates, e.g., ``[0.5, 2, 8]``.
+        preserve_topology : bool, optional
+            If True, the simplified geometries are guaranteed to be valid;
+            see `geoutil._utils.simplify_polys`. Default value is True.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Default
+            value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        """
+        geo_list = [geo.geo for geo in self.geos]
+        levels, diffs = OrderedDict(), OrderedDict()
+        for tolerance in sorted(tolerances):
+            simple_list = _utils.simplify_polys(
+                geo_list, tolerance, preserve_topology=preserve_topology,
+                workers=workers, pool=pool)
+            levels[tolerance] = simple_list
+            # Regions where the level and full resolution disagree; used by
+            # contains_points
+            diffs[tolerance] = [
+                None if simple is full else full.symmetric_difference(simple)
+                for full, simple in zip(geo_list, simple_list)]
+        self._lod = (geo_list, levels, diffs)
+
+    def lod(self, tolerance=0):
+        """Return the geometries at the coarsest level of detail within a
+        given tolerance.
+
+        Parameters
+        ----------
+        tolerance : float, optional
+            Maximum acceptable distance between the returned and the
+            original boundaries. Default value is 0 (full resolution).
+
+        Returns
+        -------
+        level : float
+            Tolerance of the chosen level, 0 for full resolution.
+        geo_list : list
+            Geometry objects (or None) of all `Geo` instances in the tree,
+            in the order of `geos`.
+
+        """
+        geo_list = [geo.geo for geo in self.geos]
+        if self._lod is None:
+            return 0, geo_list
+        full, levels, diffs = self._lod
+        if len(full) != len(geo_list) or any(
+                a is not b for a, b in zip(full, geo_list)):
+            raise ValueError('levels of detail are out of date; '
+                             'call build_lod')
+        level = max([tol for tol in levels if tol <= tolerance] or [0])
+        return level, (levels[level] if level else geo_list)
+
+    def contains_points(self, x, y, tolerance=None):
+        """Test which points lie inside any of the geometries.
+
+        Uses `geoutil._utils.points_in_polys`.
+
+        Parameters
+        ----------
+        x, y : array_like
+            Point coordinates.
+        tolerance : float or None, optional
+            If None, the results are exact: the coarsest level of detail
+            (see `build_lod`) is used for all points, and only points in
+            the regions where the level differs from the full-resolution
+            geometries are tested again at full resolution. Otherwise, the
+            coarsest level within `tolerance` is used (see `lod`) without
+            refinement, so points close to a boundary may be
+            misclassified. Default value is None.
+
+        Returns
+        -------
+        out : array
+            Boolean array, True for points inside (not on the boundary of)
+            at least one geometry.
+
+        """
+        if tolerance is not None:
+            level, geo_list = self.lod(tolerance)
+            return _utils.points_in_polys(x, y, geo_list)
+        level, geo_list = self.lod(float('inf'))
+        if not level:
+            return _utils.points_in_polys(x, y, geo_list)
+        full, levels, diffs = self._lod
+        return _utils.points_in_polys(x, y, geo_list, refine_list=full,
+                                      diff_list=diffs[level])
+
+    def nearest(self, x, y, k=1, max_distance=None, boundary=False,
+                workers=1, pool='thread', chunksize=100000):
+        """Find the nearest items to points.
+
+        The distance to an item is the minimum distance to its geometries.
+        Uses `geoutil._utils.nearest_polys`.
+
+        Parameters
+        ----------
+        x, y : array_like
+            Point coordinates.
+        k : int, optional
+            Number of nearest items to find. Default value is 1.
+        max_distance : float or None, optional
+            If given, only items within this distance are returned. Default
+            value is None.
+        boundary : bool, optional
+            If True, distances are measured to the boundaries of the
+            geometries, e.g., to flag points close to the edge of a region
+            whether they are inside it or not. Default value is False.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Default
+            value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+        chunksize : int, optional
+            Number of points processed at once. Default value is 100000.
+
+        Returns
+        -------
+        idx : array
+            Indices in `items` of the nearest items of each point, sorted
+            by distance; -1 where fewer than `k` items were found. The
+            shape is (N,) if `k` is 1 and (N, `k`) otherwise.
+        dist : array
+            The corresponding distances; inf where fewer than `k` items
+            were found.
+
+        """
+        geo_list, group_ids = [], []
+        for i, item in enumerate(self.items):
+            for geo in item.geos:
+                geo_list.append(geo.geo)
+                group_ids.append(i)
+        return _utils.nearest_polys(
+            x, y, geo_list, k=k, max_distance=max_distance,
+            boundary=boundary, group_ids=group_ids, workers=workers,
+            pool=pool, chunksize=chunksize)
+
+    def plot(self, ax=None, f='k-', tolerance=0):
+        """Plot all polygons with `geoutil._utils.plot_poly`.
+
+        Requires `matplotlib`.
+
+        Parameters
+        ----------
+        ax : `matplotlib.axes.Axes` or None, optional
+            Axes to plot in. If None, the current axes are used. Default
+            value is None.
+        f : str, optional
+            Line format. Default value is 'k-'.
+        tolerance : float, optional
+            Acceptable error, e.g., the size of a screen pixel in the
+            units of the coordinates; the coarsest level of detail within
+            `tolerance` is plotted (see `lod`). Default value is 0 (full
+            resolution).
+
+        """
+        level, geo_list = self.lod(tolerance)
+        for geo in geo_list:
+            if geo is not None and not geo.is_empty:
+                _utils.plot_poly(geo, ax=ax, f=f)
 
     @property
     def geos(self):
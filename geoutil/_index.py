@@ -0,0 +1,210 @@
+"""
+
+================
+`geoutil._index`
+================
+
+Bounding box index for spatial queries on lists of geometry objects.
+
+The index only depends on `numpy` and works with any version of `shapely`:
+boxes are sorted by their minimum x coordinate, and a query selects the
+boxes whose minimum x lies within reach of the query box (using the
+largest box width) with a binary search, before testing the full box
+overlap in bulk. Candidate pairs found this way are then typically passed
+to an exact geometric predicate. With shapely 2, the bounding boxes of
+geometry objects are computed in bulk, and queries use a `shapely.STRtree`
+of the boxes instead, which scales better when the boxes are small
+compared to the extent of the index.
+
+Classes
+-------
+
+============= ==============================================================
+`BoundsIndex` Bounding box index of a list of geometry objects.
+============= ==============================================================
+
+Functions
+---------
+
+============= ==============================================================
+`geom_bounds` Return the bounding boxes of a list of geometry objects.
+============= ==============================================================
+
+"""
+import numpy as np
+try:
+    from shapely import bounds as _bounds
+except ImportError:
+    _bounds = None
+try:
+    from shapely import STRtree as _STRtree
+    from shapely import box as _box
+except ImportError:
+    _STRtree = None
+
+
+def geom_bounds(geom_list):
+    """Return the bounding boxes of a list of geometry objects.
+
+    Parameters
+    ----------
+    geom_list : list
+        List of zero or more `shapely.geometry` objects (or None).
+
+    Returns
+    -------
+    out : array
+        Array of shape (N, 4) with columns minx, miny, maxx, maxy. Rows for
+        None or empty geometries are NaN.
+
+    """
+    if _bounds is not None:
+        geoms = np.empty(len(geom_list), dtype=object)
+        geoms[:] = geom_list
+        return _bounds(geoms).reshape(-1, 4)
+    out = np.full((len(geom_list), 4), np.nan)
+    for i, geom in enumerate(geom_list):
+        if geom is not None and not geom.is_empty:
+            out[i] = geom.bounds
+    return out
+
+
+class BoundsIndex(object):
+
+    """Bounding box index of a list of geometry objects.
+
+    Parameters
+    ----------
+    bounds : array_like
+        Array of shape (N, 4) with columns minx, miny, maxx, maxy. Rows
+        containing NaN (e.g., for empty geometries) never match a query.
+
+    Attributes
+    ----------
+    bounds : array
+        The bounding boxes, in the original order.
+
+    Methods
+    -------
+    from_geoms
+    query
+    query_bulk
+
+    """
+
+    def __init__(self, bounds):
+        self.bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+        valid = ~np.isnan(self.bounds).any(axis=1)
+        idx = np.nonzero(valid)[0]
+        self._order = idx[np.argsort(self.bounds[idx, 0], kind='mergesort')]
+        self._sorted = self.bounds[self._order]
+        widths = self._sorted[:,2] - self._sorted[:,0]
+        self._width = widths.max() if len(widths) else 0.
+        self._tree = None  # Built on first query
+
+    def __getstate__(self):
+        # STRtree instances cannot be pickled (e.g., for process pools)
+        state = self.__dict__.copy()
+        state['_tree'] = None
+        return state
+
+    def __len__(self):
+        return len(self.bounds)
+
+    @classmethod
+    def from_geoms(cls, geom_list):
+        """Build an index from a list of geometry objects (see
+        `geom_bounds`).
+
+        """
+        return cls(geom_bounds(geom_list))
+
+    def query(self, bounds):
+        """Return the indices of the boxes intersecting a box.
+
+        Parameters
+        ----------
+        bounds : tuple
+            Query box, (minx, miny, maxx, maxy).
+
+        Returns
+        -------
+        out : array
+            Sorted indices of the boxes that intersect (or touch) the query
+            box.
+
+        """
+        qi, idx = self.query_bulk([bounds])
+        return np.sort(idx)
+
+    def query_bulk(self, bounds, chunksize=100000):
+        """Return all pairs of intersecting query and index boxes.
+
+        Parameters
+        ----------
+        bounds : array_like
+            Query boxes, array of shape (M, 4). Rows containing NaN never
+            match.
+        chunksize : int, optional
+            Maximum number of candidate pairs tested at once (or, with
+            shapely 2, of query boxes); bounds memory usage. Default value
+            is 100000.
+
+        Returns
+        -------
+        qidx, idx : array
+            Indices of the query boxes and of the intersecting index boxes,
+            ordered by query index.
+
+        """
+        bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+        if _STRtree is not None:
+            return self._query_tree(bounds, chunksize)
+        minx = self._sorted[:,0]
+        with np.errstate(invalid='ignore'):
+            lo = np.searchsorted(minx, bounds[:,0] - self._width, 'left')
+            hi = np.searchsorted(minx, bounds[:,2], 'right')
+        n = np.where(np.isnan(bounds).any(axis=1), 0, hi - lo)
+
+        qidx_list, idx_list = [], []
+        cum = np.cumsum(n)
+        start = 0
+        while start < len(n):
+            # Group queries so that each group has at most chunksize pairs
+            # (or a single query)
+            base = cum[start-1] if start else 0
+            stop = max(np.searchsorted(cum, base + chunksize, 'right'),
+                       start + 1)
+            counts = n[start:stop]
+            total = counts.sum()
+            if total:
+                q = np.repeat(np.arange(start, stop), counts)
+                offsets = np.arange(total) - np.repeat(
+                    np.cumsum(counts) - counts, counts)
+                s = lo[q] + offsets
+                box, qbox = self._sorted[s], bounds[q]
+                hit = ((box[:,0] <= qbox[:,2]) & (box[:,2] >= qbox[:,0]) &
+                       (box[:,1] <= qbox[:,3]) & (box[:,3] >= qbox[:,1]))
+                qidx_list.append(q[hit])
+                idx_list.append(self._order[s[hit]])
+            start = stop
+
+        if not qidx_list:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        return np.concatenate(qidx_list), np.concatenate(idx_list)
+
+    def _query_tree(self, bounds, chunksize):
+        """Implementation of `query_bulk` using a `shapely.STRtree`."""
+        if self._tree is None:
+            self._tree = _STRtree(_box(*self._sorted.T))
+        qidx_list, idx_list = [], []
+        for start in range(0, len(bounds), chunksize):
+            chunk = bounds[start:start+chunksize]
+            valid = np.nonzero(~np.isnan(chunk).any(axis=1))[0]
+            q, s = self._tree.query(_box(*chunk[valid].T))
+            qidx_list.append(start + valid[q])
+            idx_list.append(self._order[s])
+
+        if not qidx_list:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        return np.concatenate(qidx_list), np.concatenate(idx_list)
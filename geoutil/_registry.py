@@ -0,0 +1,309 @@
+"""
+
+===================
+`geoutil._registry`
+===================
+
+Registry of interface modules and format-independent reading and writing.
+
+Each file format is handled by an interface module (e.g.,
+`geoutil.geosetxml`) that provides ``read(filename, compression=None,
+...)`` and ``write(geoset, filename, compression=None, ...)`` functions.
+Formats are registered by name together with the module name, file
+extensions, and a "sniffer" that recognizes the format from the first bytes
+of a file. Interface modules are only imported when a file in their format
+is actually read or written.
+
+New interface modules can register themselves with `register_format`,
+after which `read` and `write` handle their files as well.
+
+The built-in formats are registered as follows (sniffers are tried in this
+order):
+
+============= ================= ==========================================
+name          extension(s)      recognized by
+============= ================= ==========================================
+'geosetbin'   ``.gsb``          ``GEOSETB1`` magic number
+'geosetfits'  ``.fits``,        ``SIMPLE  =`` FITS card
+              ``.fit``
+'geosetxml'   ``.xml``          ``<GEOSET>`` root element
+'polylistxml' (none)            ``<POLYLIST>`` root element
+'ds9regfile'  ``.reg``          region file header or shape (non-XML)
+============= ================= ==========================================
+
+Polylist XML files share the ``.xml`` extension with geoset XML files, so
+'polylistxml' has no extensions: `read` detects polylist XML files by
+their root element only, and `write` never chooses the format by file name
+(pass ``format='polylistxml'`` to write one).
+
+Functions
+---------
+
+================= =========================================================
+`register_format` Register an interface module for a file format.
+`detect_format`   Return the name of the format of a file.
+`read`            Return a |Geoset| instance from a file in any registered
+                  format.
+`write`           Write a |Geoset| instance to a file in any registered
+                  format.
+================= =========================================================
+
+
+.. references
+
+.. |Geoset| replace:: `~geoutil._geoset.Geoset`
+
+"""
+from collections import OrderedDict, namedtuple
+import importlib
+import os
+import re
+
+from . import _fileio
+
+
+Format = namedtuple('Format', ['module', 'extensions', 'sniff'])
+
+# Registered formats, in the order in which sniffers are tried
+FORMATS = OrderedDict()
+
+
+def register_format(name, module, extensions=(), sniff=None):
+    """Register an interface module for a file format.
+
+    Parameters
+    ----------
+    name : str
+        Name of the format, e.g., 'geosetxml'. An existing format with the
+        same name is replaced.
+    module : str or module
+        The interface module, or its full name (e.g.,
+        ``'mypackage.myformat'``) so that it is only imported when needed.
+        The module must provide ``read`` and ``write`` functions that
+        accept a `compression` keyword argument.
+    extensions : list, optional
+        File extensions (including the dot) used to choose the format when
+        writing and as a fallback when reading, e.g., ``['.xml']``.
+        Extensions are matched after any compression extension is removed.
+        Default value is an empty tuple.
+    sniff : callable or None, optional
+        Function that takes the first (decompressed) bytes of a file and
+        returns True if the file is in this format. If None, the format can
+        only be chosen by extension or by name. Default value is None.
+
+    """
+    FORMATS.pop(name, None)
+    FORMATS[name] = Format(module, tuple(ext.lower() for ext in extensions),
+                           sniff)
+
+
+def _get_module(name):
+    module = FORMATS[name].module
+    if isinstance(module, str):
+        module = importlib.import_module(module)
+    return module
+
+
+def _extension(filename):
+    """Return the extension of a file name, ignoring any compression
+    extension.
+
+    """
+    if _fileio.is_fileobj(filename):
+        filename = getattr(filename, 'name', None)
+        if not isinstance(filename, str):
+            return None
+    root, ext = os.path.splitext(filename)
+    if ext.lower() in _fileio.COMPRESSION_EXTENSIONS:
+        root, ext = os.path.splitext(root)
+    return ext.lower()
+
+
+def _format_from_extension(filename):
+    ext = _extension(filename)
+    for name, fmt in FORMATS.items():
+        if ext and ext in fmt.extensions:
+            return name
+    return None
+
+
+def _resolve_compression(filename, compression):
+    """Return the compression format of a file from its extension or, failing
+    that, its magic number.
+
+    """
+    if compression is None:
+        compression = _fileio.infer_compression(filename)
+    seekable = (not _fileio.is_fileobj(filename) or
+                getattr(filename, 'seekable', lambda: False)())
+    if compression is None and seekable:
+        compression = _fileio.sniff_compression(_fileio.peek(filename, 8))
+    return compression
+
+
+def detect_format(filename, compression=None):
+    """Return the name of the format of a file.
+
+    The first bytes of the (decompressed) file are passed to the sniffers
+    of the registered formats. If none of them recognizes the file, the
+    format is chosen by file extension.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to a file, or an open, seekable binary file object (its
+        position is not changed).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension or from the first bytes of the file.
+        Default value is None.
+
+    Returns
+    -------
+    out : str
+        Name of the format.
+
+    """
+    compression = _resolve_compression(filename, compression)
+    head = _fileio.peek(filename, compression=compression)
+    for name, fmt in FORMATS.items():
+        if fmt.sniff is not None and fmt.sniff(head):
+            return name
+    name = _format_from_extension(filename)
+    if name is None:
+        raise ValueError('unable to detect the file format')
+    return name
+
+
+def read(filename, format=None, compression=None, **kwargs):
+    """Create a |Geoset| instance from a file in any registered format.
+
+    Only the interface module for the format of the file is imported.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to the file to be loaded, or an open binary file object (must
+        be seekable if `format` is None).
+    format : str or None, optional
+        Name of the format (see `register_format`). If None, the format is
+        detected using `detect_format`. Default value is None.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension or from the first bytes of the file.
+        Default value is None.
+    **kwargs
+        Additional keyword arguments passed to the ``read`` function of the
+        interface module (e.g., `workers` for `geoutil.geosetxml.read`).
+
+    Returns
+    -------
+    out : |Geoset|
+
+    """
+    compression = _resolve_compression(filename, compression)
+    if format is None:
+        format = detect_format(filename, compression=compression)
+    module = _get_module(format)
+    return module.read(filename, compression=compression, **kwargs)
+
+
+def write(geoset, filename, format=None, compression=None, sort=None,
+          **kwargs):
+    """Write a |Geoset| instance to a file in any registered format.
+
+    Parameters
+    ----------
+    geoset : |Geoset|
+        The input |Geoset| instance.
+    filename : str or file object
+        Destination path of the output file, or an open binary file
+        object.
+    format : str or None, optional
+        Name of the format (see `register_format`). If None, the format is
+        chosen by the extension of `filename`, ignoring any compression
+        extension (e.g., 'regions.xml.gz' is written in geoset XML format;
+        polylist XML is only written if requested as 'polylistxml').
+        Default value is None.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension. Default value is None.
+    sort : str, callable, or None, optional
+        If not None, the items are written in the order given by
+        ``geoset.sort(key=sort)`` (see `geoutil._geoset.Geoset.sort`),
+        e.g., 'hilbert' so that spatially adjacent items are stored close
+        to each other in the file. `geoset` itself is not modified.
+        Default value is None.
+    **kwargs
+        Additional keyword arguments passed to the ``write`` function of
+        the interface module.
+
+    """
+    if sort is not None:
+        geoset = geoset.sort(key=sort)
+    if format is None:
+        format = _format_from_extension(filename)
+        if format is None:
+            raise ValueError('unable to choose a file format from the '
+                             'file name; specify format')
+    module = _get_module(format)
+    module.write(geoset, filename, compression=compression, **kwargs)
+
+
+# Sniffers for the built-in formats
+# ---------------------------------
+
+
+_XML_ROOT = re.compile(br'<([A-Za-z_][\w.-]*)')
+_XML_SKIP = re.compile(br'\s*(<\?.*?\?>|<!--.*?-->|<!.*?>)', re.S)
+_DS9_START = re.compile(
+    br'^\s*(#\s*Region file format|global\b|image\b|physical\b|fk[45]\b|'
+    br'icrs\b|galactic\b|ecliptic\b|'
+    br'(polygon|circle|box|ellipse|annulus)\s*\()', re.M)
+
+
+def _xml_root(head):
+    """Return the root tag of an XML document from its first bytes."""
+    if head.startswith(b'\xef\xbb\xbf'):
+        head = head[3:]
+    # Skip the XML declaration, comments, and DOCTYPE
+    pos = 0
+    match = _XML_SKIP.match(head, pos)
+    while match is not None:
+        pos = match.end()
+        match = _XML_SKIP.match(head, pos)
+    match = _XML_ROOT.match(head[pos:].lstrip())
+    return match.group(1) if match else None
+
+
+def _sniff_geosetbin(head):
+    return head.startswith(b'GEOSETB1')  # geosetbin.MAGIC
+
+
+def _sniff_fits(head):
+    return head.startswith(b'SIMPLE  =')
+
+
+def _sniff_geosetxml(head):
+    return _xml_root(head) == b'GEOSET'
+
+
+def _sniff_polylistxml(head):
+    return _xml_root(head) == b'POLYLIST'
+
+
+def _sniff_ds9regfile(head):
+    return (_xml_root(head) is None and
+            _DS9_START.search(head) is not None)
+
+
+register_format('geosetbin', 'geoutil.geosetbin', ['.gsb'],
+                _sniff_geosetbin)
+register_format('geosetfits', 'geoutil.geosetfits', ['.fits', '.fit'],
+                _sniff_fits)
+register_format('geosetxml', 'geoutil.geosetxml', ['.xml'],
+                _sniff_geosetxml)
+register_format('polylistxml', 'geoutil.polylistxml', [],
+                _sniff_polylistxml)
+register_format('ds9regfile', 'geoutil.ds9regfile', ['.reg'],
+                _sniff_ds9regfile)
@@ -11,35 +11,112 @@ Functions
 
 =================== ==========================================================
 `validate_poly`     Test if a a polygon is valid and attempt to fix it if not.
+`validate_polys`    Test if polygons are valid and attempt to fix the invalid
+                    ones.
 `poly_pix2world`    Convert polygon vertices from pixel coordinates to
                     world coordinates.
 `poly_world2pix`    Convert polygon vertices from world coordinates to
                     pixel coordinates.
 `poly_translate`    Translate polygon coordinates by dx and dy.
+`parse_header`      Return a FITS header from its raw representation, reusing
+                    previously parsed headers.
+`header_wcs`        Return an `astropy.wcs.WCS` instance for a FITS header.
+`header_footprint`  Return the footprint of an image as a polygon.
 =================== ==========================================================
 
 .. rubric:: Miscellaneous functions
 
 =================== ==========================================================
 `clean_poly`        Remove extraneous geometries from a polygon.
+`clean_polys`       Remove extraneous geometries from a list of polygons.
 `safe_difference`   Wrapper for ``poly1.difference(poly2)`` with some extra
                     functionality to handle strange cases where it fails.
+`batch_difference`  Subtract a list of masks from each of a list of
+                    polygons.
+`union_groups`      Return the union of each of a list of groups of
+                    geometries.
+`clip_polys`        Clip a list of polygons to each of a list of footprints.
+`simplify_polys`    Return simplified versions of a list of polygons.
+`points_in_polys`   Test which points lie inside any of a list of polygons.
+`nearest_polys`     Find the nearest polygons (or groups of polygons) to
+                    points.
+`geom_centroids`    Return the centroids of a list of geometry objects.
+`curve_keys`        Return the positions of points along a space-filling
+                    curve.
 `plot_poly`         Convenience function for plotting polygons.
 `consolidate_polys` Turn a list of polygons into a single, multi-polygon
                     object.
+`map_chunks`        Apply a function to chunks of a list, optionally using a
+                    pool of worker threads or processes.
 =================== ==========================================================
 
 """
-from astropy.io import fits
-from astropy import wcs
+from collections import OrderedDict
+import functools
+import multiprocessing
+from multiprocessing import pool as mp_pool
+
 import numpy as np
-from shapely import geometry, geos
+from shapely import geometry, ops
+from shapely.prepared import prep
+try:
+    from shapely.errors import TopologicalError
+except ImportError:
+    from shapely.geos import TopologicalError
+try:
+    from shapely.errors import GEOSException
+except ImportError:
+    _OVERLAY_ERRORS = (TopologicalError,)
+else:
+    # Shapely 2 raises GEOSException for failed overlay operations
+    _OVERLAY_ERRORS = (TopologicalError, GEOSException)
+try:
+    from shapely import is_valid as _is_valid
+except ImportError:
+    _is_valid = None
+try:
+    from shapely.validation import make_valid as _make_valid
+except ImportError:
+    _make_valid = None
+try:
+    from shapely import area as _area
+    from shapely import get_parts as _get_parts
+    from shapely import get_type_id as _get_type_id
+    from shapely import is_empty as _is_empty
+except ImportError:
+    _get_parts = None
+try:
+    from shapely import contains_xy as _shapely_contains_xy
+    from shapely import intersects_xy as _shapely_intersects_xy
+except ImportError:
+    _shapely_contains_xy = _shapely_intersects_xy = None
+try:
+    from shapely import centroid as _centroid
+    from shapely import get_coordinates as _get_coordinates
+except ImportError:
+    _centroid = None
+try:
+    from shapely import boundary as _boundary
+    from shapely import distance as _distance
+    from shapely import points as _points
+except ImportError:
+    _distance = None
+
+from . import _index
 
 
 # Some FITS headers contain the following keys that cause issues when
 # creating astropy.wcs.WCS instances!
 _PROBLEMATIC_KEYS = ['CPDIS1', 'CPDIS2']
 
+# Geometry type IDs of shapely 2 (see shapely.get_type_id)
+_POLYGON_ID = 3
+_MULTIPOLYGON_ID = 6
+
+# Parsed headers, keyed by their raw representation (see parse_header)
+_HEADER_CACHE = OrderedDict()
+_HEADER_CACHE_SIZE = 128
+
 
 def validate_poly(poly, poly_buffer=0):
     """Test if a a polygon is valid and attempt to fix it if not.
@@ -73,6 +150,88 @@ def validate_poly(poly, poly_buffer=0):
     return poly
 
 
+def _validity_chunk(poly_list):
+    """Return a list of validity flags; used by `validate_polys`."""
+    if _is_valid is not None:
+        return list(_is_valid(poly_list))
+    return [poly.is_valid for poly in poly_list]
+
+
+def _repair_chunk(args_list):
+    """Repair a list of (poly, method, poly_buffer) tuples; used by
+    `validate_polys`.
+
+    """
+    out = []
+    for poly, method, poly_buffer in args_list:
+        if method == 'buffer':
+            out.append(poly.buffer(poly_buffer))
+        else:
+            out.append(_make_valid(poly))
+    return out
+
+
+def validate_polys(poly_list, method='buffer', poly_buffer=0, workers=1,
+                   pool='thread', chunksize=None):
+    """Test if polygons are valid and attempt to fix the invalid ones.
+
+    Bulk version of `validate_poly`. Validity is checked for all polygons
+    at once (vectorized with shapely 2), and only the invalid subset is
+    repaired.
+
+    Parameters
+    ----------
+    poly_list : list
+        List of `shapely.geometry.Polygon` or
+        `shapely.geometry.MultiPolygon` instances (or None, which are
+        skipped).
+    method : {'buffer'|'make_valid'}, optional
+        Repair method. 'buffer' buffers invalid polygons by `poly_buffer`,
+        exactly like `validate_poly`; 'make_valid' uses
+        `shapely.validation.make_valid` (shapely 1.8 or later), which
+        keeps all vertices but may return geometry collections. Default
+        value is 'buffer'.
+    poly_buffer : int or float, optional
+        Buffer distance for the 'buffer' method; see `validate_poly`.
+        Default value is 0.
+    workers : int or None, optional
+        Number of workers; see `map_chunks`. Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool; see `map_chunks`. Default value is 'thread'.
+    chunksize : int or None, optional
+        Number of polygons per task; see `map_chunks`. Default value is
+        None.
+
+    Returns
+    -------
+    out : list
+        The validated polygons, in the same order.
+    report : list
+        List of (index, old type, new type) tuples for the polygons that
+        were repaired, e.g., ``(3, 'Polygon', 'MultiPolygon')``.
+
+    """
+    if method not in ('buffer', 'make_valid'):
+        raise ValueError('unknown repair method: {0!r}'.format(method))
+    if method == 'make_valid' and _make_valid is None:
+        raise ValueError("method 'make_valid' requires shapely 1.8 or later")
+
+    idx = [i for i, poly in enumerate(poly_list) if poly is not None]
+    valid = map_chunks(_validity_chunk, [poly_list[i] for i in idx],
+                       workers=workers, pool=pool, chunksize=chunksize)
+    invalid = [i for i, flag in zip(idx, valid) if not flag]
+    repaired = map_chunks(
+        _repair_chunk, [(poly_list[i], method, poly_buffer) for i in invalid],
+        workers=workers, pool=pool, chunksize=chunksize)
+
+    out = list(poly_list)
+    report = []
+    for i, poly in zip(invalid, repaired):
+        report.append((i, out[i].geom_type, poly.geom_type))
+        out[i] = poly
+    return out, report
+
+
 def poly_pix2world(poly_list, hdr_list):
     """Convert polygon vertices from pixel coordinates to world coordinates.
 
@@ -85,12 +244,12 @@ def poly_pix2world(poly_list, hdr_list):
     poly_list : list
         List of zero or more `shapely.geometry.Polygon` or
         `shapely.geometry.MultiPolygon` instances.
-    hdr_list : `astropy.io.fits.Header`, list, or None
-        Either a single `astropy.io.fits.Header` instance or a list of zero
-        or more. If only one header is given, it is used for all of the
-        coordinate conversions. If a list is given, then there must be one
-        header for each polygon in `poly_list`. If None, then no conversion
-        is performed.
+    hdr_list : `astropy.io.fits.Header`, `astropy.wcs.WCS`, list, or None
+        Either a single `astropy.io.fits.Header` (or `astropy.wcs.WCS`)
+        instance or a list of zero or more. If only one header is given,
+        it is used for all of the coordinate conversions. If a list is
+        given, then there must be one header for each polygon in
+        `poly_list`. If None, then no conversion is performed.
 
     Returns
     -------
@@ -110,20 +269,14 @@ def poly_pix2world(poly_list, hdr_list):
             new_poly = new_poly.difference(new_hole)
         return new_poly
 
-    # Make sure that hdr_list is iterable:
+    # Make sure that hdr_list is iterable (and only build the WCS once if a
+    # single header is given):
     if not isinstance(hdr_list, list):
-        hdr_list = [hdr_list] * len(poly_list)
+        hdr_list = [header_wcs(hdr_list)] * len(poly_list)
 
     new_poly_list = []
     for poly, hdr in zip(poly_list, hdr_list):
-
-        # Remove keys that can cause issues with astropy.wcs:
-        proxy_hdr = fits.Header()
-        for key, val in hdr.items():
-            if key in _PROBLEMATIC_KEYS:
-                continue
-            proxy_hdr[key] = val
-        hwcs = wcs.WCS(proxy_hdr)
+        hwcs = header_wcs(hdr)
 
         if poly.type == 'MultiPolygon':
             new_poly = [convert(subpoly, hwcs) for subpoly in poly]
@@ -146,12 +299,12 @@ def poly_world2pix(poly_list, hdr_list):
     poly_list : list
         List of zero or more `shapely.geometry.Polygon` or
         `shapely.geometry.MultiPolygon` instances.
-    hdr_list : `astropy.io.fits.Header`, list, or None
-        Either a single `astropy.io.fits.Header` instance or a list of zero
-        or more. If only one header is given, it is used for all of the
-        coordinate conversions. If a list is given, then there must be one
-        header for each polygon in `poly_list`. If None, then no conversion
-        is performed.
+    hdr_list : `astropy.io.fits.Header`, `astropy.wcs.WCS`, list, or None
+        Either a single `astropy.io.fits.Header` (or `astropy.wcs.WCS`)
+        instance or a list of zero or more. If only one header is given,
+        it is used for all of the coordinate conversions. If a list is
+        given, then there must be one header for each polygon in
+        `poly_list`. If None, then no conversion is performed.
 
     Returns
     -------
@@ -171,20 +324,14 @@ def poly_world2pix(poly_list, hdr_list):
             new_poly = new_poly.difference(new_hole)
         return new_poly
 
-    # Make sure that hdr_list is iterable:
+    # Make sure that hdr_list is iterable (and only build the WCS once if a
+    # single header is given):
     if not isinstance(hdr_list, list):
-        hdr_list = [hdr_list] * len(poly_list)
+        hdr_list = [header_wcs(hdr_list)] * len(poly_list)
 
     new_poly_list = []
     for poly, hdr in zip(poly_list, hdr_list):
-
-        # Remove keys that can cause issues with astropy.wcs:
-        proxy_hdr = fits.Header()
-        for key, val in hdr.items():
-            if key in _PROBLEMATIC_KEYS:
-                continue
-            proxy_hdr[key] = val
-        hwcs = wcs.WCS(proxy_hdr)
+        hwcs = header_wcs(hdr)
 
         if poly.type == 'MultiPolygon':
             new_poly = [convert(subpoly, hwcs) for subpoly in poly]
@@ -244,6 +391,124 @@ def poly_translate(poly_list, dx_list, dy_list):
     return new_poly_list
 
 
+def parse_header(hdr_src):
+    """Return a FITS header from its raw representation, reusing
+    previously parsed headers.
+
+    Parsing large headers (e.g., with distortion keywords) is slow. Parsed
+    headers are kept in a small cache keyed by the raw representation, and
+    each call returns a copy of the cached header, which is much faster
+    than parsing it again.
+
+    Parameters
+    ----------
+    hdr_src : str or tuple
+        Either a FITS header represented as a single string (80-character
+        cards joined without line breaks, see `Header.fromstring`), or a
+        tuple of (keyword, value) pairs.
+
+    Returns
+    -------
+    out : `astropy.io.fits.Header`
+        The parsed header. Each call returns a new instance, so it can be
+        modified without affecting other callers.
+
+    """
+    # astropy is slow to import, so only do it when a header is needed
+    from astropy.io import fits
+
+    hdr = _HEADER_CACHE.pop(hdr_src, None)
+    if hdr is None:
+        if isinstance(hdr_src, tuple):
+            hdr = fits.Header(list(hdr_src))
+        else:
+            hdr = fits.Header.fromstring(hdr_src)
+        while len(_HEADER_CACHE) >= _HEADER_CACHE_SIZE:
+            _HEADER_CACHE.popitem(last=False)
+    _HEADER_CACHE[hdr_src] = hdr
+    return hdr.copy()
+
+
+def header_wcs(hdr):
+    """Return an `astropy.wcs.WCS` instance for a FITS header.
+
+    Keywords that are known to cause issues with `astropy.wcs` are removed
+    from (a copy of) the header first.
+
+    Parameters
+    ----------
+    hdr : `astropy.io.fits.Header` or `astropy.wcs.WCS`
+        FITS header with WCS information. A `WCS` instance is returned
+        unchanged.
+
+    Returns
+    -------
+    out : `astropy.wcs.WCS`
+
+    """
+    from astropy.io import fits
+    from astropy import wcs
+
+    if isinstance(hdr, wcs.WCS):
+        return hdr
+
+    # Remove keys that can cause issues with astropy.wcs:
+    proxy_hdr = fits.Header()
+    for key, val in hdr.items():
+        if key in _PROBLEMATIC_KEYS:
+            continue
+        proxy_hdr[key] = val
+    return wcs.WCS(proxy_hdr)
+
+
+def header_footprint(hdr, world=True, segments=8):
+    """Return the footprint of an image as a polygon.
+
+    The footprint is the outer boundary of the pixels of the image, i.e.
+    the box from 0.5 to ``NAXISn + 0.5`` in (1-based) pixel coordinates,
+    as used by `poly_pix2world` and `poly_world2pix`.
+
+    Parameters
+    ----------
+    hdr : `astropy.io.fits.Header` or `astropy.wcs.WCS`
+        FITS image header with NAXIS1 and NAXIS2 keywords (and WCS
+        information if `world` is True), or a `WCS` instance with a known
+        `pixel_shape`.
+    world : bool, optional
+        If True, the footprint is converted to world coordinates. Otherwise
+        it is returned in pixel coordinates. Default value is True.
+    segments : int, optional
+        Number of segments into which each edge of the image is divided
+        before conversion to world coordinates, so that the footprint
+        follows the curvature of the projection. Default value is 8.
+
+    Returns
+    -------
+    out : `shapely.geometry.Polygon`
+
+    """
+    if hasattr(hdr, 'pixel_shape'):  # astropy.wcs.WCS
+        shape = hdr.pixel_shape
+    elif 'NAXIS1' in hdr and 'NAXIS2' in hdr:
+        shape = (hdr['NAXIS1'], hdr['NAXIS2'])
+    else:
+        shape = None
+    if shape is None:
+        raise ValueError('the image dimensions are unknown')
+
+    x0, y0, x1, y1 = 0.5, 0.5, shape[0] + 0.5, shape[1] + 0.5
+    if not world:
+        return geometry.box(x0, y0, x1, y1)
+
+    t = np.linspace(0, 1, segments, endpoint=False)
+    x = np.concatenate((x0 + (x1-x0)*t, np.full_like(t, x1),
+                        x1 - (x1-x0)*t, np.full_like(t, x0)))
+    y = np.concatenate((np.full_like(t, y0), y0 + (y1-y0)*t,
+                        np.full_like(t, y1), y1 - (y1-y0)*t))
+    lonlat = header_wcs(hdr).wcs_pix2world(np.column_stack((x, y)), 1)
+    return geometry.Polygon(lonlat.tolist())
+
+
 # Miscellaneous functions
 # -----------------------
 
@@ -255,12 +520,19 @@ def clean_poly(poly):
     in some extraneous objects, e.g., an empty polygon embedded in a
     `MultiPolygon`. This function looks for such objects and removes them.
 
+    See `clean_polys` for a bulk version, which is also used here for
+    multi-part geometries with shapely 2.
+
     """
-    if poly.type == 'Polygon':
+    if _get_parts is not None and poly.geom_type != 'Polygon':
+        return clean_polys([poly])[0]
+    if poly.geom_type == 'Polygon':
         poly = [poly]
+    else:
+        poly = getattr(poly, 'geoms', [])
     poly_list = []
     for p in poly:
-        if (p.type != 'Polygon') or p.is_empty or (p.area == 0):
+        if (p.geom_type != 'Polygon') or p.is_empty or (p.area == 0):
             continue
         poly_list.append(p)
     if len(poly_list) > 1:
@@ -271,6 +543,61 @@ def clean_poly(poly):
         return geometry.Polygon()
 
 
+def clean_polys(poly_list):
+    """Remove extraneous geometries from a list of polygons.
+
+    Bulk version of `clean_poly` with equivalent results. With shapely 2,
+    the parts of all geometries are extracted at once and their types,
+    emptiness, and areas are computed with vectorized functions. Geometries
+    from which nothing needs to be removed are returned as-is instead of
+    being rebuilt.
+
+    Parameters
+    ----------
+    poly_list : list
+        List of `shapely.geometry.Polygon` or
+        `shapely.geometry.MultiPolygon` instances (or None).
+
+    Returns
+    -------
+    out : list
+        The cleaned polygons (None for None members).
+
+    """
+    if _get_parts is None:
+        return [None if poly is None else clean_poly(poly)
+                for poly in poly_list]
+
+    geoms = np.empty(len(poly_list), dtype=object)
+    geoms[:] = poly_list
+    parts, index = _get_parts(geoms, return_index=True)
+    keep = ((_get_type_id(parts) == _POLYGON_ID) & ~_is_empty(parts) &
+            (_area(parts) != 0))
+    nparts = np.bincount(index, minlength=len(geoms))
+    nkeep = np.bincount(index, weights=keep, minlength=len(geoms))
+    offsets = np.concatenate(([0], np.cumsum(nparts)))
+    type_ids = _get_type_id(geoms)
+
+    out = []
+    for i, poly in enumerate(poly_list):
+        if poly is None:
+            out.append(None)
+        elif nkeep[i] == nparts[i] and (
+                type_ids[i] == _POLYGON_ID or
+                (type_ids[i] == _MULTIPOLYGON_ID and nkeep[i] > 1)):
+            out.append(poly)
+        elif nkeep[i] == 0:
+            out.append(geometry.Polygon())
+        else:
+            sl = slice(offsets[i], offsets[i+1])
+            kept = parts[sl][keep[sl]]
+            if len(kept) == 1:
+                out.append(kept[0])
+            else:
+                out.append(geometry.MultiPolygon(list(kept)))
+    return out
+
+
 def safe_difference(poly1, poly2):
     """Wrapper for ``poly1.difference(poly2)`` with some extra
     functionality to handle strange cases where it fails.
@@ -278,17 +605,696 @@ def safe_difference(poly1, poly2):
     """
     try:
         poly = poly1.difference(poly2)
-    except geos.TopologicalError:
+    except _OVERLAY_ERRORS:
         # Sometimes the subtraction of multipolygons fails for unknown reasons,
         # but works if each subpolygon is subtracted individually
-        if poly2.type == 'Polygon':
+        if poly2.geom_type == 'Polygon':
             poly2 = [poly2]
+        else:
+            poly2 = poly2.geoms
         poly = poly1.union(geometry.Polygon())  # Make a copy of poly1
         for p in poly2:
             poly = poly.difference(p)
     return clean_poly(poly)
 
 
+def _union_chunk(geom_groups):
+    """Return the cascaded union of each list of geometries, or None for
+    empty lists; used by `union_groups`.
+
+    """
+    return [ops.unary_union(group) if group else None
+            for group in geom_groups]
+
+
+def union_groups(geom_groups, workers=1, pool='thread', chunksize=None):
+    """Return the union of each of a list of groups of geometries.
+
+    Each group is merged with a single cascaded `unary_union`, which is
+    much faster than a pairwise `union` loop for large groups.
+
+    Parameters
+    ----------
+    geom_groups : list
+        List of lists of `shapely.geometry` objects. None members are
+        ignored.
+    workers : int or None, optional
+        Number of workers; see `map_chunks`. Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool; see `map_chunks`. Default value is 'thread'.
+    chunksize : int or None, optional
+        Number of groups per task; see `map_chunks`. Default value is
+        None.
+
+    Returns
+    -------
+    out : list
+        The union of each group, or None for groups without geometries.
+
+    """
+    geom_groups = [[geom for geom in group if geom is not None]
+                   for group in geom_groups]
+    return map_chunks(_union_chunk, geom_groups, workers=workers, pool=pool,
+                      chunksize=chunksize)
+
+
+def _difference_chunk(pairs):
+    """Apply `safe_difference` to a list of (target, masks) pairs; used by
+    `batch_difference`.
+
+    """
+    out = []
+    for target, masks in pairs:
+        if target is None:
+            out.append(None)
+        elif not masks:
+            out.append(clean_poly(target))
+        elif len(masks) == 1:
+            out.append(safe_difference(target, masks[0]))
+        else:
+            try:
+                mask = ops.unary_union(masks)
+            except _OVERLAY_ERRORS:
+                # Subtract the masks one at a time instead
+                poly = target
+                for mask in masks:
+                    poly = safe_difference(poly, mask)
+                out.append(poly)
+            else:
+                out.append(safe_difference(target, mask))
+    return out
+
+
+def batch_difference(targets, masks, workers=1, pool='thread',
+                     chunksize=None):
+    """Subtract a list of masks from each of a list of polygons.
+
+    The result for each target is the same as subtracting all masks from
+    it one at a time with `safe_difference`, but only the masks that
+    actually intersect the target are used: candidates are found with a
+    bounding box index (see `geoutil._index.BoundsIndex`) and checked
+    against a prepared version of the target. The overlapping masks of
+    each target are merged with a single cascaded `unary_union` and
+    subtracted at once; if that fails (`shapely.errors.TopologicalError`,
+    or `shapely.errors.GEOSException` in shapely 2), the masks or their
+    parts are subtracted one at a time instead.
+
+    Parameters
+    ----------
+    targets : list
+        List of `shapely.geometry.Polygon` or
+        `shapely.geometry.MultiPolygon` instances (or None) from which the
+        masks are subtracted.
+    masks : list
+        List of `shapely.geometry.Polygon` or
+        `shapely.geometry.MultiPolygon` instances to subtract.
+    workers : int or None, optional
+        Number of workers; see `map_chunks`. Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool; see `map_chunks`. Default value is 'thread'.
+    chunksize : int or None, optional
+        Number of targets per task; see `map_chunks`. Default value is
+        None.
+
+    Returns
+    -------
+    out : list
+        The targets with the masks subtracted, cleaned with `clean_poly`
+        (None for None targets).
+
+    """
+    masks = [mask for mask in masks if mask is not None]
+    target_bounds = _index.geom_bounds(targets)
+    qidx, idx = _index.BoundsIndex.from_geoms(masks).query_bulk(
+        target_bounds)
+
+    overlapping = [[] for target in targets]
+    for i, j in zip(qidx, idx):
+        overlapping[i].append(j)
+    pairs = []
+    for target, candidates in zip(targets, overlapping):
+        if candidates:
+            prepared = prep(target)
+            candidates = [masks[j] for j in sorted(candidates)
+                          if prepared.intersects(masks[j])]
+        pairs.append((target, candidates))
+
+    return map_chunks(_difference_chunk, pairs, workers=workers, pool=pool,
+                      chunksize=chunksize)
+
+
+def _clip_chunk(pairs):
+    """Return the intersection of each (polygon, footprint) pair, cleaned
+    with `clean_polys`; used by `clip_polys`.
+
+    """
+    return clean_polys([poly.intersection(footprint)
+                        for poly, footprint in pairs])
+
+
+def clip_polys(poly_list, footprint_list, workers=1, pool='thread',
+               chunksize=None):
+    """Clip a list of polygons to each of a list of footprints.
+
+    All footprints are handled in a single pass: candidate (footprint,
+    polygon) pairs are found with one bulk query of a bounding box index
+    (see `geoutil._index.BoundsIndex`) and tested against prepared
+    footprints. Polygons entirely inside a footprint are kept as-is and
+    polygons outside are dropped, so only those crossing the boundary of a
+    footprint are intersected with it.
+
+    Parameters
+    ----------
+    poly_list : list
+        List of `shapely.geometry.Polygon` or
+        `shapely.geometry.MultiPolygon` instances (or None, which are
+        always dropped).
+    footprint_list : list
+        List of `shapely.geometry.Polygon` instances (e.g., from
+        `header_footprint`).
+    workers : int or None, optional
+        Number of workers used for the intersections; see `map_chunks`.
+        Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool; see `map_chunks`. Default value is 'thread'.
+    chunksize : int or None, optional
+        Number of intersections per task; see `map_chunks`. Default value
+        is None.
+
+    Returns
+    -------
+    out : list
+        For each footprint, a list of (i, poly) tuples sorted by `i`, where
+        `i` is the index of a polygon in `poly_list` that overlaps the
+        footprint and `poly` is the part of it inside the footprint
+        (cleaned with `clean_polys`, and the original object if it lies
+        entirely inside). Polygons that only touch a footprint are
+        omitted.
+
+    """
+    fidx, idx = _index.BoundsIndex.from_geoms(poly_list).query_bulk(
+        _index.geom_bounds(footprint_list))
+
+    out = [[] for footprint in footprint_list]
+    prepared = {}
+    crossing = []
+    for f, i in zip(fidx, idx):
+        if f not in prepared:
+            prepared[f] = prep(footprint_list[f])
+        poly = poly_list[i]
+        if prepared[f].contains(poly):
+            out[f].append((i, poly))
+        elif prepared[f].intersects(poly):
+            crossing.append((f, i))
+
+    clipped = map_chunks(
+        _clip_chunk, [(poly_list[i], footprint_list[f]) for f, i in crossing],
+        workers=workers, pool=pool, chunksize=chunksize)
+    for (f, i), poly in zip(crossing, clipped):
+        if not poly.is_empty:
+            out[f].append((i, poly))
+    return [sorted(pairs, key=lambda pair: pair[0]) for pairs in out]
+
+
+def _part_rings(geom):
+    """Return the number of interior rings of each part of a geometry."""
+    if geom.is_empty:
+        return ()
+    parts = geom.geoms if hasattr(geom, 'geoms') else [geom]
+    return tuple(len(getattr(part, 'interiors', ())) for part in parts)
+
+
+def _simplify_chunk(poly_list, tolerance=0, preserve_topology=True):
+    """Simplify a list of polygons; used by `simplify_polys`."""
+    out = []
+    for poly in poly_list:
+        if poly is None:
+            out.append(None)
+            continue
+        simple = poly.simplify(tolerance, preserve_topology=preserve_topology)
+        if _part_rings(simple) != _part_rings(poly):
+            # A part or hole collapsed; keep the original
+            simple = poly
+        out.append(simple)
+    return out
+
+
+def simplify_polys(poly_list, tolerance, preserve_topology=True, workers=1,
+                   pool='thread', chunksize=None):
+    """Return simplified versions of a list of polygons.
+
+    Polygons are simplified with the Douglas-Peucker algorithm (see the
+    `simplify` method of `shapely.geometry` objects), so the boundary of
+    each simplified polygon lies approximately within `tolerance` of the
+    original boundary. Polygons in which simplification would remove a
+    part or a hole are returned unsimplified.
+
+    Parameters
+    ----------
+    poly_list : list
+        List of `shapely.geometry.Polygon` or
+        `shapely.geometry.MultiPolygon` instances (or None).
+    tolerance : float
+        Simplification tolerance, i.e., the approximate maximum distance
+        between the original and simplified boundaries.
+    preserve_topology : bool, optional
+        If True, the simplified polygons are guaranteed to be valid (but
+        retain more vertices). Default value is True.
+    workers : int or None, optional
+        Number of workers; see `map_chunks`. Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool; see `map_chunks`. Default value is 'thread'.
+    chunksize : int or None, optional
+        Number of polygons per task; see `map_chunks`. Default value is
+        None.
+
+    Returns
+    -------
+    out : list
+        The simplified polygons (None for None members).
+
+    """
+    func = functools.partial(_simplify_chunk, tolerance=tolerance,
+                             preserve_topology=preserve_topology)
+    return map_chunks(func, poly_list, workers=workers, pool=pool,
+                      chunksize=chunksize)
+
+
+def points_in_polys(x, y, poly_list, refine_list=None, diff_list=None,
+                    chunksize=1000000):
+    """Test which points lie inside any of a list of polygons.
+
+    Candidate point-polygon pairs are found with a bounding box index (see
+    `geoutil._index.BoundsIndex`) and tested with vectorized predicates
+    (with shapely 2). `poly_list` may contain simplified versions of the
+    polygons in `refine_list` (see `simplify_polys`); then only the
+    candidates lying in the symmetric difference of a simplified and a
+    full-resolution polygon (given by `diff_list`), where the two may
+    disagree, are tested again at full resolution.
+
+    Parameters
+    ----------
+    x, y : array_like
+        Point coordinates.
+    poly_list : list
+        List of `shapely.geometry.Polygon` or
+        `shapely.geometry.MultiPolygon` instances (or None).
+    refine_list : list or None, optional
+        Full-resolution versions of the polygons in `poly_list`. If None,
+        the polygons in `poly_list` are used as-is. Default value is None.
+    diff_list : list or None, optional
+        Symmetric differences of the polygons in `poly_list` and
+        `refine_list`; required if `refine_list` is given. Default value is
+        None.
+    chunksize : int, optional
+        Number of points processed at once; bounds memory usage. Default
+        value is 1000000.
+
+    Returns
+    -------
+    out : array
+        Boolean array, True for points inside (not on the boundary of) at
+        least one polygon.
+
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    out = np.zeros(len(x), dtype=bool)
+    poly_array = _object_array(poly_list)
+    bounds = _index.geom_bounds(poly_list)
+    if refine_list is not None:
+        refine_array = _object_array(refine_list)
+        diff_array = _object_array(diff_list)
+        # Full-resolution polygons may extend beyond the simplified ones
+        full_bounds = _index.geom_bounds(refine_list)
+        bounds = np.column_stack((np.fmin(bounds[:,:2], full_bounds[:,:2]),
+                                  np.fmax(bounds[:,2:], full_bounds[:,2:])))
+
+    for start in range(0, len(x), chunksize):
+        xc, yc = x[start:start+chunksize], y[start:start+chunksize]
+        index = _index.BoundsIndex(np.column_stack((xc, yc, xc, yc)))
+        pidx, idx = index.query_bulk(bounds)
+        inside = _contains_xy(poly_array[pidx], xc[idx], yc[idx])
+        if refine_list is not None:
+            diff = diff_array[pidx]
+            has_diff = np.array([geom is not None and not geom.is_empty
+                                 for geom in diff], dtype=bool)
+            near = np.zeros(len(idx), dtype=bool)
+            near[has_diff] = _intersects_xy(diff[has_diff], xc[idx[has_diff]],
+                                            yc[idx[has_diff]])
+            inside[near] = _contains_xy(refine_array[pidx[near]],
+                                        xc[idx[near]], yc[idx[near]])
+        out[start + idx[inside]] = True
+    return out
+
+
+def _box_distances(bounds, x, y):
+    """Return lower and upper bounds of the distances between points and
+    geometries with the given bounding boxes.
+
+    The lower bound is the distance to the box. A geometry touches all four
+    sides of its box, so the distance to the farthest end of any side is an
+    upper bound.
+
+    """
+    dx = np.maximum(np.maximum(bounds[:,0] - x, x - bounds[:,2]), 0)
+    dy = np.maximum(np.maximum(bounds[:,1] - y, y - bounds[:,3]), 0)
+    lower = np.hypot(dx, dy)
+    fx = np.maximum(np.abs(x - bounds[:,0]), np.abs(x - bounds[:,2]))
+    fy = np.maximum(np.abs(y - bounds[:,1]), np.abs(y - bounds[:,3]))
+    nx = np.minimum(np.abs(x - bounds[:,0]), np.abs(x - bounds[:,2]))
+    ny = np.minimum(np.abs(y - bounds[:,1]), np.abs(y - bounds[:,3]))
+    upper = np.minimum(np.hypot(fx, ny), np.hypot(nx, fy))
+    return lower, upper
+
+
+def _group_min(qidx, group, values, ngroup_ids):
+    """Return the minimum value of each (point, group) pair, sorted by
+    point and then by value, with the rank of each group for its point.
+
+    """
+    key = qidx.astype(np.int64) * ngroup_ids + group
+    order = np.argsort(key, kind='stable')
+    key, values = key[order], values[order]
+    first = np.ones(len(key), dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+    starts = np.nonzero(first)[0]
+    values = (np.minimum.reduceat(values, starts) if len(starts) else
+              values[starts])
+    qidx, group = key[starts] // ngroup_ids, key[starts] % ngroup_ids
+    order = np.lexsort((values, qidx))
+    qidx, group, values = qidx[order], group[order], values[order]
+    rank = np.arange(len(qidx)) - np.searchsorted(qidx, qidx, 'left')
+    return qidx, group, values, rank
+
+
+def _nearest_block(x, y, geom_array, bounds, group_ids, ngroups, index, k,
+                   radius, max_distance):
+    """Find the `k` nearest groups of geometries to each point; used by
+    `nearest_polys`.
+
+    Candidates are the geometries whose boxes lie within a search radius of
+    each point. Candidates farther than the `k`-th smallest upper bound of
+    the group distances (see `_box_distances`) are discarded before any
+    exact distance is computed. The `k` best candidates are exact as soon
+    as the `k`-th distance is within the radius; otherwise the search is
+    repeated with that upper bound as the radius, or with twice the radius
+    for points with fewer than `k` candidate groups, until all groups have
+    been found or `max_distance` is reached.
+
+    """
+    n = len(x)
+    ngroup_ids = group_ids.max() + 1 if len(group_ids) else 1
+    idx_out = np.full((n, k), -1, dtype=int)
+    dist_out = np.full((n, k), np.inf)
+    rad = np.full(n, float(radius))
+    todo = np.arange(n)
+    while len(todo):
+        if max_distance is not None:
+            rad[todo] = np.minimum(rad[todo], max_distance)
+        xt, yt, r = x[todo], y[todo], rad[todo]
+        qidx, gidx = index.query_bulk(
+            np.column_stack((xt - r, yt - r, xt + r, yt + r)))
+        lower, upper = _box_distances(bounds[gidx], xt[qidx], yt[qidx])
+
+        # Discard candidates that cannot be among the k nearest groups
+        q, g, group_upper, rank = _group_min(qidx, group_ids[gidx], upper,
+                                             ngroup_ids)
+        count = np.bincount(q, minlength=len(todo))
+        kth_upper = np.full(len(todo), np.inf)
+        kth_upper[q[rank == k-1]] = group_upper[rank == k-1]
+        keep = lower <= kth_upper[qidx]
+        qidx, gidx = qidx[keep], gidx[keep]
+
+        dist = _distance_xy(geom_array[gidx], xt[qidx], yt[qidx])
+        qidx, group, dist, rank = _group_min(qidx, group_ids[gidx], dist,
+                                             ngroup_ids)
+        kth = np.full(len(todo), np.inf)
+        kth[qidx[rank == k-1]] = dist[rank == k-1]
+
+        done = ((kth <= r) | (count >= ngroups) | np.isnan(xt) |
+                np.isnan(yt))
+        if max_distance is not None:
+            done |= r >= max_distance
+        keep = (rank < k) & done[qidx]
+        if max_distance is not None:
+            keep &= dist <= max_distance
+        idx_out[todo[qidx[keep]], rank[keep]] = group[keep]
+        dist_out[todo[qidx[keep]], rank[keep]] = dist[keep]
+        rad[todo] = np.where(count >= k, kth_upper, 2 * r)
+        todo = todo[~done]
+    return idx_out, dist_out
+
+
+def _nearest_chunk(ranges, x=None, y=None, **kwargs):
+    """Apply `_nearest_block` to a list of (start, stop) ranges of points;
+    used by `nearest_polys`.
+
+    """
+    return [_nearest_block(x[start:stop], y[start:stop], **kwargs)
+            for start, stop in ranges]
+
+
+def nearest_polys(x, y, poly_list, k=1, max_distance=None, boundary=False,
+                  group_ids=None, workers=1, pool='thread', chunksize=100000):
+    """Find the nearest polygons (or groups of polygons) to points.
+
+    Candidates are found with a bounding box index of the polygons (see
+    `geoutil._index.BoundsIndex`) queried with boxes around the points,
+    and their distances are computed with vectorized functions (with
+    shapely 2). Candidates that are certainly farther than the `k`-th
+    nearest polygon, judging by their bounding boxes, are discarded before
+    computing distances. The search radius starts at about the typical
+    spacing of the polygons and is only extended for the points whose `k`
+    nearest polygons are not all within it.
+
+    Parameters
+    ----------
+    x, y : array_like
+        Point coordinates.
+    poly_list : list
+        List of `shapely.geometry` objects (or None, which are ignored).
+    k : int, optional
+        Number of nearest polygons (or groups) to find. Default value is 1.
+    max_distance : float or None, optional
+        If given, only polygons within this distance are returned. Limiting
+        the distance makes searches for distant points much faster. Default
+        value is None.
+    boundary : bool, optional
+        If True, distances are measured to the boundaries of the polygons,
+        so points inside a polygon have a positive distance to it.
+        Otherwise, the distance from a point inside a polygon is 0. Default
+        value is False.
+    group_ids : array_like or None, optional
+        Index of the group of each polygon (e.g., the index of the item of
+        each geo of a geoset), between 0 and the number of groups minus 1.
+        The distance to a group is the minimum distance to its polygons. If
+        None, each polygon is a group of its own. Default value is None.
+    workers : int or None, optional
+        Number of workers; see `map_chunks`. Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool; see `map_chunks`. Default value is 'thread'.
+    chunksize : int, optional
+        Number of points processed at once; bounds memory usage. Default
+        value is 100000.
+
+    Returns
+    -------
+    idx : array
+        Indices of the nearest polygons (or groups) of each point, sorted
+        by distance; -1 where fewer than `k` were found. As with
+        `scipy.spatial.cKDTree.query`, the shape is (N,) if `k` is 1 and
+        (N, `k`) otherwise.
+    dist : array
+        The corresponding distances; inf where fewer than `k` polygons were
+        found.
+
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if group_ids is None:
+        group_ids = np.arange(len(poly_list))
+    group_ids = np.asarray(group_ids, dtype=int).reshape(-1)
+
+    geom_array = _object_array(poly_list)
+    if boundary:
+        if _distance is not None:
+            geom_array = _boundary(geom_array)
+        else:
+            geom_array = _object_array(
+                [None if geom is None else geom.boundary
+                 for geom in poly_list])
+    bounds = _index.geom_bounds(geom_array)
+    valid = ~np.isnan(bounds).any(axis=1)
+    ngroups = len(np.unique(group_ids[valid]))
+
+    if ngroups == 0:
+        radius = 1.
+    else:
+        extent = (np.nanmax(bounds[:,2:], axis=0) -
+                  np.nanmin(bounds[:,:2], axis=0))
+        area = extent[0] * extent[1] or max(extent.max(), 1.)**2
+        radius = max(np.sqrt(area * k / ngroups) / 2, np.finfo(float).eps)
+
+    ranges = [(start, min(start + chunksize, len(x)))
+              for start in range(0, len(x), chunksize)]
+    results = map_chunks(
+        functools.partial(_nearest_chunk, x=x, y=y, geom_array=geom_array,
+                          bounds=bounds, group_ids=group_ids,
+                          ngroups=ngroups,
+                          index=_index.BoundsIndex(bounds), k=k,
+                          radius=radius, max_distance=max_distance),
+        ranges, workers=workers, pool=pool, chunksize=1)
+
+    idx = np.concatenate([r[0] for r in results] + [np.zeros((0, k), int)])
+    dist = np.concatenate([r[1] for r in results] + [np.zeros((0, k))])
+    if k == 1:
+        return idx[:,0], dist[:,0]
+    return idx, dist
+
+
+def geom_centroids(geom_list):
+    """Return the centroids of a list of geometry objects.
+
+    Parameters
+    ----------
+    geom_list : list
+        List of zero or more `shapely.geometry` objects (or None).
+
+    Returns
+    -------
+    out : array
+        Array of shape (N, 2) with the x and y coordinates of the
+        centroids. Rows for None or empty geometries are NaN.
+
+    """
+    out = np.full((len(geom_list), 2), np.nan)
+    geom_array = _object_array(geom_list)
+    valid = np.array([geom is not None and not geom.is_empty
+                      for geom in geom_list], dtype=bool)
+    if _centroid is not None:
+        out[valid] = _get_coordinates(_centroid(geom_array[valid]))
+    else:
+        for i in np.nonzero(valid)[0]:
+            out[i] = geom_array[i].centroid.coords[0]
+    return out
+
+
+def _hilbert(ix, iy, order):
+    """Return the Hilbert curve distances of integer grid coordinates."""
+    n = 1 << order
+    d = np.zeros(len(ix), dtype=np.int64)
+    s = n >> 1
+    while s:
+        rx = (ix & s) > 0
+        ry = (iy & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so that the curve continues in it
+        flip = ~ry & rx
+        ix = np.where(flip, n - 1 - ix, ix)
+        iy = np.where(flip, n - 1 - iy, iy)
+        ix, iy = np.where(ry, ix, iy), np.where(ry, iy, ix)
+        s >>= 1
+    return d
+
+
+def _morton(ix, iy, order):
+    """Return the Morton (Z-order) curve positions of integer grid
+    coordinates.
+
+    """
+    d = np.zeros(len(ix), dtype=np.int64)
+    for bit in range(order):
+        d |= ((ix >> bit) & 1) << (2*bit)
+        d |= ((iy >> bit) & 1) << (2*bit + 1)
+    return d
+
+
+def curve_keys(x, y, curve='hilbert', order=16, bounds=None):
+    """Return the positions of points along a space-filling curve.
+
+    Sorting by these keys puts points that are close to each other in
+    space close to each other in the sorted order. The points are mapped
+    to a grid of ``2**order`` by ``2**order`` cells covering `bounds`, and
+    the position of each cell along the curve is computed with vectorized
+    bit operations.
+
+    Parameters
+    ----------
+    x, y : array_like
+        Point coordinates.
+    curve : {'hilbert'|'morton'}, optional
+        Space-filling curve. The Hilbert curve preserves locality better;
+        the Morton (Z-order) curve is slightly faster to compute. Default
+        value is 'hilbert'.
+    order : int, optional
+        Number of bits per coordinate, at most 31. Default value is 16.
+    bounds : tuple or None, optional
+        Extent of the grid, (minx, miny, maxx, maxy). If None, the extent
+        of the points is used. Default value is None.
+
+    Returns
+    -------
+    out : array
+        Integer keys; -1 for points with NaN coordinates.
+
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    valid = ~(np.isnan(x) | np.isnan(y))
+    out = np.full(len(x), -1, dtype=np.int64)
+    if not valid.any():
+        return out
+    if bounds is None:
+        bounds = (x[valid].min(), y[valid].min(), x[valid].max(),
+                  y[valid].max())
+    if curve == 'hilbert':
+        func = _hilbert
+    elif curve == 'morton':
+        func = _morton
+    else:
+        raise ValueError('unknown curve: {0!r}'.format(curve))
+
+    ncells = (1 << order) - 1
+    ix, iy = [
+        np.clip(np.round((c[valid] - lo) / ((hi - lo) or 1.) * ncells),
+                0, ncells).astype(np.int64)
+        for c, lo, hi in ((x, bounds[0], bounds[2]),
+                          (y, bounds[1], bounds[3]))]
+    out[valid] = func(ix, iy, order)
+    return out
+
+
+def _distance_xy(geom_array, x, y):
+    """Element-wise distances between geometries and points."""
+    if _distance is not None:
+        return _distance(geom_array, _points(x, y))
+    return np.array([geom.distance(geometry.Point(xi, yi))
+                     for geom, xi, yi in zip(geom_array, x, y)], dtype=float)
+
+
+def _object_array(geom_list):
+    out = np.empty(len(geom_list), dtype=object)
+    out[:] = geom_list
+    return out
+
+
+def _contains_xy(poly_array, x, y):
+    """Element-wise test if points lie inside polygons."""
+    if _shapely_contains_xy is not None:
+        return _shapely_contains_xy(poly_array, x, y)
+    return np.array([poly.contains(geometry.Point(xi, yi))
+                     for poly, xi, yi in zip(poly_array, x, y)], dtype=bool)
+
+
+def _intersects_xy(poly_array, x, y):
+    """Element-wise test if points lie inside or on polygons."""
+    if _shapely_intersects_xy is not None:
+        return _shapely_intersects_xy(poly_array, x, y)
+    return np.array([poly.intersects(geometry.Point(xi, yi))
+                     for poly, xi, yi in zip(poly_array, x, y)], dtype=bool)
+
+
 def plot_poly(poly, ax=None, f='k-'):
     """Convenience function for plotting polygons.
 
@@ -297,8 +1303,10 @@ def plot_poly(poly, ax=None, f='k-'):
     """
     from matplotlib import pyplot as plt
 
-    if poly.type == 'Polygon':
+    if poly.geom_type == 'Polygon':
         poly = [poly]
+    else:
+        poly = poly.geoms
     for p in poly:
         x, y = np.array(p.exterior.coords).T
         if ax:
@@ -320,7 +1328,9 @@ def consolidate_polys(poly_list, hole_list=None):
 
     After forming the main polygon from `poly_list`, polygons in `hole_list`
     are subtracted from it to create holes. If a hole does not actually lie
-    inside of the main polygon, it is added instead of subtracted.
+    inside of the main polygon, it is added instead of subtracted. If the
+    polygons in `poly_list` overlap, they are merged before the holes are
+    applied.
 
     Parameters
     ----------
@@ -331,6 +1341,16 @@ def consolidate_polys(poly_list, hole_list=None):
         List of zero or more polygons defining holes. Default is None (no
         holes).
 
+    Notes
+    -----
+    If the holes do not overlap each other (the usual case), they are all
+    classified against the main polygon using a prepared geometry, and are
+    then subtracted and added with one `difference` and one cascaded
+    `unary_union`. Otherwise, holes are processed one at a time because the
+    classification of each hole depends on the preceding ones. Both ways
+    give geometrically equal results (see `equals`), but the order of the
+    parts and rings and the starting vertex of each ring may differ.
+
     Returns
     -------
     out : `shapely.geometry.MultiPolygon`, `shapely.geometry.Polygon`, or None
@@ -346,13 +1366,123 @@ def consolidate_polys(poly_list, hole_list=None):
     else:
         poly = geometry.MultiPolygon(poly_list)
 
-    if hole_list is not None:
-        for hole in hole_list:
-            if hole.within(poly):
-                poly = poly.difference(hole)
-            else:
-                poly = poly.union(hole)
+    if hole_list:
+        hole_list = list(hole_list)
+        if len(poly_list) > 1 and not poly.is_valid:
+            # Overlay operations fail for overlapping shells, so merge them
+            poly = ops.unary_union(poly_list)
+        if poly.is_valid and _interiors_disjoint(hole_list):
+            poly = _apply_holes(poly, hole_list)
+        else:
+            # Each hole depends on the result of the previous ones
+            for hole in hole_list:
+                if hole.within(poly):
+                    poly = poly.difference(hole)
+                else:
+                    poly = poly.union(hole)
 
     if poly.is_empty:
         poly = None
     return poly
+
+
+def _interiors_disjoint(geom_list):
+    """Return True if no two geometries in the list have overlapping
+    interiors (touching boundaries are allowed).
+
+    """
+    bounds = _index.geom_bounds(geom_list)
+    qidx, idx = _index.BoundsIndex(bounds).query_bulk(bounds)
+    for i, j in zip(qidx, idx):
+        if i < j:
+            geom1, geom2 = geom_list[i], geom_list[j]
+            if geom1.intersects(geom2) and not geom1.touches(geom2):
+                return False
+    return True
+
+
+def _apply_holes(poly, hole_list):
+    """Subtract the holes lying within `poly` and add all other holes, in
+    bulk.
+
+    Geometrically equal to applying the holes one at a time (see
+    `consolidate_polys`) if their interiors are disjoint: subtracting or
+    adding one hole then cannot change whether another hole lies within the
+    polygon, so all holes can be classified against the original polygon.
+
+    """
+    prepared = prep(poly)
+    inner, outer = [], []
+    for hole in hole_list:
+        if prepared.contains(hole):  # Same as hole.within(poly)
+            inner.append(hole)
+        else:
+            outer.append(hole)
+    if inner:
+        poly = poly.difference(ops.unary_union(inner))
+    if outer:
+        poly = ops.unary_union([poly] + outer)
+    return poly
+
+
+def map_chunks(func, seq, workers=1, pool='thread', chunksize=None):
+    """Apply a function to chunks of a list, optionally using a pool of
+    worker threads or processes.
+
+    `seq` is split into consecutive chunks and `func` is called once per
+    chunk. The results are concatenated in the original order, so the
+    output is the same regardless of the number of workers.
+
+    Parameters
+    ----------
+    func : callable
+        Function that takes a list (a chunk of `seq`) and returns a list.
+        When using a process pool, `func` must be picklable, i.e. defined
+        at the top level of a module.
+    seq : list
+        List of inputs.
+    workers : int or None, optional
+        Number of workers. If 1, all chunks are processed serially in the
+        current thread. If None, the number of CPUs is used. Default value
+        is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool. Threads are effective when `func` spends most
+        of its time in code that releases the GIL (e.g., GEOS operations
+        in shapely); processes avoid the GIL entirely at the cost of
+        pickling the inputs and outputs. Default value is 'thread'.
+    chunksize : int or None, optional
+        Number of elements per chunk. If None, `seq` is split into about
+        four chunks per worker. Default value is None.
+
+    Returns
+    -------
+    out : list
+        Concatenated results of `func` applied to each chunk.
+
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers == 1 or len(seq) < 2:
+        return func(list(seq))
+
+    if chunksize is None:
+        chunksize = -(-len(seq) // (4 * workers))
+    chunksize = max(chunksize, 1)
+    chunks = [seq[i:i+chunksize] for i in range(0, len(seq), chunksize)]
+
+    if pool == 'thread':
+        worker_pool = mp_pool.ThreadPool(workers)
+    elif pool == 'process':
+        worker_pool = mp_pool.Pool(workers)
+    else:
+        raise ValueError('unknown pool type: {0!r}'.format(pool))
+    try:
+        results = worker_pool.map(func, chunks)
+    finally:
+        worker_pool.close()
+        worker_pool.join()
+
+    out = []
+    for result in results:
+        out.extend(result)
+    return out
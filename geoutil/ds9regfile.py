@@ -13,39 +13,305 @@ structure.
 .. note:: |Geoset| instances cannot be fully represented in DS9 format. See
    `write` for details.
 
+The polygons read from a file are validated by default (see
+`build_polygon`): invalid geometries, such as self-intersecting rings or
+overlapping parts of a geo, are repaired with
+`geoutil._utils.validate_poly`. Pass ``validate=False`` to `read` or
+`iterread` to get the polygons exactly as stored in the file.
+
 Functions
 ---------
 
-======= ==================================================
-`read`  Create a |Geoset| instance from a DS9 region file.
-`write` Write a |Geoset| instance to a DS9 region file.
-======= ==================================================
+=============== =========================================================
+`read`          Create a |Geoset| instance from a DS9 region file.
+`iterread`      Iterate over the items of a DS9 region file.
+`write`         Write a |Geoset| instance to a DS9 region file.
+`parse_attrs`   Return a list of key-value pairs from a DS9 attribute
+                string.
+`parse_coords`  Return an array of floats from a DS9 coordinate string.
+`build_polygon` Return a polygon from lists of shell and hole vertices.
+`format_coords` Return a DS9 coordinate string from an array of vertices.
+`read_shapes`   Return the analytic shapes in a DS9 region file as a
+                `Shapes` table.
+`shape_polygon` Return a polygon approximating an analytic shape.
+=============== =========================================================
+
+Classes
+-------
+
+======== ==================================================================
+`Shapes` Compact, array-based table of analytic DS9 shapes.
+======== ==================================================================
 
 
 .. references
 
 .. |Geo| replace:: `~geoutil._geoset.Geo`
+.. |Item| replace:: `~geoutil._geoset.Item`
+.. |LazyGeo| replace:: `~geoutil._geoset.LazyGeo`
 .. |Geoset| replace:: `~geoutil._geoset.Geoset`
 
 """
 from collections import OrderedDict
+import functools
+import re
 
 import numpy as np
 from shapely import geometry
 
-from . import _geoset
+from . import _cache, _fileio, _geoset, _utils
+
+
+# Precompiled patterns for parsing region lines
+_SHAPE = re.compile(r'^(\w+)\s*\(([^)]*)\)\s*(?:#(.*))?$')
+_TAG = re.compile(r'tag=\{(item|geo|poly) (-?\d+)\}')
+_TRAILING_ZEROS = re.compile(r'(\.\d*?[1-9])0+(?=,|$)|\.0*(?=,|$)')
+# Float format specifications that printf-style formatting can reproduce:
+# sign, alternate form, zero padding, width, precision, and type
+_FORMAT_SPEC = re.compile(r'^([-+ ]?)(#?)(0?)(\d*)((?:\.\d+)?)([eEfFgG])$')
+_REPLACEMENT_FIELD = re.compile(r'^\{0?:(.*)\}$')
+_NO_TAG = object()
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_NUMBERS = re.compile(
+    r'^\s*{0:s}(?:(?:\s*,\s*|\s+){0:s})*\s*$'.format(_NUMBER))
+_ATTR = re.compile(r'(\w+)=(?:"([^"]*)"|\{([^}]*)\}|(.*?))(?=\s+\w+=|\s*$)')
+
+
+def parse_attrs(attrstr):
+    """Return a list of key-value pairs from a DS9 attribute string.
+
+    Values may be quoted (``font="helvetica 10"``), enclosed in braces
+    (``tag={item 0}``), or bare (``dashlist=8 3``); quotes and braces are
+    removed.
+
+    Parameters
+    ----------
+    attrstr : str
+        Attribute string, e.g., the part of a region line following "#".
+
+    Returns
+    -------
+    out : list
+        List of (key, value) tuples (values are strings).
+
+    """
+    return [(key, qval or bval or val or '') for key, qval, bval, val
+            in _ATTR.findall(attrstr)]
+
+
+def parse_coords(coordstr):
+    """Return an array of floats from a DS9 coordinate string.
+
+    Parameters
+    ----------
+    coordstr : str
+        Comma and/or space separated numbers, e.g., ``'1.0,2.0,3.0'``.
+
+    Returns
+    -------
+    out : array
+        1D array of floats.
+
+    """
+    return np.array(coordstr.replace(',', ' ').split(), dtype=float)
+
 
+def iterread(filename, compression=None, validate=True, segments=64):
+    """Iterate over the contents of a DS9 region file.
 
-def read(filename):
+    The file is read line by line, so memory usage is bounded by the size
+    of a single item rather than the whole file. The shells and holes of
+    each geo (identified by their item, geo, and poly tags) are collected
+    and the geometry is constructed once, with `build_polygon`.
+
+    Each analytic shape (``circle``, ``ellipse``, ``box``, and ``annulus``)
+    becomes an item with a single |LazyGeo|, which is polygonized only when
+    its geometry is accessed. Shapes whose coordinates are not plain
+    numbers (e.g., sexagesimal coordinates or sizes with units such as
+    ``2"``) or that have too few values are skipped. Use `read_shapes` to
+    work with large numbers of analytic shapes without creating polygons
+    at all. Polygons without an item tag (e.g., in region files written by
+    other programs) also become items of their own.
+
+    .. note:: This will break if the region file was not written using
+       `write`!
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to the DS9 region file to be loaded, or an open file object.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file; see `read`. Default value is None.
+    validate : bool, optional
+        If True, each geometry is validated (see `build_polygon`). Default
+        value is True.
+    segments : int, optional
+        Number of vertices used to polygonize circles, ellipses, and
+        annuli (see `shape_polygon`). Default value is 64.
+
+    Yields
+    ------
+    out : |Geoset| or |Item|
+        First, a |Geoset| instance without any items, carrying the global
+        attributes and coordinate system of the file; then one |Item|
+        instance at a time. The attributes of the |Geoset| are updated in
+        place if further global lines are encountered later in the file.
+
+    """
+    geoset = _geoset.Geoset(None)
+    yielded = False
+    item = geo = parts = part_index = None
+    i0 = j0 = _NO_TAG
+    with _fileio.open_file(filename, 'r', compression) as file:
+        for line in file:
+            line = line.rstrip('\r\n')
+            # Skip comments and blank lines:
+            if line.startswith('#') or not line:
+                continue
+
+            # Parse global attributes:
+            elif line.startswith('global'):
+                geoset.attrs = OrderedDict(parse_attrs(line[6:]))
+                continue
+
+            # Parse coordinate system:
+            elif line in ['physical', 'fk5']:
+                if geoset.attrs is None:
+                    geoset.attrs = OrderedDict()
+                geoset.attrs['coordsys'] = line
+                continue
+
+            match = _SHAPE.match(line)
+            if match is None:
+                continue
+            shape = match.group(1)
+            if shape in SHAPE_KINDS:
+                kind = SHAPE_KINDS[shape]
+                values = _shape_values(kind, match.group(2))
+                if values is None:
+                    # E.g., sexagesimal coordinates, which are not supported
+                    continue
+            elif shape != 'polygon':
+                continue
+            if not yielded:
+                yield geoset
+                yielded = True
+
+            # Analytic shapes become items of their own, with a geometry
+            # that is only polygonized when accessed:
+            if shape in SHAPE_KINDS:
+                if geo is not None:
+                    geo.geo = build_polygon(parts, validate=validate)
+                    geo = None
+                if item is not None:
+                    yield item
+                    item = None
+                params = _shape_params(kind, values[None])[0]
+                loader = functools.partial(shape_polygon, kind, params,
+                                           segments)
+                yield _geoset.Item(_geoset.LazyGeo(loader))
+                i0 = j0 = _NO_TAG
+                continue
+
+            # Get polygon vertices:
+            coords, attrs = match.group(2), match.group(3) or ''
+            xy = parse_coords(coords).reshape(-1, 2)
+
+            # Test if polygon is a hole:
+            is_hole = 'background' in attrs
+
+            # Get item/geo/poly structure indices:
+            tags = dict((tag, int(n)) for tag, n in _TAG.findall(attrs))
+            i, j, k = tags.get('item'), tags.get('geo'), tags.get('poly')
+
+            # Collect the shells and holes of each geo; the geometry is
+            # built once all of its lines have been read. Polygons without
+            # an item tag (e.g., from third-party files) are items of their
+            # own.
+            untagged = i is None
+            if untagged or i != i0 or j != j0:
+                if geo is not None:
+                    geo.geo = build_polygon(parts, validate=validate)
+                geo, parts, part_index = _geoset.Geo(None), [], {}
+                if untagged or i != i0:
+                    if item is not None:
+                        yield item
+                    item = _geoset.Item(geo)
+                else:
+                    item.geos.append(geo)
+            if is_hole and parts:
+                # Holes belong to the shell with the same poly tag
+                parts[part_index.get(k, -1)][1].append(xy)
+            else:
+                part_index[k] = len(parts)
+                parts.append((xy, []))
+            if untagged:
+                i0 = j0 = _NO_TAG
+            else:
+                i0, j0 = i, j
+
+    if geo is not None:
+        geo.geo = build_polygon(parts, validate=validate)
+    if not yielded:
+        yield geoset
+    if item is not None:
+        yield item
+
+
+def build_polygon(parts, validate=True):
+    """Return a polygon from lists of shell and hole vertices.
+
+    Parameters
+    ----------
+    parts : list
+        List of (shell, holes) tuples, one per polygon, where `shell` is an
+        array of vertices and `holes` is a list of arrays of vertices.
+    validate : bool, optional
+        If True, the result is checked with `geoutil._utils.validate_poly`,
+        which also merges overlapping parts, as unioning the parts one by
+        one used to. If False, a geo with overlapping parts results in an
+        invalid `MultiPolygon`. Default value is True.
+
+    Returns
+    -------
+    out : `shapely.geometry.Polygon` or `shapely.geometry.MultiPolygon`
+        A `Polygon` if there is a single part, otherwise a `MultiPolygon`.
+
+    """
+    polys = [geometry.Polygon(shell, holes) for shell, holes in parts]
+    if len(polys) == 1:
+        poly = polys[0]
+    else:
+        poly = geometry.MultiPolygon(polys)
+    if validate:
+        poly = _utils.validate_poly(poly)
+    return poly
+
+
+@_cache.cached('ds9regfile')
+def read(filename, compression=None, validate=True, segments=64):
     """Create a |Geoset| instance from a DS9 region file.
 
+    Uses `iterread` to stream the file. See `iterread` for details.
+
     .. note:: This will break if the region file was not written using
        `write`!
 
     Parameters
     ----------
-    filename : str
-        Path to the DS9 region file to be loaded.
+    filename : str or file object
+        Path to the DS9 region file to be loaded, or an open file object
+        (e.g., an `io.StringIO` or `io.BytesIO` buffer).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). Default
+        value is None.
+    validate : bool, optional
+        If True, each geometry is validated (see `build_polygon`). Default
+        value is True.
+    segments : int, optional
+        Number of vertices used to polygonize analytic shapes; see
+        `iterread`. Default value is 64.
 
     Returns
     -------
@@ -54,91 +320,347 @@ def read(filename):
         file.
 
     """
-    def parse_ds9_attrs(attrstr, global_attrs=False):
-        attrstr = attrstr + ' junk'
-        if not global_attrs:
-            attrstr = 'junk ' + attrstr
-
-        j = [0] + [i for i in range(len(attrstr)) if attrstr[i] == '='] + [-1]
-
-        keys, vals = [], []
-        for j1, j2 in zip(j[:-1], j[1:]):
-            val, key = attrstr[j1+1:j2].rsplit(' ', 1)
-            if ((val[0], val[-1]) == ('"', '"') or
-                (val[0], val[-1]) == ('{', '}')):
-                val = val[1:-1]
-            keys.append(key)
-            vals.append(val)
-        return zip(keys[:-1], vals[1:])
-
-    with open(filename, 'r') as file:
-        lines = file.readlines()
+    contents = iterread(filename, compression=compression,
+                        validate=validate, segments=segments)
+    geoset = next(contents)
+    geoset.items.extend(contents)
+    return geoset
 
-    geoset = _geoset.Geoset(None)
-    i0, j0, k0 = None, None, None
-    for line in lines:
-        line = line.split('\n')[0]
-        # Skip comments and blank lines:
-        if line.startswith('#') or not line:
-            continue
-
-        # Parse global attributes:
-        elif line.startswith('global'):
-            attrs = parse_ds9_attrs(line, global_attrs=True)
-            attrs = OrderedDict(attrs)
-            geoset.attrs = attrs
-
-        # Parse coordinate system:
-        elif line in ['physical', 'fk5']:
-            if geoset.attrs is None:
-                geoset.attrs = OrderedDict()
-            geoset.attrs['coordsys'] = line
-
-        # Build geoset:
-        elif line.startswith('polygon'):
-            coords, delim, attrs = line.partition('(')[-1].partition(')')
-            coords, attrs = coords.replace(',', ' '), attrs.split('#')[-1]
-
-            # Make polygon
-            xy = [float(i) for i in coords.split()]
-            x, y = xy[0::2], xy[1::2]
-            poly = geometry.Polygon(zip(x, y))
 
-            # Test if polygon is a hole:
-            is_hole = False
-            if 'background' in attrs:
-                is_hole = True
-                attrs = attrs.split('background')[-1]
+# Analytic shapes
+# ---------------
 
-            # Get item/geo/poly structure indices:
-            idx_list = parse_ds9_attrs(attrs)
-            for idx in idx_list:
-                tag, n = idx[1].split()
-                n = int(n)
-                if tag == 'item':
-                    i = n
-                elif tag == 'geo':
-                    j = n
-                elif tag == 'poly':
-                    k = n
-
-            if i != i0:
-                geo = _geoset.Geo(poly)
-                item = _geoset.Item(geo)
-                geoset.items.append(item)
-            elif j != j0:
-                geo = _geoset.Geo(poly)
-                item.geos.append(geo)
-            elif k != k0:
-                geo.geo = geo.geo.union(poly)
-            elif is_hole:
-                geo.geo = geo.geo.difference(poly)
-            i0, j0, k0 = i, j, k
 
-    return geoset
+# Shape kind codes. Each shape is described by five parameters, x, y, a, b,
+# and angle (degrees counterclockwise from the x axis):
+#   circle   a = radius, b = radius
+#   ellipse  a, b = semi-axes
+#   box      a, b = full width and height
+#   annulus  a, b = inner and outermost radii
+SHAPE_KINDS = OrderedDict([
+    ('circle', 1),
+    ('ellipse', 2),
+    ('box', 3),
+    ('annulus', 4),
+    ])
+# Minimum number of values on a line of each kind
+_MIN_VALUES = {1: 3, 2: 4, 3: 4, 4: 4}
+
+
+def _shape_values(kind, coordstr):
+    """Return the values of a shape line, or None if they are not plain
+    numbers or there are too few of them.
+
+    """
+    if _NUMBERS.match(coordstr) is None:
+        return None
+    values = parse_coords(coordstr)
+    if len(values) < _MIN_VALUES[kind]:
+        return None
+    return values
+
+
+def _shape_params(kind, values):
+    """Return the five standard parameters of shapes from their values.
+
+    `values` is an array of shape (N, M) with the values of N lines of the
+    same kind, each with M values. Ellipses and boxes may omit the angle
+    (which is then 0); if they list several sizes (DS9 ellipse and box
+    annuli), the outermost one is used.
+
+    """
+    values = np.asarray(values, dtype=float)
+    params = np.zeros((len(values), 5))
+    params[:,:2] = values[:,:2]
+    nvalues = values.shape[1]
+    if kind == SHAPE_KINDS['circle']:
+        params[:,2] = params[:,3] = values[:,2]
+    elif kind == SHAPE_KINDS['annulus']:
+        params[:,2], params[:,3] = values[:,2], values[:,-1]
+    else:
+        if nvalues % 2:
+            params[:,4] = values[:,-1]
+            nvalues -= 1
+        params[:,2:4] = values[:,nvalues-2:nvalues]
+    return params
+
+
+def shape_polygon(kind, params, segments=64):
+    """Return a polygon approximating an analytic shape.
+
+    Parameters
+    ----------
+    kind : int
+        Shape kind code (see `SHAPE_KINDS`).
+    params : array_like
+        Shape parameters x, y, a, b, angle (see `Shapes`).
+    segments : int, optional
+        Number of vertices used for circles, ellipses, and each ring of an
+        annulus. Boxes always have four vertices. Default value is 64.
+
+    Returns
+    -------
+    out : `shapely.geometry.Polygon`
+
+    """
+    x, y, a, b, angle = params
+    if kind == SHAPE_KINDS['box']:
+        u = np.array([-0.5, 0.5, 0.5, -0.5]) * a
+        v = np.array([-0.5, -0.5, 0.5, 0.5]) * b
+    else:
+        theta = np.linspace(0, 2*np.pi, segments, endpoint=False)
+        u, v = np.cos(theta), np.sin(theta)
+        if kind != SHAPE_KINDS['annulus']:
+            u, v = a*u, b*v
+
+    if kind == SHAPE_KINDS['annulus']:
+        inner = np.column_stack((x + a*u, y + a*v))
+        outer = np.column_stack((x + b*u, y + b*v))
+        return geometry.Polygon(outer, [inner[::-1]] if a > 0 else [])
+
+    cos, sin = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    xy = np.column_stack((x + u*cos - v*sin, y + u*sin + v*cos))
+    return geometry.Polygon(xy)
+
+
+class Shapes(object):
+
+    """Compact, array-based table of analytic DS9 shapes.
+
+    Circles, ellipses, boxes, and annuli are stored as rows of a parameter
+    array rather than as polygons. Operations such as point containment
+    (see `contains`) work directly on the analytic form, and polygons are
+    only created on demand (see `polygon`).
+
+    Parameters
+    ----------
+    kinds : array_like
+        Shape kind code of each shape (see `SHAPE_KINDS`).
+    params : array_like
+        Array of shape (N, 5) with the parameters x, y, a, b, angle of each
+        shape: for circles, a = b = radius; for ellipses, a and b are the
+        semi-axes; for boxes, a and b are the full width and height; for
+        annuli, a and b are the inner and outermost radii. Angles are in
+        degrees, counterclockwise from the x axis.
+
+    Attributes
+    ----------
+    kinds : array
+    params : array
+
+    Methods
+    -------
+    polygon
+    polygons
+    bounds
+    contains
+
+    """
+
+    def __init__(self, kinds, params):
+        self.kinds = np.asarray(kinds, dtype='i1')
+        self.params = np.asarray(params, dtype=float).reshape(-1, 5)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def polygon(self, i, segments=64):
+        """Return shape `i` as a polygon (see `shape_polygon`)."""
+        return shape_polygon(self.kinds[i], self.params[i], segments)
+
+    def polygons(self, segments=64):
+        """Return a list of all shapes as polygons."""
+        return [self.polygon(i, segments) for i in range(len(self))]
+
+    def bounds(self):
+        """Return the bounding boxes of all shapes.
+
+        Returns
+        -------
+        out : array
+            Array of shape (N, 4) with columns minx, miny, maxx, maxy.
+
+        """
+        x, y, a, b, angle = self.params.T
+        cos = np.abs(np.cos(np.radians(angle)))
+        sin = np.abs(np.sin(np.radians(angle)))
+        box = self.kinds == SHAPE_KINDS['box']
+        annulus = self.kinds == SHAPE_KINDS['annulus']
+        a, b = np.where(box, a/2, a), np.where(box, b/2, b)
+        a = np.where(annulus, b, a)
+        # Half widths of the bounding box of a rotated ellipse or box:
+        dx = np.where(box, a*cos + b*sin, np.hypot(a*cos, b*sin))
+        dy = np.where(box, a*sin + b*cos, np.hypot(a*sin, b*cos))
+        return np.column_stack((x - dx, y - dy, x + dx, y + dy))
+
+    def contains(self, x, y, chunksize=100000):
+        """Test which points lie inside any of the shapes.
+
+        Candidate point-shape pairs are found by sorting the points in x
+        and selecting the points within the x extent of each shape; the
+        exact test is then done on the analytic form of the shapes, in
+        chunks of shapes to bound memory usage.
+
+        Parameters
+        ----------
+        x, y : array_like
+            Point coordinates.
+        chunksize : int, optional
+            Number of shapes processed at once. Default value is 100000.
+
+        Returns
+        -------
+        out : array
+            Boolean array, True for points inside (or on the boundary of)
+            at least one shape.
+
+        """
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        inside = np.zeros(x.shape, dtype=bool)
+        order = np.argsort(x, kind='mergesort')
+        xs = x[order]
+        bounds = self.bounds()
+        lo = np.searchsorted(xs, bounds[:,0], side='left')
+        hi = np.searchsorted(xs, bounds[:,2], side='right')
+
+        for c in range(0, len(self), chunksize):
+            n = hi[c:c+chunksize] - lo[c:c+chunksize]
+            if not n.sum():
+                continue
+            # Expand (shape, point) candidate pairs:
+            shape_idx = np.repeat(np.arange(c, c + len(n)), n)
+            offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+            point_idx = order[lo[shape_idx] + offsets]
+
+            sx, sy, a, b, angle = self.params[shape_idx].T
+            kinds = self.kinds[shape_idx]
+            dx, dy = x[point_idx] - sx, y[point_idx] - sy
+            cos, sin = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+            u, v = dx*cos + dy*sin, -dx*sin + dy*cos
+            r2 = dx**2 + dy**2
+
+            hit = np.zeros(len(shape_idx), dtype=bool)
+            sel = kinds == SHAPE_KINDS['circle']
+            hit[sel] = r2[sel] <= a[sel]**2
+            sel = kinds == SHAPE_KINDS['ellipse']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                hit[sel] = (u[sel]/a[sel])**2 + (v[sel]/b[sel])**2 <= 1
+            sel = kinds == SHAPE_KINDS['box']
+            hit[sel] = ((np.abs(u[sel]) <= a[sel]/2) &
+                        (np.abs(v[sel]) <= b[sel]/2))
+            sel = kinds == SHAPE_KINDS['annulus']
+            hit[sel] = (r2[sel] >= a[sel]**2) & (r2[sel] <= b[sel]**2)
+            inside[point_idx[hit]] = True
+        return inside
+
+
+def read_shapes(filename, compression=None):
+    """Return the analytic shapes in a DS9 region file as a `Shapes`
+    table.
+
+    Only ``circle``, ``ellipse``, ``box``, and ``annulus`` lines with
+    numeric coordinates are read; all other lines (including shapes with
+    sexagesimal coordinates or sizes with units) are ignored. The
+    coordinates of all shapes of the same kind and number of values are
+    parsed with a single numpy call.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to the DS9 region file to be loaded, or an open file object.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file; see `read`. Default value is None.
 
+    Returns
+    -------
+    out : `Shapes`
+        The shapes, in file order.
 
-def write(geoset, filename, coordsys=None, fmt='.15f'):
+    """
+    # Lines grouped by (kind, number of values)
+    groups = OrderedDict()
+    n = 0
+    with _fileio.open_file(filename, 'r', compression) as file:
+        for line in file:
+            match = _SHAPE.match(line.strip())
+            if match is None or match.group(1) not in SHAPE_KINDS:
+                continue
+            kind, coordstr = SHAPE_KINDS[match.group(1)], match.group(2)
+            if _NUMBERS.match(coordstr) is None:
+                continue
+            nvalues = len(coordstr.replace(',', ' ').split())
+            if nvalues < _MIN_VALUES[kind]:
+                continue
+            groups.setdefault((kind, nvalues), []).append((n, coordstr))
+            n += 1
+
+    kinds = np.zeros(n, dtype='i1')
+    params = np.zeros((n, 5))
+    for (kind, nvalues), rows in groups.items():
+        index = [i for i, coordstr in rows]
+        values = parse_coords(' '.join(coordstr for i, coordstr in rows))
+        kinds[index] = kind
+        params[index] = _shape_params(kind, values.reshape(-1, nvalues))
+    return Shapes(kinds, params)
+
+
+def _printf_format(fmt):
+    """Return the printf-style equivalent of a `str.format` specification
+    for floats, or None if there is none (e.g., with alignment or grouping
+    options, or without a presentation type).
+
+    """
+    match = _FORMAT_SPEC.match(fmt)
+    if match is None:
+        return None
+    sign, alt, zero, width, precision, kind = match.groups()
+    # In printf-style formatting, '-' means left alignment
+    return '%' + sign.replace('-', '') + alt + zero + width + precision + kind
+
+
+def format_coords(xy, fmt='.15f', trim=False):
+    """Return a DS9 coordinate string from an array of vertices.
+
+    Common float format specifications are translated into printf-style
+    formatting, so that all coordinates are formatted with a single
+    operation rather than one `str.format` call per number; others (e.g.,
+    with alignment or grouping options) fall back to `format`. The output
+    is the same either way.
+
+    Parameters
+    ----------
+    xy : array_like
+        Array of vertices, shape (N, 2).
+    fmt : str, optional
+        `str.format` specification for each coordinate, e.g., '.15f', or a
+        replacement field with such a specification, e.g., '{:.15f}'.
+        Default value is '.15f'.
+    trim : bool, optional
+        If True, trailing zeros (and trailing decimal points) are removed
+        from each coordinate. Default value is False.
+
+    Returns
+    -------
+    out : str
+        Comma-separated coordinates.
+
+    """
+    match = _REPLACEMENT_FIELD.match(fmt)
+    if match is not None:
+        fmt = match.group(1)
+    values = np.ravel(xy).tolist()
+    spec = _printf_format(fmt)
+    if spec is None:
+        coordstr = ','.join([format(val, fmt) for val in values])
+    else:
+        coordstr = ','.join([spec] * len(values)) % tuple(values)
+    if trim:
+        coordstr = _TRAILING_ZEROS.sub(r'\1', coordstr)
+    return coordstr
+
+
+def write(geoset, filename, coordsys=None, fmt='.15f', compression=None,
+          precision=None):
     """Write a |Geoset| instance to a DS9 region file.
 
     The structure of the input geoset is preserved using DS9 tags with
@@ -151,49 +673,61 @@ def write(geoset, filename, coordsys=None, fmt='.15f'):
     objects. Attributes within the geoset tree and FITS headers are not
     written!
 
+    Lines are formatted item by item (see `format_coords`) and streamed to
+    a buffered file handle, so the file contents are never held in memory
+    all at once.
+
     Parameters
     ----------
     geoset : |Geoset|
         The input |Geoset| instance.
-    filename : str
-        Destination path of the output DS9 region file.
+    filename : str or file object
+        Destination path of the output DS9 region file, or an open file
+        object (e.g., an `io.StringIO` or `io.BytesIO` buffer).
     coordsys : {None|'physical'|'fk5'}, optional
         DS9 keyword describing the coordinate system of the listed regions.
         If None, coordsys is set to physical. Default value is None.
     fmt : str, optional
-        A string specifying how coordinates should be printed. Default
-        value is '.15f'.
+        A `str.format` specification for the coordinates; see
+        `format_coords`. Default value is '.15f'.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). Default
+        value is None.
+    precision : int or None, optional
+        If not None, coordinates are printed with this many decimal places
+        (overriding `fmt`) and trailing zeros are removed, which can make
+        the file considerably smaller. Default value is None.
 
     """
     if coordsys is None:
         coordsys = 'physical'
-    fmt = '{{0:{0:s}}}'.format(fmt)
-
-    lines = [coordsys + '\n']
-    for i, item in enumerate(geoset.items):
-        itag = ' tag={{item {0:d}}}'.format(i)
-
-        for j, geo in enumerate(item.geos):
-            gtag = ' tag={{geo {0:d}}}'.format(j)
-            poly = geo.geo
-            if poly.type == 'Polygon':
-                poly = [poly]
-
-            for k, subpoly in enumerate(poly):
-                ptag = ' tag={{poly {0:d}}}'.format(k)
-                xy = np.array(subpoly.exterior.coords)
-                xy = ','.join(fmt.format(i) for i in np.ravel(xy))
-                line = 'polygon({0:s}) #{1:s}{2:s}{3:s}\n'
-                line = line.format(xy, itag, gtag, ptag)
-                lines.append(line)
-
-                for hole in subpoly.interiors:
-                    xy = np.array(hole.coords)
-                    xy = ','.join(fmt.format(i) for i in np.ravel(xy))
-                    line = 'polygon({0:s}) # background{1:s}{2:s}{3:s}\n'
-                    line = line.format(xy, itag, gtag, ptag)
-                    lines.append(line)
-
-    with open(filename, 'w') as f:
-        for line in lines:
-            f.write(line)
+    trim = precision is not None
+    if trim:
+        fmt = '.{0:d}f'.format(precision)
+
+    with _fileio.open_file(filename, 'w', compression) as f:
+        f.write(coordsys + '\n')
+        for i, item in enumerate(geoset.items):
+            itag = ' tag={{item {0:d}}}'.format(i)
+
+            lines = []
+            for j, geo in enumerate(item.geos):
+                gtag = ' tag={{geo {0:d}}}'.format(j)
+                poly = geo.geo
+                if poly.geom_type == 'Polygon':
+                    poly = [poly]
+                else:
+                    poly = poly.geoms
+
+                for k, subpoly in enumerate(poly):
+                    ptag = ' tag={{poly {0:d}}}'.format(k)
+                    xy = format_coords(subpoly.exterior.coords, fmt, trim)
+                    line = 'polygon({0:s}) #{1:s}{2:s}{3:s}\n'
+                    lines.append(line.format(xy, itag, gtag, ptag))
+
+                    for hole in subpoly.interiors:
+                        xy = format_coords(hole.coords, fmt, trim)
+                        line = 'polygon({0:s}) # background{1:s}{2:s}{3:s}\n'
+                        lines.append(line.format(xy, itag, gtag, ptag))
+            f.write(''.join(lines))
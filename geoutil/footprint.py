@@ -0,0 +1,310 @@
+"""
+
+===================
+`geoutil.footprint`
+===================
+
+Overlap index of the footprints of many images.
+
+A `FootprintIndex` holds the footprints of a set of images (e.g., the
+exposures of a survey mosaic) as polygons in world coordinates, built from
+the WCS information in their FITS headers (see
+`geoutil._utils.header_footprint`). Querying the index with a |Geoset|
+returns a sparse item-by-image membership matrix: candidate (geo, image)
+pairs are found with a single bulk query of a bounding box index (see
+`geoutil._index.BoundsIndex`) and confirmed with exact intersection tests,
+so geometries are never compared against images far away from them.
+Optionally, the fraction of each item's area inside each image is computed
+as well.
+
+Building the footprints of thousands of images requires parsing their
+headers and building their WCS, so an index can be saved to a ``.npz``
+file (see `numpy.savez_compressed`) and loaded again in later runs.
+
+Footprints are treated as planar polygons in world coordinates, i.e. the
+geometries of the queried geoset must be in the same world coordinates,
+and images straddling the discontinuity of the longitude coordinate (e.g.,
+RA = 0 deg) are not supported.
+
+Classes
+-------
+
+================ ==========================================================
+`FootprintIndex` Overlap index of the footprints of many images.
+================ ==========================================================
+
+
+.. references
+
+.. |Geoset| replace:: `~geoutil._geoset.Geoset`
+
+"""
+import functools
+
+import numpy as np
+from shapely import geometry
+from shapely.prepared import prep
+try:
+    from shapely import area as _area
+    from shapely import intersection as _intersection
+    from shapely import intersects as _intersects
+except ImportError:
+    _intersects = None
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+from . import _index, _utils
+
+
+def _footprint_chunk(hdr_list, segments=8):
+    """Return the world footprint of each header; used by
+    `FootprintIndex.from_headers`.
+
+    """
+    return [_utils.header_footprint(hdr, world=True, segments=segments)
+            for hdr in hdr_list]
+
+
+def _npz_path(filename):
+    """Append the ``.npz`` extension to a path, as `numpy.savez` does;
+    file objects are returned unchanged.
+
+    """
+    if isinstance(filename, str) and not filename.endswith('.npz'):
+        return filename + '.npz'
+    return filename
+
+
+def _intersects_chunk(pairs):
+    """Test if each (geometry, footprint) pair intersects."""
+    if _intersects is not None and pairs:
+        geoms, footprints = (_utils._object_array(list(column))
+                             for column in zip(*pairs))
+        return list(_intersects(geoms, footprints))
+    return [prep(footprint).intersects(geom) for geom, footprint in pairs]
+
+
+def _fraction_chunk(pairs):
+    """Return the fraction of the area of the geometry inside the footprint
+    for each (geometry, footprint) pair.
+
+    """
+    if _intersects is not None and pairs:
+        geoms, footprints = (_utils._object_array(list(column))
+                             for column in zip(*pairs))
+        inside = _area(_intersection(geoms, footprints))
+        total = _area(geoms)
+    else:
+        inside = np.array([geom.intersection(footprint).area
+                           for geom, footprint in pairs])
+        total = np.array([geom.area for geom, footprint in pairs])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return list(np.where(total > 0, inside / total, 0.))
+
+
+class FootprintIndex(object):
+
+    """Overlap index of the footprints of many images.
+
+    Parameters
+    ----------
+    footprints : list
+        List of `shapely.geometry.Polygon` instances, the footprints of the
+        images in world coordinates. Only the exterior of each polygon is
+        stored by `save`.
+    names : list or None, optional
+        Names of the images (e.g., file names), one per footprint. Default
+        value is None.
+
+    Attributes
+    ----------
+    footprints : list
+        The footprints of the images.
+    names : list or None
+        The names of the images, or None.
+
+    Methods
+    -------
+    from_headers
+    load
+    save
+    query
+
+    """
+
+    def __init__(self, footprints, names=None):
+        if names is not None and len(names) != len(footprints):
+            raise ValueError('there must be one name per footprint')
+        self.footprints = list(footprints)
+        self.names = None if names is None else list(names)
+        self._index = _index.BoundsIndex.from_geoms(self.footprints)
+
+    def __len__(self):
+        return len(self.footprints)
+
+    @classmethod
+    def from_headers(cls, hdr_list, names=None, segments=8, workers=1,
+                     pool='thread'):
+        """Build an index from the FITS headers of the images.
+
+        Parameters
+        ----------
+        hdr_list : list
+            List of `astropy.io.fits.Header` or `astropy.wcs.WCS` instances
+            with the dimensions and WCS information of the images; see
+            `geoutil._utils.header_footprint`.
+        names : list or None, optional
+            Names of the images. Default value is None.
+        segments : int, optional
+            Number of segments per image edge; see
+            `geoutil._utils.header_footprint`. Default value is 8.
+        workers : int or None, optional
+            Number of workers; see `geoutil._utils.map_chunks`. Building a
+            WCS is mostly pure Python, so a process pool is needed to
+            benefit from several workers. Default value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        Returns
+        -------
+        out : `FootprintIndex`
+
+        """
+        footprints = _utils.map_chunks(
+            functools.partial(_footprint_chunk, segments=segments),
+            list(hdr_list), workers=workers, pool=pool)
+        return cls(footprints, names=names)
+
+    def save(self, filename):
+        """Save the index to a file in compressed ``.npz`` format.
+
+        Parameters
+        ----------
+        filename : str or file object
+            Path to the output file (``.npz`` is appended if missing), or
+            an open binary file object.
+
+        """
+        rings = [np.asarray(fp.exterior.coords, dtype=float).reshape(-1, 2)
+                 for fp in self.footprints]
+        offsets = np.cumsum([0] + [len(ring) for ring in rings])
+        coords = np.concatenate(rings) if rings else np.zeros((0, 2))
+        names = np.array([] if self.names is None else self.names,
+                         dtype=str)
+        np.savez_compressed(_npz_path(filename), coords=coords,
+                            offsets=offsets, names=names,
+                            has_names=np.array(self.names is not None))
+
+    @classmethod
+    def load(cls, filename):
+        """Load an index saved with `save`.
+
+        Parameters
+        ----------
+        filename : str or file object
+            Path to the ``.npz`` file (the extension may be omitted, as
+            in `save`), or an open binary file object.
+
+        Returns
+        -------
+        out : `FootprintIndex`
+
+        """
+        with np.load(_npz_path(filename), allow_pickle=False) as data:
+            coords, offsets = data['coords'], data['offsets']
+            names = data['names'].tolist() if data['has_names'] else None
+        footprints = [geometry.Polygon(coords[start:stop])
+                      for start, stop in zip(offsets[:-1], offsets[1:])]
+        return cls(footprints, names=names)
+
+    def query(self, geoset, fractions=False, sparse_matrix=False,
+              workers=1, pool='thread'):
+        """Return the item-by-image membership matrix of a geoset.
+
+        An item belongs to an image if any of its geometries intersects
+        the footprint of the image.
+
+        Parameters
+        ----------
+        geoset : |Geoset|
+            The geoset, with geometries in the world coordinates of the
+            footprints.
+        fractions : bool, optional
+            If True, the fraction of the area of each item inside each of
+            its images is also computed. The geometries of items with
+            several geos are merged first (see
+            `geoutil._utils.union_groups`). Default value is False.
+        sparse_matrix : bool, optional
+            If True, the result is returned as a `scipy.sparse.csr_matrix`
+            instance of shape (number of items, number of images), with
+            values of True (or the overlap fractions). Requires `scipy`.
+            Default value is False.
+        workers : int or None, optional
+            Number of workers for the intersection tests and overlap
+            fractions; see `geoutil._utils.map_chunks`. Default value is 1.
+        pool : {'thread'|'process'}, optional
+            Type of worker pool; see `geoutil._utils.map_chunks`. Default
+            value is 'thread'.
+
+        Returns
+        -------
+        rows, cols : array
+            Indices of the items and of the images they belong to (i.e.
+            the nonzero entries of the matrix, in coordinate format),
+            sorted by item and then by image. Only returned if
+            `sparse_matrix` is False.
+        frac : array
+            The overlap fraction of each (item, image) pair. Only returned
+            if `fractions` is True and `sparse_matrix` is False.
+        out : `scipy.sparse.csr_matrix`
+            Only returned if `sparse_matrix` is True.
+
+        """
+        if sparse_matrix and sparse is None:
+            raise ValueError('sparse_matrix requires the scipy package')
+
+        geo_list, item_list = [], []
+        for i, item in enumerate(geoset.items):
+            for geo in item.geos:
+                geo_list.append(geo.geo)
+                item_list.append(i)
+        item_list = np.array(item_list, dtype=int)
+
+        # Candidate (geo, image) pairs, confirmed with exact tests
+        gidx, fidx = self._index.query_bulk(_index.geom_bounds(geo_list))
+        hit = _utils.map_chunks(
+            _intersects_chunk,
+            [(geo_list[g], self.footprints[f]) for g, f in zip(gidx, fidx)],
+            workers=workers, pool=pool)
+        hit = np.array(hit, dtype=bool).reshape(-1)
+
+        # Reduce geos to items
+        nimages = len(self.footprints)
+        keys = np.unique(item_list[gidx[hit]] * nimages + fidx[hit])
+        rows, cols = keys // nimages, keys % nimages
+
+        if fractions:
+            item_geoms = {}
+            multi = [i for i in np.unique(rows)
+                     if len(geoset.items[i].geos) > 1]
+            merged = _utils.union_groups(
+                [[geo.geo for geo in geoset.items[i].geos] for i in multi],
+                workers=workers, pool=pool)
+            item_geoms.update(zip(multi, merged))
+            pairs = [(item_geoms[i] if i in item_geoms else
+                      geoset.items[i].geos[0].geo, self.footprints[f])
+                     for i, f in zip(rows, cols)]
+            frac = np.array(_utils.map_chunks(_fraction_chunk, pairs,
+                                              workers=workers, pool=pool),
+                            dtype=float)
+
+        if sparse_matrix:
+            data = frac if fractions else np.ones(len(rows), dtype=bool)
+            return sparse.csr_matrix((data, (rows, cols)),
+                                     shape=(len(geoset.items), nimages))
+        if fractions:
+            return rows, cols, frac
+        return rows, cols
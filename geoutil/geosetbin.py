@@ -0,0 +1,203 @@
+"""
+
+===================
+`geoutil.geosetbin`
+===================
+
+Interface |Geoset| instances with files in native binary geoset format.
+
+This module defines the binary geoset format, a compact binary
+representation of the geoset data structure intended for intermediate
+products on hot paths. Geometries are stored as flat coordinate and offset
+arrays (see `geoutil._geoarrays`), which are memory-mapped when a file is
+read, so opening a file is nearly instantaneous and geometry objects are
+only created when they are accessed. See `write` for the format
+definition.
+
+Functions
+---------
+
+=========== ===============================================================
+`read`      Return a |Geoset| instance from a binary geoset file.
+`write`     Write a |Geoset| instance to a binary geoset file.
+=========== ===============================================================
+
+
+.. references
+
+.. |Geoset| replace:: `~geoutil._geoset.Geoset`
+.. |LazyGeo| replace:: `~geoutil._geoset.LazyGeo`
+
+"""
+from collections import OrderedDict
+import functools
+import json
+import struct
+
+import numpy as np
+
+from . import _fileio, _geoarrays, _geoset
+
+
+MAGIC = b'GEOSETB1'
+_ALIGN = 64
+_ARRAYS = [('types', 'i1'), ('geo_offsets', '<i8'), ('part_offsets', '<i8'),
+           ('ring_offsets', '<i8'), ('coords', '<f8'),
+           ('item_offsets', '<i8')]
+
+
+def _pad(n):
+    return -n % _ALIGN
+
+
+def _loads_attrs(attrs):
+    return None if attrs is None else OrderedDict(attrs)
+
+
+def _dumps_attrs(attrs):
+    return None if attrs is None else list(attrs.items())
+
+
+def read(filename, mmap=True, compression=None):
+    """Create a |Geoset| instance from a binary geoset file.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to the binary geoset file to be loaded, or an open binary file
+        object (e.g., an `io.BytesIO` buffer).
+    mmap : bool, optional
+        If True, the arrays of an uncompressed file given by path are
+        memory-mapped instead of read into memory. Default value is True.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`).
+        Compressed files and file objects are read into memory. Default
+        value is None.
+
+    Returns
+    -------
+    out : |Geoset|
+        A |Geoset| instance build using the items, geometries, attributes,
+        and FITS header information stored in the binary geoset file. The
+        geos are |LazyGeo| instances, so geometry objects are only created
+        when first accessed. The FITS header is parsed on first access.
+
+    """
+    if compression is None:
+        compression = _fileio.infer_compression(filename)
+    mmap = mmap and compression is None and not _fileio.is_fileobj(filename)
+
+    with _fileio.open_file(filename, 'rb', compression) as f:
+        preamble = f.read(len(MAGIC) + 8)
+        if preamble[:len(MAGIC)] != MAGIC:
+            raise ValueError('not a binary geoset file')
+        nmeta, = struct.unpack('<Q', preamble[len(MAGIC):])
+        meta = json.loads(f.read(nmeta).decode('utf-8'))
+        data = None if mmap else f.read()
+
+    arrays = {}
+    for name, dtype in _ARRAYS:
+        shape = tuple(meta['shapes'][name])
+        offset = meta['offsets'][name]
+        if mmap:
+            if np.prod(shape) == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(filename, dtype=dtype, mode='r',
+                                         offset=offset, shape=shape)
+        else:
+            offset -= meta['data_start']
+            count = int(np.prod(shape))
+            arrays[name] = np.frombuffer(
+                data, dtype=dtype, count=count, offset=offset).reshape(shape)
+    item_offsets = arrays.pop('item_offsets')
+    store = _geoarrays.GeoArrays(**arrays)
+
+    geoset = _geoset.Geoset(None, attrs=_loads_attrs(meta['attrs']),
+                            hdr=meta['hdr'])
+    geo_attrs = meta['geo_attrs']
+    for i, attrs in enumerate(meta['item_attrs']):
+        item = _geoset.Item(None, attrs=_loads_attrs(attrs))
+        for j in range(item_offsets[i], item_offsets[i+1]):
+            loader = functools.partial(store.geometry, j)
+            item.geos.append(
+                _geoset.LazyGeo(loader, attrs=_loads_attrs(geo_attrs[j])))
+        geoset.items.append(item)
+    return geoset
+
+
+def write(geoset, filename, compression=None):
+    """Write a |Geoset| instance to a binary geoset file.
+
+    The binary geoset format is defined as follows (all integers are
+    little-endian):
+
+    =============== ========================================================
+    section         contents
+    =============== ========================================================
+    magic           The 8 bytes ``GEOSETB1``.
+    metadata size   Size of the metadata section in bytes (uint64).
+    metadata        JSON object (UTF-8) with the geoset, item and geo
+                    attributes (as arrays of key-value pairs, like the
+                    geoset XML format), the FITS header as a single string,
+                    and the shape and absolute byte offset of each array.
+    arrays          Raw array data, each array starting on a 64-byte
+                    boundary: the flat geometry arrays described in
+                    `geoutil._geoarrays`, and ``item_offsets`` (int64), the
+                    index range of the geos of each item.
+    =============== ========================================================
+
+    Parameters
+    ----------
+    geoset : |Geoset|
+        The input |Geoset| instance.
+    filename : str or file object
+        Destination path of the output binary geoset file, or an open
+        binary file object (e.g., an `io.BytesIO` buffer).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). Note
+        that compressed files cannot be memory-mapped when read. Default
+        value is None.
+
+    """
+    geos = geoset.geos
+    store = _geoarrays.GeoArrays.from_geoms([geo.geo for geo in geos])
+    arrays = dict((name, getattr(store, name)) for name, dtype in _ARRAYS
+                  if name != 'item_offsets')
+    arrays['item_offsets'] = np.cumsum(
+        [0] + [len(item.geos) for item in geoset.items])
+    arrays = [(name, np.ascontiguousarray(arrays[name], dtype=dtype))
+              for name, dtype in _ARRAYS]
+
+    meta = OrderedDict([
+        ('attrs', _dumps_attrs(geoset.attrs)),
+        ('hdr', geoset.hdr.tostring() if geoset.has_hdr else None),
+        ('item_attrs', [_dumps_attrs(item.attrs) for item in geoset.items]),
+        ('geo_attrs', [_dumps_attrs(geo.attrs) for geo in geos]),
+        ('shapes', OrderedDict((name, arr.shape) for name, arr in arrays)),
+        ])
+
+    # The array offsets depend on the size of the metadata, which in turn
+    # contains the offsets; reserve a fixed width for each offset.
+    meta['data_start'] = 0
+    meta['offsets'] = OrderedDict((name, 0) for name, arr in arrays)
+    nmeta = len(json.dumps(meta)) + 20 * (len(arrays) + 1)
+    data_start = len(MAGIC) + 8 + nmeta
+    data_start += _pad(data_start)
+    meta['data_start'] = data_start
+    offset = data_start
+    for name, arr in arrays:
+        meta['offsets'][name] = offset
+        offset += arr.nbytes + _pad(arr.nbytes)
+    meta = json.dumps(meta).encode('utf-8')
+    meta += b' ' * (data_start - len(MAGIC) - 8 - len(meta))
+
+    with _fileio.open_file(filename, 'wb', compression) as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(meta)))
+        f.write(meta)
+        for name, arr in arrays:
+            f.write(arr.tobytes())
+            f.write(b'\0' * _pad(arr.nbytes))
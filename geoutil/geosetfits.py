@@ -0,0 +1,429 @@
+"""
+
+====================
+`geoutil.geosetfits`
+====================
+
+Interface |Geoset| instances with FITS files.
+
+This module stores the geoset data structure in a FITS file with a binary
+table, so that geosets can be used by any FITS-aware tool. The geoset
+header becomes the primary HDU header, and the items and geos are stored
+in a ``BINTABLE`` extension with one row per geo. See `write` for the
+format definition.
+
+Files are read with memory mapping, so column-only queries (e.g.,
+attributes or bounding boxes; see `read_columns`) do not decode any
+geometries, and `read` only creates geometry objects when they are
+accessed.
+
+Functions
+---------
+
+============== ===========================================================
+`read`         Return a |Geoset| instance from a FITS file.
+`write`        Write a |Geoset| instance to a FITS file.
+`read_columns` Return selected columns of the geoset table of a FITS file.
+============== ===========================================================
+
+
+.. references
+
+.. |Geoset| replace:: `~geoutil._geoset.Geoset`
+.. |LazyGeo| replace:: `~geoutil._geoset.LazyGeo`
+
+"""
+from collections import OrderedDict
+import functools
+import io
+import json
+import os
+
+from astropy.io import fits
+import numpy as np
+
+from . import _fileio, _geoarrays, _geoset
+
+
+EXTNAME = 'GEOSET'
+
+# Keywords that astropy rewrites in the primary HDU; their original values
+# in the geoset header are saved in the table header with an 'H' prefix.
+_STRUCTURAL_KEYS = ['SIMPLE', 'BITPIX', 'NAXIS', 'EXTEND']
+
+_INT_NULL = np.iinfo(np.int64).min
+_NULL_PREFIX = 'NULL_'
+
+
+def _is_structural(key):
+    return key in _STRUCTURAL_KEYS or (key.startswith('NAXIS') and
+                                       key[5:].isdigit())
+
+
+def _infer_format(values):
+    """Return (FITS format, is JSON) for a list of attribute values."""
+    types = set(type(val) for val in values)
+    if types <= set([bool]):
+        return 'L', False
+    elif types <= set([int]):
+        return 'K', False
+    elif types <= set([int, float]):
+        return 'D', False
+    elif types <= set([str]):
+        return '{0:d}A'.format(max([1] + [len(val.encode('utf-8'))
+                                          for val in values])), False
+    else:
+        values = [json.dumps(val) for val in values]
+        return '{0:d}A'.format(max(len(val) for val in values)), True
+
+
+def _attr_columns(prefix, attrs_list):
+    """Return a list of `fits.Column` instances and the JSON flags for one
+    level of attributes.
+
+    """
+    keys = OrderedDict()
+    for attrs in attrs_list:
+        for key in (attrs or ()):
+            keys[key] = True
+
+    columns, is_json = [], []
+    for key in keys:
+        values = [attrs[key] for attrs in attrs_list
+                  if attrs is not None and key in attrs]
+        fmt, jsonfmt = _infer_format(values)
+        null = None
+        if fmt == 'K':
+            null = _INT_NULL
+            fill = _INT_NULL
+        elif fmt == 'D':
+            fill = np.nan
+        elif fmt == 'L':
+            fill = False
+        else:
+            fill = ''
+
+        array, missing = [], []
+        for attrs in attrs_list:
+            if attrs is None or key not in attrs:
+                array.append(fill)
+                missing.append(True)
+            elif jsonfmt:
+                array.append(json.dumps(attrs[key]))
+                missing.append(False)
+            else:
+                array.append(attrs[key])
+                missing.append(False)
+        if fmt.endswith('A'):
+            array = np.array([val.encode('utf-8') for val in array])
+        columns.append(fits.Column(name=prefix + key, format=fmt,
+                                   null=null, array=np.array(array)))
+        is_json.append(jsonfmt)
+        # Fill values other than TNULL are valid values as well (e.g., an
+        # empty string), so missing values are flagged in a mask column.
+        if null is None and any(missing):
+            columns.append(fits.Column(name=_NULL_PREFIX + prefix + key,
+                                       format='L',
+                                       array=np.array(missing, dtype=bool)))
+            is_json.append(False)
+    return columns, is_json
+
+
+def _loads_attrs(row, columns):
+    """Return the attributes of one table row (None if all are missing)."""
+    if not columns:
+        return None
+    attrs = OrderedDict()
+    for key, array, jsonfmt, mask in columns:
+        if mask is not None and mask[row]:
+            continue
+        val = array[row]
+        if isinstance(val, bytes):
+            val = val.decode('utf-8')
+        if isinstance(val, str):
+            if val == '' and mask is None:
+                continue
+            elif jsonfmt:
+                val = json.loads(val)
+        elif isinstance(val, np.floating):
+            if np.isnan(val) and mask is None:
+                continue
+            val = float(val)
+        elif isinstance(val, np.bool_):
+            val = bool(val)
+        elif isinstance(val, np.integer):
+            if val == _INT_NULL:
+                continue
+            val = int(val)
+        attrs[key] = val
+    return attrs if attrs else None
+
+
+def _row_geometry(data, row):
+    """Decode the geometry stored in one table row."""
+    parts = np.asarray(data['PARTS'][row], dtype='i8')
+    store = _geoarrays.GeoArrays(
+        [data['TYPE'][row]], np.array([0, len(parts) - 1]), parts,
+        np.asarray(data['RINGS'][row], dtype='i8'),
+        np.asarray(data['COORDS'][row], dtype='f8').reshape(-1, 2))
+    return store.geometry(0)
+
+
+def read(filename, memmap=True, compression=None):
+    """Create a |Geoset| instance from a FITS file.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to the FITS file to be loaded, or an open binary file object.
+    memmap : bool, optional
+        If True, the table is memory-mapped. The file itself is closed
+        before returning; the memory map is released once the geoset (or
+        rather, its unloaded geos) no longer refers to the table. Default
+        value is True.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`).
+        Compressed files are decompressed into memory and cannot be
+        memory-mapped. Default value is None.
+
+    Returns
+    -------
+    out : |Geoset|
+        A |Geoset| instance build using the items, geometries, attributes,
+        and FITS header information stored in the FITS file. The geos are
+        |LazyGeo| instances, so geometry objects are only created when
+        first accessed.
+
+    """
+    if compression is None:
+        compression = _fileio.infer_compression(filename)
+    if compression is not None:
+        with _fileio.open_file(filename, 'rb', compression) as f:
+            filename = io.BytesIO(f.read())
+        memmap = False
+    with fits.open(filename, memmap=memmap) as hdulist:
+        hdr = hdulist[0].header.copy()
+        table_hdu = hdulist[EXTNAME]
+        thdr, data = table_hdu.header, table_hdu.data
+
+        if thdr.get('GSHDR', False):
+            for key in list(hdr):
+                if _is_structural(key):
+                    del hdr[key]
+            structural = [key for key in thdr
+                          if key.startswith('H') and _is_structural(key[1:])]
+            for n, key in enumerate(structural):
+                hdr.insert(n, (key[1:], thdr[key]))
+        else:
+            hdr = None
+        attrs = thdr.get('GSATTRS')
+        if attrs is not None:
+            attrs = OrderedDict(json.loads(attrs))
+        geoset = _geoset.Geoset(None, attrs=attrs, hdr=hdr)
+
+        # Files written before the NULL_ columns were introduced use the
+        # fill values as missing values
+        has_masks = thdr.get('GSNULL', False)
+        item_columns, geo_columns = [], []
+        for n, name in enumerate(data.names, 1):
+            jsonfmt = thdr.get('TJSON{0:d}'.format(n), False)
+            mask = None
+            if _NULL_PREFIX + name in data.names:
+                mask = np.asarray(data[_NULL_PREFIX + name])
+            elif has_masks:
+                mask = np.zeros(len(data), dtype=bool)
+            if name.startswith('ITEM_'):
+                item_columns.append((name[5:], data[name], jsonfmt, mask))
+            elif name.startswith('GEO_'):
+                geo_columns.append((name[4:], data[name], jsonfmt, mask))
+
+        items, geos = np.asarray(data['ITEM']), np.asarray(data['GEO'])
+        item = None
+        for row in range(len(data)):
+            if item is None or items[row] != items[row-1]:
+                item = _geoset.Item(
+                    None, attrs=_loads_attrs(row, item_columns))
+                geoset.items.append(item)
+            if geos[row] >= 0:
+                loader = functools.partial(_row_geometry, data, row)
+                item.geos.append(_geoset.LazyGeo(
+                    loader, attrs=_loads_attrs(row, geo_columns)))
+    return geoset
+
+
+def read_columns(filename, names=None):
+    """Return selected columns of the geoset table of a FITS file.
+
+    The table is memory-mapped and no geometries are decoded, which makes
+    this suitable for attribute or bounding box queries.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to the FITS file, or an open binary file object.
+    names : list or None, optional
+        Names of the columns to return, e.g., ``['ITEM', 'GEO', 'XMIN',
+        'XMAX']`` or attribute columns such as ``'GEO_name'`` (see
+        `write`). If None, all columns except the geometry columns are
+        returned. Default value is None.
+
+    Returns
+    -------
+    out : `OrderedDict`
+        Column names and arrays, one element per table row (geo).
+
+    """
+    with fits.open(filename, memmap=True) as hdulist:
+        data = hdulist[EXTNAME].data
+        if names is None:
+            names = [name for name in data.names
+                     if name not in ['COORDS', 'PARTS', 'RINGS']]
+        return OrderedDict((name, np.array(data[name])) for name in names)
+
+
+def write(geoset, filename, overwrite=True, compression=None):
+    """Write a |Geoset| instance to a FITS file.
+
+    The FITS file is laid out as follows:
+
+    =========== ============================================================
+    HDU         contents
+    =========== ============================================================
+    primary     The geoset FITS header (no data). The ``SIMPLE``,
+                ``BITPIX``, ``NAXIS``, ``NAXISn`` and ``EXTEND`` keywords
+                of the geoset header are saved in the table header with an
+                "H" prefix, e.g. ``HNAXIS1``, and restored by `read`.
+    ``GEOSET``  Binary table with one row per geo (and one row with
+                ``GEO`` = -1 for each item without any geos). The table
+                header has the geoset attributes as a JSON array in
+                ``GSATTRS``, a logical ``GSHDR`` flag that is true if the
+                geoset has a FITS header, and a logical ``GSNULL`` flag
+                that is true if missing values are flagged by ``NULL_*``
+                columns (otherwise, fill values are read as missing).
+    =========== ============================================================
+
+    The table columns are:
+
+    ========== ============================================================
+    ``ITEM``   Item index.
+    ``GEO``    Geo index within the item, or -1.
+    ``TYPE``   Geometry type code (see `geoutil._geoarrays`).
+    ``XMIN``,  Bounding box of the geometry (NaN if None or empty).
+    ``YMIN``,
+    ``XMAX``,
+    ``YMAX``
+    ``COORDS`` Variable-length array of x, y coordinates (flattened).
+    ``PARTS``  Variable-length array of ring offsets of the parts.
+    ``RINGS``  Variable-length array of vertex offsets of the rings.
+    ``ITEM_*`` Item attributes (repeated for each geo of the item).
+    ``GEO_*``  Geo attributes.
+    ``NULL_*`` Missing value flags of attribute columns (see below).
+    ========== ============================================================
+
+    The format of each attribute column is inferred from the values:
+    logical for bools, 64-bit integer for ints, double for floats (or a mix
+    of ints and floats), and strings otherwise. Values of any other type are
+    stored as JSON strings, flagged by ``TJSONn`` keywords. Since a table is
+    rectangular, missing attributes are written as null values (the
+    ``TNULLn`` value for integers, NaN, an empty string, or False) and are
+    omitted when read back. As only integer columns can have a ``TNULLn``
+    value, missing values in other columns are flagged by a logical
+    ``NULL_`` column, e.g. ``NULL_ITEM_name`` for ``ITEM_name``, which is
+    only written if the column has missing values. A row without any
+    attributes is read back with `attrs` set to None.
+
+    Parameters
+    ----------
+    geoset : |Geoset|
+        The input |Geoset| instance.
+    filename : str or file object
+        Destination path of the output FITS file, or an open binary file
+        object.
+    overwrite : bool, optional
+        If True, overwrite an existing file (like the other interface
+        modules). Default value is True.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). Default
+        value is None.
+
+    """
+    rows = []
+    for i, item in enumerate(geoset.items):
+        if not item.geos:
+            rows.append((i, -1, item, None))
+        for j, geo in enumerate(item.geos):
+            rows.append((i, j, item, geo))
+
+    store = _geoarrays.GeoArrays.from_geoms(
+        [None if geo is None else geo.geo for i, j, item, geo in rows])
+    bounds = store.bounds()
+    coord_starts = store.ring_offsets[store.part_offsets]
+    coords, parts, rings = [], [], []
+    for n in range(len(rows)):
+        p1, p2 = store.geo_offsets[n], store.geo_offsets[n+1]
+        r1, r2 = store.part_offsets[p1], store.part_offsets[p2]
+        c1, c2 = coord_starts[p1], coord_starts[p2]
+        coords.append(store.coords[c1:c2].ravel())
+        parts.append(store.part_offsets[p1:p2+1] - r1)
+        rings.append(store.ring_offsets[r1:r2+1] - c1)
+
+    def vla(arrays, dtype):
+        out = np.empty(len(arrays), dtype=object)
+        for n, arr in enumerate(arrays):
+            out[n] = np.asarray(arr, dtype=dtype)
+        return out
+
+    columns = [
+        fits.Column(name='ITEM', format='K',
+                    array=np.array([row[0] for row in rows], dtype='i8')),
+        fits.Column(name='GEO', format='K',
+                    array=np.array([row[1] for row in rows], dtype='i8')),
+        fits.Column(name='TYPE', format='I',
+                    array=np.asarray(store.types, dtype='i2')),
+        fits.Column(name='XMIN', format='D', array=bounds[:,0]),
+        fits.Column(name='YMIN', format='D', array=bounds[:,1]),
+        fits.Column(name='XMAX', format='D', array=bounds[:,2]),
+        fits.Column(name='YMAX', format='D', array=bounds[:,3]),
+        fits.Column(name='COORDS', format='PD()', array=vla(coords, 'f8')),
+        fits.Column(name='PARTS', format='PJ()', array=vla(parts, 'i4')),
+        fits.Column(name='RINGS', format='PJ()', array=vla(rings, 'i4')),
+        ]
+    is_json = [False] * len(columns)
+    for prefix, attrs_list in [
+            ('ITEM_', [item.attrs for i, j, item, geo in rows]),
+            ('GEO_', [None if geo is None else geo.attrs
+                      for i, j, item, geo in rows])]:
+        attr_columns, attr_json = _attr_columns(prefix, attrs_list)
+        columns += attr_columns
+        is_json += attr_json
+
+    table_hdu = fits.BinTableHDU.from_columns(columns, name=EXTNAME)
+    for n, jsonfmt in enumerate(is_json, 1):
+        if jsonfmt:
+            table_hdu.header['TJSON{0:d}'.format(n)] = True
+    if geoset.attrs is not None:
+        table_hdu.header['GSATTRS'] = json.dumps(list(geoset.attrs.items()))
+    table_hdu.header['GSHDR'] = geoset.has_hdr
+    table_hdu.header['GSNULL'] = True
+
+    primary_hdu = fits.PrimaryHDU()
+    if geoset.has_hdr:
+        for card in geoset.hdr.cards:
+            if _is_structural(card.keyword):
+                table_hdu.header['H' + card.keyword] = card.value
+            else:
+                primary_hdu.header.append(card)
+
+    hdulist = fits.HDUList([primary_hdu, table_hdu])
+    if compression is None:
+        compression = _fileio.infer_compression(filename)
+    if compression is None:
+        hdulist.writeto(filename, overwrite=overwrite)
+    else:
+        if (not overwrite and not _fileio.is_fileobj(filename) and
+                os.path.exists(filename)):
+            raise OSError('file exists: {0:s}'.format(filename))
+        with _fileio.open_file(filename, 'wb', compression) as f:
+            hdulist.writeto(f)
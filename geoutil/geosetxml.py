@@ -32,17 +32,50 @@ Functions
 from collections import OrderedDict
 import json
 
-from astropy.io import fits
 try:
     from lxml import etree
 except ImportError:
     from xml.etree import ElementTree as etree
 from shapely import wkt
+try:
+    from shapely import from_wkt as _from_wkt
+except ImportError:
+    _from_wkt = None
+
+from . import _cache, _fileio, _geoset, _utils
+
+
+def _loads_attrs(text):
+    """Decode the text of an ``<ATTR>`` element."""
+    if text is None:
+        return None
+    return OrderedDict(json.loads(text))
+
+
+def _dumps_attrs(attrs):
+    """Encode attributes as the text of an ``<ATTR>`` element."""
+    if attrs is None:
+        return None
+    return json.dumps(list(attrs.items()))
+
 
-from . import _geoset
+def _decode_geos(geo_texts):
+    """Build `Geo` instances from a list of (ATTR text, WKT text) pairs."""
+    wkt_list = [wkt_text for attrs_text, wkt_text in geo_texts]
+    if _from_wkt is not None:
+        # Vectorized parsing; releases the GIL while GEOS does the work
+        idx = [i for i, text in enumerate(wkt_list) if text is not None]
+        parsed = _from_wkt([wkt_list[i] for i in idx])
+        for i, geo in zip(idx, parsed):
+            wkt_list[i] = geo
+    else:
+        wkt_list = [None if wkt_text is None else wkt.loads(wkt_text)
+                    for wkt_text in wkt_list]
+    return [_geoset.Geo(geo, attrs=_loads_attrs(attrs_text))
+            for (attrs_text, wkt_text), geo in zip(geo_texts, wkt_list)]
 
 
-def fromxml(geoset_xml):
+def fromxml(geoset_xml, workers=1, pool='thread', chunksize=None):
     """Convert a geoset XML tree to a |Geoset| instance.
 
     See `toxml` for details about the geoset XML format.
@@ -51,12 +84,23 @@ def fromxml(geoset_xml):
     ----------
     geoset_xml : `Element` from `xml.etree.ElementTree` or `lxml.etree`
         The root element of an XML tree in geoset XML format.
+    workers : int or None, optional
+        Number of workers used to decode the WKT and attributes of the
+        geos. If 1, decoding is done serially. If None, the number of CPUs
+        is used. Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool used if `workers` is not 1 (see
+        `geoutil._utils.map_chunks`). Default value is 'thread'.
+    chunksize : int or None, optional
+        Number of geos decoded per task. If None, a chunk size is chosen
+        automatically. Default value is None.
 
     Returns
     -------
     out : |Geoset|
         A |Geoset| instance built using the items, geometries, attributes,
-        and FITS header information stored in `geoset_xml`.
+        and FITS header information stored in `geoset_xml`. The order of
+        items and geos is the same regardless of `workers`.
 
     Notes
     -----
@@ -71,41 +115,39 @@ def fromxml(geoset_xml):
     ``<HEADER>`` single string `Header.fromstring`
     ============ ============= ===================
 
-    Note that strings returned by `json` are always unicode strings.
+    Note that strings returned by `json` are always unicode strings. The
+    header text is not parsed until the `Geoset.hdr` attribute is first
+    accessed.
 
     """
-    attrs = geoset_xml[0].text
-    if attrs is not None:
-        attrs = OrderedDict(json.loads(attrs))
-    hdr = geoset_xml[1].text
-    if hdr is not None:
-        hdr = fits.Header.fromstring(hdr)
-    geoset = _geoset.Geoset(None, attrs=attrs, hdr=hdr)
-
-    if len(geoset_xml) > 2:
-        for item_xml in geoset_xml[2:]:
-            attrs = item_xml[0].text
-            if attrs is not None:
-                attrs = OrderedDict(json.loads(attrs))
-            item = _geoset.Item(None, attrs=attrs)
-
-            if len(item_xml) > 1:
-                for geo_xml in item_xml[1:]:
-                    attrs = geo_xml[0].text
-                    if attrs is not None:
-                        attrs = OrderedDict(json.loads(attrs))
-                    geo = geo_xml[1].text
-                    if geo is not None:
-                        geo = wkt.loads(geo)
-
-                    item.geos.append(_geoset.Geo(geo, attrs=attrs))
-
-            geoset.items.append(item)
+    attrs = _loads_attrs(geoset_xml[0].text)
+    # The header is stored as raw text and only parsed on first access
+    geoset = _geoset.Geoset(None, attrs=attrs, hdr=geoset_xml[1].text)
+
+    # Collect the text of all geos first so that decoding can be split
+    # into chunks and farmed out to a worker pool.
+    item_attrs, ngeos, geo_texts = [], [], []
+    for item_xml in geoset_xml[2:]:
+        item_attrs.append(item_xml[0].text)
+        ngeos.append(len(item_xml) - 1)
+        for geo_xml in item_xml[1:]:
+            geo_texts.append((geo_xml[0].text, geo_xml[1].text))
+
+    geos = _utils.map_chunks(_decode_geos, geo_texts, workers=workers,
+                             pool=pool, chunksize=chunksize)
+
+    i = 0
+    for attrs, n in zip(item_attrs, ngeos):
+        item = _geoset.Item(None, attrs=_loads_attrs(attrs))
+        item.geos.extend(geos[i:i+n])
+        geoset.items.append(item)
+        i += n
 
     return geoset
 
 
-def read(filename):
+@_cache.cached('geosetxml')
+def read(filename, compression=None, workers=1, pool='thread'):
     """Create a |Geoset| instance from a geoset XML file.
 
     Uses `fromxml` to parse the XML tree after the file is loaded. See
@@ -113,8 +155,18 @@ def read(filename):
 
     Parameters
     ----------
-    filename : str
-        Path to the geoset XML file to be loaded.
+    filename : str or file object
+        Path to the geoset XML file to be loaded, or an open binary file
+        object (e.g., an `io.BytesIO` buffer).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). The
+        file is decompressed as it is parsed. Default value is None.
+    workers : int or None, optional
+        Number of workers used to decode geometries; see `fromxml`.
+        Default value is 1.
+    pool : {'thread'|'process'}, optional
+        Type of worker pool; see `fromxml`. Default value is 'thread'.
 
     Returns
     -------
@@ -123,8 +175,9 @@ def read(filename):
         and FITS header information stored in the geoset XML file.
 
     """
-    geoset_xml = etree.parse(filename).getroot()
-    return fromxml(geoset_xml)
+    with _fileio.open_file(filename, 'rb', compression) as f:
+        geoset_xml = etree.parse(f).getroot()
+    return fromxml(geoset_xml, workers=workers, pool=pool)
 
 
 def toxml(geoset):
@@ -190,10 +243,10 @@ def toxml(geoset):
 
     attr_xml = etree.SubElement(geoset_xml, 'ATTR')
     if geoset.attrs is not None:
-        attr_xml.text = json.dumps(geoset.attrs.items())
+        attr_xml.text = _dumps_attrs(geoset.attrs)
 
     header_xml = etree.SubElement(geoset_xml, 'HEADER')
-    if geoset.hdr is not None:
+    if geoset.has_hdr:
         header_xml.text = geoset.hdr.tostring()
 
     for item in geoset.items:
@@ -201,14 +254,14 @@ def toxml(geoset):
 
         attr_xml = etree.SubElement(item_xml, 'ATTR')
         if item.attrs is not None:
-            attr_xml.text = json.dumps(item.attrs.items())
+            attr_xml.text = _dumps_attrs(item.attrs)
 
         for geo in item.geos:
             geo_xml = etree.SubElement(item_xml, 'GEO')
 
             attr_xml = etree.SubElement(geo_xml, 'ATTR')
             if geo.attrs is not None:
-                attr_xml.text = json.dumps(geo.attrs.items())
+                attr_xml.text = _dumps_attrs(geo.attrs)
 
             wkt_xml = etree.SubElement(geo_xml, 'WKT')
             if geo.geo is not None:
@@ -250,7 +303,7 @@ def formatter(geoset_xml):
     geoset_xml.tail = '\n'
 
 
-def write(geoset, filename):
+def write(geoset, filename, compression=None):
     """Write a |Geoset| instance to a geoset XML file.
 
     Uses `toxml` to form an XML tree which is then written to file. See
@@ -260,11 +313,17 @@ def write(geoset, filename):
     ----------
     geoset : |Geoset|
         The input |Geoset| instance.
-    filename : str
-        Destination path of the output geoset XML file.
+    filename : str or file object
+        Destination path of the output geoset XML file, or an open binary
+        file object (e.g., an `io.BytesIO` buffer).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). Default
+        value is None.
 
     """
     geoset_xml = toxml(geoset)
     formatter(geoset_xml)
     tree = etree.ElementTree(geoset_xml)
-    tree.write(filename, encoding='UTF-8', xml_declaration=True)
+    with _fileio.open_file(filename, 'wb', compression) as f:
+        tree.write(f, encoding='UTF-8', xml_declaration=True)
@@ -0,0 +1,285 @@
+"""
+
+=================
+`geoutil.migrate`
+=================
+
+Convert files in the deprecated polylist XML format to geoset XML format.
+
+Conversion is streamed: ``ITEM`` elements are read from the polylist XML
+file and written to the geoset XML file one at a time, so memory usage does
+not depend on the size of the file. WKT text is passed through as-is rather
+than being parsed into `shapely.geometry` objects and serialized again, and
+attributes are decoded as in `geoutil.polylistxml.read`. Apart from the WKT
+text, which keeps its original formatting, the output is the same as that
+of ``geosetxml.write(polylistxml.read(src), dst)``.
+
+Whole directory trees can be converted using a pool of worker processes
+(see `convert_tree`); files whose outputs are already up to date are
+skipped. The module can also be run as a script::
+
+  python -m geoutil.migrate [-j WORKERS] [--force] SRC DST
+
+where ``SRC`` and ``DST`` are either files or directories.
+
+Functions
+---------
+
+=============== ===========================================================
+`convert`       Convert a polylist XML file to a geoset XML file.
+`convert_tree`  Convert all polylist XML files in a directory tree.
+`is_up_to_date` Test if an output file is newer than its input file.
+`main`          Command line interface.
+=============== ===========================================================
+
+"""
+import argparse
+import fnmatch
+import os
+import sys
+
+from . import _fileio, _registry, _utils, geosetxml, polylistxml
+
+
+_DECLARATION = b"<?xml version='1.0' encoding='UTF-8'?>\n"
+_INDENT = '  '
+
+
+def is_up_to_date(src, dst):
+    """Test if an output file is newer than its input file.
+
+    Parameters
+    ----------
+    src, dst : str
+        Paths to the input and output files.
+
+    Returns
+    -------
+    out : bool
+        True if `dst` exists and was modified no earlier than `src`.
+
+    """
+    return (os.path.exists(dst) and
+            os.path.getmtime(dst) >= os.path.getmtime(src))
+
+
+def _needs_conversion(src, dst, force):
+    """Test if `src` must be converted to `dst`.
+
+    For in-place conversions (`dst` is the same file as `src`), the
+    modification times are meaningless, so the root tag of the file is
+    checked instead: files that are already in geoset XML format are
+    skipped, even if `force` is True.
+
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        head = _fileio.peek(src, compression=_fileio.infer_compression(src))
+        return _registry._xml_root(head) != b'GEOSET'
+    return force or not is_up_to_date(src, dst)
+
+
+def _attr_element(attrs):
+    attr_xml = polylistxml.etree.Element('ATTR')
+    attr_xml.text = geosetxml._dumps_attrs(attrs)
+    return attr_xml
+
+
+def _header_element(header_xml):
+    out = polylistxml.etree.Element('HEADER')
+    pairs = polylistxml.get_XML_attrs(header_xml)
+    if pairs is not None:
+        out.text = _utils.parse_header(tuple(pairs.items())).tostring()
+    return out
+
+
+def _item_element(poly_item_xml, item_decoder, poly_decoder):
+    """Return a geoset XML ``ITEM`` element, formatted as by
+    `geoutil.geosetxml.formatter`, from a polylist XML ``ITEM`` element.
+
+    """
+    etree = polylistxml.etree
+    item_xml = etree.Element('ITEM')
+    item_xml.append(_attr_element(item_decoder.decode(poly_item_xml)))
+    for poly_xml in poly_item_xml:
+        geo_xml = etree.SubElement(item_xml, 'GEO')
+        geo_xml.append(_attr_element(poly_decoder.decode(poly_xml)))
+        wkt_xml = etree.SubElement(geo_xml, 'WKT')
+        wkt_xml.text = poly_xml.text
+
+    item_xml.text = '\n' + 2*_INDENT
+    for child in item_xml:
+        child.tail = '\n' + 2*_INDENT
+    item_xml[-1].tail = '\n' + _INDENT
+    return item_xml
+
+
+def _tostring(elem):
+    return polylistxml.etree.tostring(elem, encoding='UTF-8')
+
+
+def convert(src, dst, force=False, compression=None):
+    """Convert a polylist XML file to a geoset XML file.
+
+    The output is first written to a temporary file next to `dst`, which is
+    renamed once the conversion is complete, so that an interrupted
+    conversion never leaves behind an output that appears up to date.
+
+    Parameters
+    ----------
+    src : str
+        Path to the input polylist XML file. The compression format of the
+        file is inferred from its extension.
+    dst : str
+        Path to the output geoset XML file. May be the same as `src`, in
+        which case the conversion is skipped if the file is already in
+        geoset XML format.
+    force : bool, optional
+        If False, the conversion is skipped if `dst` is up to date (see
+        `is_up_to_date`). Ignored for in-place conversions. Default value
+        is False.
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the output file. If None, the format is
+        inferred from the extension of `dst`. Default value is None.
+
+    Returns
+    -------
+    out : bool
+        True if the file was converted, False if it was skipped.
+
+    """
+    if not _needs_conversion(src, dst, force):
+        return False
+    if compression is None:
+        compression = _fileio.infer_compression(dst)
+
+    tmp = '{0:s}.tmp{1:d}'.format(dst, os.getpid())
+    try:
+        with _fileio.open_file(src, 'rb') as fin, \
+                _fileio.open_file(tmp, 'wb', compression) as fout:
+            elements = polylistxml._iterparse(fin)
+            item_decoder = polylistxml.AttrDecoder()
+            poly_decoder = polylistxml.AttrDecoder()
+            fout.write(_DECLARATION)
+            fout.write(b'<GEOSET>')
+            for i, elem in enumerate(elements):
+                if i == 0:
+                    out = _attr_element(polylistxml.get_XML_attrs(elem))
+                elif i == 1:
+                    out = _header_element(elem)
+                else:
+                    out = _item_element(elem, item_decoder, poly_decoder)
+                fout.write(('\n' + _INDENT).encode('utf-8'))
+                fout.write(_tostring(out))
+            fout.write(b'\n</GEOSET>\n')
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return True
+
+
+def _convert_chunk(tasks):
+    """Convert a list of (src, dst, force) tasks; used by `convert_tree`."""
+    return [convert(src, dst, force=force) for src, dst, force in tasks]
+
+
+def convert_tree(src_dir, dst_dir, pattern='*.xml', force=False,
+                 workers=None):
+    """Convert all polylist XML files in a directory tree.
+
+    The directory structure of `src_dir` is reproduced in `dst_dir`, and
+    each output file has the same name as its input file. Files are
+    converted in parallel by a pool of worker processes.
+
+    Parameters
+    ----------
+    src_dir : str
+        Path to the input directory. It is searched recursively.
+    dst_dir : str
+        Path to the output directory; created if needed. May be the same
+        as `src_dir` to convert files in place; files already in geoset
+        XML format are then skipped.
+    pattern : str, optional
+        Shell-style pattern (see `fnmatch`) matched against the names of
+        the input files. Default value is '*.xml'.
+    force : bool, optional
+        If False, files with up-to-date outputs are skipped (see
+        `is_up_to_date`). Ignored for in-place conversions. Default value
+        is False.
+    workers : int or None, optional
+        Number of worker processes. If None, the number of CPUs is used.
+        Default value is None.
+
+    Returns
+    -------
+    out : list
+        List of (src, dst, converted) tuples, one for each input file, in
+        sorted order; `converted` is False for skipped files.
+
+    """
+    out, tasks = [], []
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        dirnames.sort()
+        for name in sorted(fnmatch.filter(filenames, pattern)):
+            src = os.path.join(dirpath, name)
+            dst = os.path.join(dst_dir, os.path.relpath(src, src_dir))
+            out.append((src, dst))
+            if _needs_conversion(src, dst, force):
+                tasks.append((src, dst, force))
+                if not os.path.isdir(os.path.dirname(dst)):
+                    os.makedirs(os.path.dirname(dst))
+
+    flags = _utils.map_chunks(_convert_chunk, tasks, workers=workers,
+                              pool='process', chunksize=1)
+    converted = set(task[1] for task, flag in zip(tasks, flags) if flag)
+    return [(src, dst, dst in converted) for src, dst in out]
+
+
+def main(argv=None):
+    """Command line interface; see the module documentation.
+
+    Parameters
+    ----------
+    argv : list or None, optional
+        Command line arguments. If None, `sys.argv` is used. Default value
+        is None.
+
+    Returns
+    -------
+    out : int
+        Exit status.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m geoutil.migrate',
+        description='Convert polylist XML files to geoset XML format.')
+    parser.add_argument('src', help='input file or directory')
+    parser.add_argument('dst', help='output file or directory')
+    parser.add_argument('-p', '--pattern', default='*.xml',
+                        help='file name pattern for directories '
+                             '(default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: number '
+                             'of CPUs)')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='convert files even if outputs are up to date')
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.src):
+        results = convert_tree(args.src, args.dst, pattern=args.pattern,
+                               force=args.force, workers=args.workers)
+        nconverted = sum(1 for src, dst, converted in results if converted)
+        nskipped = len(results) - nconverted
+    else:
+        nconverted = int(convert(args.src, args.dst, force=args.force))
+        nskipped = 1 - nconverted
+    print('converted {0:d} file(s), skipped {1:d} up-to-date file(s)'
+          .format(nconverted, nskipped))
+    return 0
+
+
+if __name__ == '__main__':
+    # Run from the imported module so that worker processes can pickle the
+    # module-level task function
+    from geoutil import migrate
+    sys.exit(migrate.main())
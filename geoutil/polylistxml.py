@@ -21,29 +21,41 @@ Functions
 =============== =============================================================
 `fromxml`       Return a |Geoset| instance from a polylist XML tree.
 `toxml`         Return a polylist XML tree from a |Geoset| instance.
+`iterread`      Iterate over the contents of a polylist XML file.
 `read`          Return a |Geoset| instance from a polylist XML file.
 `write`         Write a |Geoset| instance to a polylist XML file.
 `pretty_format` A custom XML "pretty print" formatter for polylist XML
                 files.
 =============== =============================================================
 
+Classes
+-------
+
+============= ===============================================================
+`AttrDecoder` Decode the XML attributes of elements at the same level of an
+              XML tree.
+============= ===============================================================
+
 
 .. references
 
 .. |Geo| replace:: `~geoutil._geoset.Geo`
 .. |Geoset| replace:: `~geoutil._geoset.Geoset`
+.. |Item| replace:: `~geoutil._geoset.Item`
+.. |LazyGeo| replace:: `~geoutil._geoset.LazyGeo`
 
 """
 from collections import OrderedDict
+import functools
+import re
 
-from astropy.io import fits
 try:
     from lxml import etree
 except ImportError:
     from xml.etree import ElementTree as etree
 from shapely import wkt
 
-from . import _geoset
+from . import _cache, _fileio, _geoset
 
 
 def add_XML_attrs(attr_list, element, eformat='%.16e', fformat='%.16f'):
@@ -107,23 +119,215 @@ def get_XML_attrs(element):
     `xml` and `lxml` do not return attributes in any guaranteed order!
 
     """
-    attr_list = []
-    for attr, val in element.attrib.items():
-        try:
-            val = int(val)
-        except ValueError:
-            try:
-                val = float(val)
-            except ValueError:
-                if val == 'True':
-                    val = True
-                elif val == 'False':
-                    val = False
-        attr_list.append((attr, val))
+    attr_list = [(attr, _guess_value(val))
+                 for attr, val in element.attrib.items()]
     attr_list = None if not attr_list else OrderedDict(attr_list)
     return attr_list
 
 
+def _guess_value(val):
+    """Convert an attribute value from a string based on a best guess as to
+    the intended data type (int, float, bool, or str, in that order).
+
+    """
+    try:
+        val = int(val)
+    except ValueError:
+        try:
+            val = float(val)
+        except ValueError:
+            if val == 'True':
+                val = True
+            elif val == 'False':
+                val = False
+    return val
+
+
+# Strings that int() cannot parse contain one of these characters, and
+# strings that neither int() nor float() can parse do not match _NUMERIC
+_NOT_INT = re.compile(r'[.eEnNiI]')
+_NUMERIC = re.compile(r'\s*[-+]?[\d.iInN]')
+_BOOLS = {'True': True, 'False': False}
+
+
+def _decode_int(val):
+    try:
+        return int(val)
+    except ValueError:
+        return _guess_value(val)
+
+
+def _decode_float(val):
+    if _NOT_INT.search(val) is None:
+        return _guess_value(val)
+    try:
+        return float(val)
+    except ValueError:
+        return _guess_value(val)
+
+
+def _decode_bool(val):
+    try:
+        return _BOOLS[val]
+    except KeyError:
+        return _guess_value(val)
+
+
+def _decode_str(val):
+    if _NUMERIC.match(val) is not None:
+        return _guess_value(val)
+    return _BOOLS.get(val, val)
+
+
+_DECODERS = {int: _decode_int, float: _decode_float, bool: _decode_bool,
+             str: _decode_str}
+
+
+# Column decoders return None if any value does not match the type, in which
+# case the values are decoded one at a time instead
+def _decode_int_column(vals):
+    try:
+        return list(map(int, vals))
+    except ValueError:
+        return None
+
+
+def _decode_float_column(vals):
+    # Values without any of _NOT_INT's characters may be ints
+    if not all(map(_NOT_INT.search, vals)):
+        return None
+    try:
+        return list(map(float, vals))
+    except ValueError:
+        return None
+
+
+def _decode_bool_column(vals):
+    try:
+        return list(map(_BOOLS.__getitem__, vals))
+    except KeyError:
+        return None
+
+
+def _decode_str_column(vals):
+    if any(map(_NUMERIC.match, vals)) or not _BOOLS.keys().isdisjoint(vals):
+        return None
+    return list(vals)
+
+
+_COLUMN_DECODERS = {int: _decode_int_column, float: _decode_float_column,
+                    bool: _decode_bool_column, str: _decode_str_column}
+
+
+class AttrDecoder(object):
+
+    """Decode the XML attributes of elements at the same level of an XML
+    tree, e.g., all ``ITEM`` elements.
+
+    Elements at the same level usually share the same attribute keys, with
+    values of the same type. The type of each key is inferred (see
+    `get_XML_attrs`) the first time the key is seen, and subsequent values
+    of the key are decoded directly as that type, without first trying
+    other types and relying on exceptions. Values that do not match the
+    inferred type fall back to guessing, so the decoded values are always
+    identical to those returned by `get_XML_attrs`. When all elements of a
+    level are available at once, `decode_many` decodes all values of each
+    key in bulk; `decode` decodes one element at a time, e.g., while
+    streaming a file.
+
+    Methods
+    -------
+    decode
+    decode_many
+
+    """
+
+    def __init__(self):
+        self.types = {}
+
+    def _infer(self, attr, val):
+        val = _guess_value(val)
+        self.types[attr] = type(val)
+        return val
+
+    def decode(self, element):
+        """Return an attribute dictionary from an XML element.
+
+        Parameters
+        ----------
+        element : `Element` from `xml.etree.ElementTree` or `lxml.etree`
+            XML element containing attributes.
+
+        Returns
+        -------
+        out : `OrderedDict` or None
+            Same as `get_XML_attrs`.
+
+        """
+        types = self.types
+        attr_list = []
+        for attr, val in element.attrib.items():
+            if attr in types:
+                attr_list.append((attr, _DECODERS[types[attr]](val)))
+            else:
+                attr_list.append((attr, self._infer(attr, val)))
+        return None if not attr_list else OrderedDict(attr_list)
+
+    def decode_many(self, elements):
+        """Return the attribute dictionaries of a list of XML elements.
+
+        The values of each attribute key are collected across all elements
+        and decoded at once as the inferred type of the key. If any value
+        of a key does not match the type, the values of that key are
+        decoded one at a time, as in `decode`.
+
+        Parameters
+        ----------
+        elements : list
+            List of `Element` instances from `xml.etree.ElementTree` or
+            `lxml.etree`.
+
+        Returns
+        -------
+        out : list
+            List of `OrderedDict` instances (or None), one per element; same
+            as calling `decode` for each element.
+
+        """
+        if not elements:
+            return []
+        keys = elements[0].keys()
+        if all([element.keys() == keys for element in elements]):
+            # Usual case: all elements have the same keys, in the same order
+            if not keys:
+                return [None] * len(elements)
+            columns = [self._decode_column(
+                attr, [element.get(attr) for element in elements])
+                for attr in keys]
+            return [OrderedDict(zip(keys, row)) for row in zip(*columns)]
+
+        keys_list = [element.keys() for element in elements]
+        columns = OrderedDict()
+        for element in elements:
+            for attr, val in element.items():
+                columns.setdefault(attr, []).append(val)
+        columns = dict((attr, iter(self._decode_column(attr, vals)))
+                       for attr, vals in columns.items())
+        return [OrderedDict([(attr, next(columns[attr]))
+                             for attr in element_keys])
+                if element_keys else None for element_keys in keys_list]
+
+    def _decode_column(self, attr, vals):
+        """Return the decoded values of one attribute key."""
+        if attr not in self.types:
+            self._infer(attr, vals[0])
+        kind = self.types[attr]
+        out = _COLUMN_DECODERS[kind](vals)
+        if out is None:
+            out = list(map(_DECODERS[kind], vals))
+        return out
+
+
 def fromxml(polylist_xml):
     """Convert a polylist XML tree to a |Geoset| instance.
 
@@ -144,43 +348,146 @@ def fromxml(polylist_xml):
     -----
     Text contained in ``POLY`` subelements of the XML tree is processed
     using the `wkt.loads` function to form `shapely.geometry` objects.
+    Attributes are decoded in bulk with an `AttrDecoder` for each level of
+    the tree (see `AttrDecoder.decode_many`). The FITS header is not built
+    until the `Geoset.hdr` attribute is first accessed.
 
     """
     attrs = get_XML_attrs(polylist_xml)
+    # The header is passed on as raw (keyword, value) pairs and only built
+    # on first access
     hdr = get_XML_attrs(polylist_xml[0])
     if hdr is not None:
-        hdr = fits.Header(hdr.items())
+        hdr = tuple(hdr.items())
     geoset = _geoset.Geoset(None, attrs=attrs, hdr=hdr)
 
-    if len(polylist_xml) > 1:
-        for item_xml in polylist_xml[1:]:
-            attrs = get_XML_attrs(item_xml)
-            item = _geoset.Item(None, attrs=attrs)
+    # Items and polys each share a set of attribute keys, so the attributes
+    # of each level are decoded in bulk
+    item_xml_list = list(polylist_xml[1:])
+    poly_xml_list = [poly_xml for item_xml in item_xml_list
+                     for poly_xml in item_xml]
+    item_attrs = AttrDecoder().decode_many(item_xml_list)
+    poly_attrs = iter(AttrDecoder().decode_many(poly_xml_list))
+    for item_xml, attrs in zip(item_xml_list, item_attrs):
+        item = _geoset.Item(None, attrs=attrs)
+        for poly_xml in item_xml:
+            poly = poly_xml.text
+            if poly is not None:
+                poly = wkt.loads(poly)
+            item.geos.append(_geoset.Geo(poly, attrs=next(poly_attrs)))
+        geoset.items.append(item)
 
-            if len(item_xml) > 0:
-                for poly_xml in item_xml:
-                    attrs = get_XML_attrs(poly_xml)
-                    poly = poly_xml.text
-                    if poly is not None:
-                        poly = wkt.loads(poly)
+    return geoset
 
-                    item.geos.append(_geoset.Geo(poly, attrs=attrs))
 
-            geoset.items.append(item)
+def _iterparse(file):
+    """Iterate over the elements of a polylist XML file as they are parsed.
+
+    Yields the root ``POLYLIST`` element (with its XML attributes but
+    without its children), then the ``HEADER`` element, and then each
+    complete ``ITEM`` element. Each element must be processed before the
+    next one is requested, after which it is cleared to keep memory usage
+    independent of the file size.
+
+    """
+    root = None
+    depth = 0
+    for event, elem in etree.iterparse(file, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if root is None:
+                root = elem
+                yield root
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        yield elem
+        elem.clear()
+        root.remove(elem)
 
-    return geoset
 
+def iterread(filename, compression=None, lazy=False):
+    """Iterate over the contents of a polylist XML file.
 
-def read(filename):
+    The file is parsed incrementally and each ``ITEM`` element is cleared
+    once it has been converted, so memory usage is bounded by the size of a
+    single item rather than the whole file. See `fromxml` for details about
+    the conversion.
+
+    Parameters
+    ----------
+    filename : str or file object
+        Path to the polylist XML file to be loaded, or an open binary file
+        object (e.g., an `io.BytesIO` buffer).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file; see `read`. Default value is None.
+    lazy : bool, optional
+        If True, the WKT text of each ``POLY`` element is kept and only
+        parsed when the geometry is first accessed (see |LazyGeo|), which
+        makes scans over attributes cheap. Default value is False.
+
+    Yields
+    ------
+    out : |Geoset| or |Item|
+        First, a |Geoset| instance without any items, carrying the global
+        attributes and FITS header information of the file; then one |Item|
+        instance at a time.
+
+    """
+    item_decoder, poly_decoder = AttrDecoder(), AttrDecoder()
+    geoset = None
+    with _fileio.open_file(filename, 'rb', compression) as f:
+        for i, elem in enumerate(_iterparse(f)):
+            if i == 0:
+                attrs = get_XML_attrs(elem)
+                continue
+            elif i == 1:
+                hdr = get_XML_attrs(elem)
+                if hdr is not None:
+                    hdr = tuple(hdr.items())
+                geoset = _geoset.Geoset(None, attrs=attrs, hdr=hdr)
+                yield geoset
+                continue
+
+            item = _geoset.Item(None, attrs=item_decoder.decode(elem))
+            for poly_xml in elem:
+                attrs = poly_decoder.decode(poly_xml)
+                poly = poly_xml.text
+                if poly is None:
+                    item.geos.append(_geoset.Geo(None, attrs=attrs))
+                elif lazy:
+                    loader = functools.partial(wkt.loads, poly)
+                    item.geos.append(_geoset.LazyGeo(loader, attrs=attrs))
+                else:
+                    item.geos.append(
+                        _geoset.Geo(wkt.loads(poly), attrs=attrs))
+            yield item
+
+    if geoset is None:
+        # No HEADER element
+        yield _geoset.Geoset(None, attrs=attrs)
+
+
+@_cache.cached('polylistxml')
+def read(filename, compression=None, lazy=False):
     """Create a |Geoset| instance from a polylist XML file.
 
-    Uses `fromxml` to parse the XML tree after the file is loaded. See
+    Uses `iterread` to parse the file incrementally. See `iterread` and
     `fromxml` for details.
 
     Parameters
     ----------
-    filename : str
-        Path to the polylist XML file to be loaded.
+    filename : str or file object
+        Path to the polylist XML file to be loaded, or an open binary file
+        object (e.g., an `io.BytesIO` buffer).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). The
+        file is decompressed as it is parsed. Default value is None.
+    lazy : bool, optional
+        If True, geometries are only parsed from WKT when first accessed;
+        see `iterread`. Default value is False.
 
     Returns
     -------
@@ -190,8 +497,10 @@ def read(filename):
         file.
 
     """
-    polylist_xml = etree.parse(filename).getroot()
-    return fromxml(polylist_xml)
+    contents = iterread(filename, compression=compression, lazy=lazy)
+    geoset = next(contents)
+    geoset.items.extend(contents)
+    return geoset
 
 
 def toxml(geoset):
@@ -242,7 +551,7 @@ def toxml(geoset):
         add_XML_attrs(geoset.attrs, geoset_xml)
 
     header_xml = etree.SubElement(geoset_xml, 'HEADER')
-    if geoset.hdr is not None:
+    if geoset.has_hdr:
         add_XML_attrs(geoset.hdr, header_xml)
 
     for item in geoset.items:
@@ -292,7 +601,7 @@ def pretty_format(elem, level=0, indent='  '):
             elem.tail = i
 
 
-def write(geoset, filename):
+def write(geoset, filename, compression=None):
     """Write a |Geoset| instance to a polylist XML file.
 
     Uses `toxml` to form an XML tree which is then written to file. See
@@ -302,11 +611,17 @@ def write(geoset, filename):
     ----------
     geoset : |Geoset|
         The input |Geoset| instance.
-    filename : str
-        Destination path of the output polylist XML file.
+    filename : str or file object
+        Destination path of the output polylist XML file, or an open
+        binary file object (e.g., an `io.BytesIO` buffer).
+    compression : {None|'gzip'|'bz2'|'xz'|'zstd'}, optional
+        Compression format of the file. If None, the format is inferred
+        from the file extension (see `geoutil._fileio.open_file`). Default
+        value is None.
 
     """
     polylist_xml = toxml(geoset)
     pretty_format(polylist_xml)
     tree = etree.ElementTree(polylist_xml)
-    tree.write(filename, encoding='UTF-8', xml_declaration=True)
+    with _fileio.open_file(filename, 'wb', compression) as f:
+        tree.write(f, encoding='UTF-8', xml_declaration=True)
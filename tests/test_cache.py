@@ -0,0 +1,180 @@
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+
+import pytest
+from shapely import geometry
+
+import geoutil
+from geoutil import _cache, _geoset, ds9regfile, geosetxml
+
+
+def _geoset_of(n, offset=0):
+    return _geoset.Geoset([
+        _geoset.Item(_geoset.Geo(geometry.box(i + offset, 0, i + 1, 1)),
+                     attrs=OrderedDict([('i', i)]))
+        for i in range(n)])
+
+
+def _assert_same(geoset, other):
+    assert len(geoset.items) == len(other.items)
+    for item, other_item in zip(geoset.items, other.items):
+        assert item.attrs == other_item.attrs
+        assert item.geos[0].geo.equals(other_item.geos[0].geo)
+
+
+def _snapshots(directory):
+    return sorted(name for name in os.listdir(directory)
+                  if name.endswith('.gsb'))
+
+
+@pytest.fixture
+def cache_dir(tmpdir):
+    directory = str(tmpdir.join('cache'))
+    geoutil.configure_cache(directory)
+    geoutil.cache_stats(reset=True)
+    yield directory
+    geoutil.configure_cache(None)
+
+
+def test_hit_and_miss(tmpdir, cache_dir):
+    path = str(tmpdir.join('a.xml'))
+    geosetxml.write(_geoset_of(5), path)
+
+    first = geosetxml.read(path)
+    assert geoutil.cache_stats() == dict(
+        hits=0, misses=1, writes=1, evictions=0, errors=0)
+    assert len(_snapshots(cache_dir)) == 1
+
+    second = geosetxml.read(path)
+    assert geoutil.cache_stats()['hits'] == 1
+    _assert_same(first, second)
+
+    # Keyword arguments that do not change the result share the snapshot
+    geosetxml.read(path, workers=2)
+    assert geoutil.cache_stats()['hits'] == 2
+
+    # File objects are never cached
+    with open(path, 'rb') as f:
+        geosetxml.read(f)
+    assert geoutil.cache_stats(reset=True)['misses'] == 1
+
+
+def test_path_like(tmpdir, cache_dir):
+    path = str(tmpdir.join('a.xml'))
+    geosetxml.write(_geoset_of(3), path)
+    geosetxml.read(pathlib.Path(path))
+    geosetxml.read(path)
+    stats = geoutil.cache_stats()
+    assert (stats['misses'], stats['hits']) == (1, 1)
+
+
+def test_options_are_part_of_the_key(tmpdir, cache_dir):
+    path = str(tmpdir.join('a.reg'))
+    ds9regfile.write(_geoset_of(3), path)
+    ds9regfile.read(path)
+    ds9regfile.read(path, validate=False)
+    assert geoutil.cache_stats()['misses'] == 2
+    assert len(_snapshots(cache_dir)) == 2
+
+
+def test_invalidation(tmpdir, cache_dir):
+    path = str(tmpdir.join('a.xml'))
+    geosetxml.write(_geoset_of(3), path)
+    geosetxml.read(path)
+    stat = os.stat(path)
+
+    # Same size and modification time, different contents
+    geosetxml.write(_geoset_of(3, offset=0.5), path)
+    assert os.path.getsize(path) == stat.st_size
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    out = geosetxml.read(path)
+    assert geoutil.cache_stats()['misses'] == 2
+    assert out.items[0].geos[0].geo.equals(geometry.box(0.5, 0, 1, 1))
+
+    # Same contents, different modification time
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    geosetxml.read(path)
+    assert geoutil.cache_stats()['misses'] == 3
+    assert geoutil.cache_stats()['hits'] == 0
+
+
+def test_lru_eviction(tmpdir, cache_dir):
+    paths, snapshots = [], []
+    for n, name in enumerate('abc'):
+        path = str(tmpdir.join(name + '.xml'))
+        geosetxml.write(_geoset_of(10), path)
+        before = set(_snapshots(cache_dir))
+        geosetxml.read(path)
+        snapshot, = set(_snapshots(cache_dir)) - before
+        # Make the order of use unambiguous
+        os.utime(os.path.join(cache_dir, snapshot), (1000 * (n + 1),) * 2)
+        paths.append(path)
+        snapshots.append(snapshot)
+    sizes = [os.path.getsize(os.path.join(cache_dir, snapshot))
+             for snapshot in snapshots]
+
+    # A hit marks the snapshot of "a" as the most recently used one
+    geosetxml.read(paths[0])
+    geoutil.configure_cache(cache_dir, max_size=sizes[0] + sizes[2])
+    assert _snapshots(cache_dir) == sorted([snapshots[0], snapshots[2]])
+    assert geoutil.cache_stats()['evictions'] == 1
+
+    # Writing a new snapshot evicts the least recently used one ("c")
+    os.utime(os.path.join(cache_dir, snapshots[2]), (1000,) * 2)
+    geosetxml.read(paths[1])
+    assert _snapshots(cache_dir) == sorted([snapshots[0], snapshots[1]])
+    assert geoutil.cache_stats()['evictions'] == 2
+
+
+def test_memory_mapped_formats_are_not_cached(tmpdir, cache_dir):
+    geosetfits = pytest.importorskip('geoutil.geosetfits')
+    path = str(tmpdir.join('a.fits'))
+    geosetfits.write(_geoset_of(3), path)
+    geosetfits.read(path)
+    geosetfits.read(path)
+    assert _snapshots(cache_dir) == []
+    assert geoutil.cache_stats()['misses'] == 0
+
+
+def test_concurrent_readers(tmpdir, cache_dir):
+    path = str(tmpdir.join('a.xml'))
+    expected = _geoset_of(200)
+    geosetxml.write(expected, path)
+
+    results, errors = [], []
+
+    def read():
+        try:
+            for n in range(5):
+                results.append(geosetxml.read(path))
+        except Exception as exc:  # pragma: no cover
+            errors.append(exc)
+
+    threads = [threading.Thread(target=read) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(results) == 40
+    for geoset in results:
+        _assert_same(expected, geoset)
+    stats = geoutil.cache_stats()
+    assert stats['errors'] == 0
+    assert stats['hits'] + stats['misses'] == 40
+    # Concurrent misses all write a temporary file and rename it over the
+    # same snapshot
+    assert os.listdir(cache_dir) == _snapshots(cache_dir)
+    assert len(_snapshots(cache_dir)) == 1
+
+
+def test_disabled(tmpdir):
+    path = str(tmpdir.join('a.xml'))
+    geosetxml.write(_geoset_of(2), path)
+    geoutil.cache_stats(reset=True)
+    geosetxml.read(path)
+    assert geoutil.cache_stats()['misses'] == 0
+    assert _cache._CONFIG['directory'] is None
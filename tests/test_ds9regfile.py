@@ -0,0 +1,237 @@
+import io
+
+import numpy as np
+import pytest
+from shapely import geometry
+
+from geoutil import _geoset, ds9regfile
+
+
+def _region_file(*lines):
+    """Return a DS9 region file written by `ds9regfile.write` (one square)
+    with extra lines appended.
+
+    """
+    geoset = _geoset.Geoset(_geoset.Item(_geoset.Geo(
+        geometry.box(0, 0, 1, 1))))
+    buf = io.StringIO()
+    ds9regfile.write(geoset, buf)
+    return io.StringIO(buf.getvalue() + ''.join(
+        line + '\n' for line in lines))
+
+
+def test_read_skips_sexagesimal_shapes():
+    geoset = ds9regfile.read(_region_file('circle(10:00:00,+20:00:00,2")'))
+    assert len(geoset.items) == 1
+    assert geoset.items[0].geos[0].geo.equals(geometry.box(0, 0, 1, 1))
+
+
+def test_read_shapes_skips_non_numeric_lines():
+    shapes = ds9regfile.read_shapes(_region_file(
+        'circle(10:00:00,+20:00:00,2")', 'circle(1,2,3)'))
+    assert len(shapes) == 1
+    assert np.allclose(shapes.params, [[1, 2, 3, 3, 0]])
+
+
+def test_box_without_angle():
+    lines = ['box(5,6,1,1)', 'box(5,6,2,4,30)', 'ellipse(1,2,3,4)',
+             'ellipse(1,2,3,4,45)', 'annulus(0,0,1,2,3)', 'circle(1,1,1)']
+    shapes = ds9regfile.read_shapes(_region_file(*lines))
+    expected = [[5, 6, 1, 1, 0], [5, 6, 2, 4, 30], [1, 2, 3, 4, 0],
+                [1, 2, 3, 4, 45], [0, 0, 1, 3, 0], [1, 1, 1, 1, 0]]
+    assert list(shapes.kinds) == [3, 3, 2, 2, 4, 1]
+    assert np.allclose(shapes.params, expected)
+
+    geoset = ds9regfile.read(_region_file(*lines))
+    assert len(geoset.items) == 1 + len(lines)
+    assert geoset.items[1].geos[0].geo.equals(geometry.box(4.5, 5.5, 5.5,
+                                                           6.5))
+
+
+@pytest.mark.parametrize('kind, params', [
+    ('circle', [0.5, -1, 2, 2, 0]),
+    ('ellipse', [1, 2, 3, 1, 0]),
+    ('ellipse', [1, 2, 3, 1, 30]),
+    ('box', [-1, 1, 4, 2, 0]),
+    ('box', [-1, 1, 4, 2, 60]),
+    ('annulus', [0, 0, 1, 2.5, 0]),
+    ])
+def test_shapes_contains_matches_polygon(kind, params):
+    kind = ds9regfile.SHAPE_KINDS[kind]
+    shapes = ds9regfile.Shapes([kind], [params])
+    poly = ds9regfile.shape_polygon(kind, params, segments=1024)
+
+    rng = np.random.default_rng(0)
+    x = rng.uniform(params[0] - 5, params[0] + 5, 5000)
+    y = rng.uniform(params[1] - 5, params[1] + 5, 5000)
+    points = [geometry.Point(xi, yi) for xi, yi in zip(x, y)]
+    # Ignore points too close to the boundary, where the polygon only
+    # approximates the shape
+    far = np.array([poly.boundary.distance(p) > 1e-3 for p in points])
+    expected = np.array([poly.contains(p) for p in points])
+    inside = shapes.contains(x, y)
+    assert expected[far].any() and not expected[far].all()
+    assert np.array_equal(inside[far], expected[far])
+
+
+def test_shapes_contains_several_shapes():
+    kinds = [ds9regfile.SHAPE_KINDS[name]
+             for name in ('circle', 'box', 'annulus')]
+    params = [[0, 0, 1, 1, 0], [10, 0, 2, 2, 45], [20, 0, 1, 2, 0]]
+    shapes = ds9regfile.Shapes(kinds, params)
+    x = np.array([0, 0, 10, 11.2, 20, 21.5, 30])
+    y = np.zeros(len(x))
+    assert list(shapes.contains(x, y)) == [True, True, True, True, False,
+                                           True, False]
+
+
+def test_read_merges_overlapping_parts():
+    region = io.StringIO(
+        'physical\n'
+        'polygon(0,0,2,0,2,2,0,2) # tag={item 0} tag={geo 0} tag={poly 0}\n'
+        'polygon(1,1,3,1,3,3,1,3) # tag={item 0} tag={geo 0} tag={poly 1}\n')
+    geo = ds9regfile.read(region).items[0].geos[0].geo
+    assert geo.is_valid
+    assert geo.geom_type == 'Polygon'
+    assert abs(geo.area - 7) < 1e-12
+
+    region.seek(0)
+    geo = ds9regfile.read(region, validate=False).items[0].geos[0].geo
+    assert geo.geom_type == 'MultiPolygon'
+    assert not geo.is_valid
+
+
+def test_read_untagged_polygons():
+    # Region file written by DS9 itself, without any tags
+    region = io.StringIO(
+        '# Region file format: DS9 version 4.1\n'
+        'global color=green dashlist=8 3 width=1 select=1\n'
+        'physical\n'
+        'polygon(0,0,1,0,1,1,0,1)\n'
+        'circle(5,5,1)\n'
+        'polygon(2,0,3,0,3,1,2,1) # color=red\n'
+        'polygon(4,0,5,0,5,1,4,1)\n')
+    geoset = ds9regfile.read(region)
+    assert geoset.attrs['coordsys'] == 'physical'
+    assert len(geoset.items) == 4
+    assert all(len(item.geos) == 1 for item in geoset.items)
+    geoms = [item.geos[0].geo for item in geoset.items]
+    assert geoms[0].equals(geometry.box(0, 0, 1, 1))
+    assert geoms[2].equals(geometry.box(2, 0, 3, 1))
+    assert geoms[3].equals(geometry.box(4, 0, 5, 1))
+    assert geoms[1].geom_type == 'Polygon'
+
+
+def test_read_single_untagged_polygon():
+    geoset = ds9regfile.read(io.StringIO(
+        'physical\npolygon(0,0,1,0,1,1,0,1)\n'))
+    assert len(geoset.items) == 1
+    assert geoset.items[0].geos[0].geo.equals(geometry.box(0, 0, 1, 1))
+
+
+def test_read_detects_untagged_region_file(tmpdir):
+    import geoutil
+
+    path = tmpdir.join('third_party.reg')
+    path.write('physical\npolygon(0,0,1,0,1,1,0,1)\n'
+               'polygon(2,0,3,0,3,1,2,1)\n')
+    geoset = geoutil.read(str(path))
+    assert [len(item.geos) for item in geoset.items] == [1, 1]
+
+
+def _tagged_polygon(coords):
+    return io.StringIO(
+        'physical\n'
+        'polygon({0:s}) # tag={{item 0}} tag={{geo 0}} tag={{poly 0}}\n'
+        .format(coords))
+
+
+def test_read_repairs_self_intersecting_rings():
+    # The ring touches itself at (2, 0) and is split there
+    geo = ds9regfile.read(
+        _tagged_polygon('0,0,4,0,4,4,2,0,0,4')).items[0].geos[0].geo
+    assert geo.is_valid
+    assert geo.geom_type == 'MultiPolygon'
+    assert geo.equals(geometry.MultiPolygon([
+        geometry.Polygon([(0, 0), (2, 0), (0, 4)]),
+        geometry.Polygon([(2, 0), (4, 0), (4, 4)])]))
+
+    # Bow tie
+    geo = ds9regfile.read(
+        _tagged_polygon('0,0,2,2,2,0,0,2')).items[0].geos[0].geo
+    assert geo.is_valid
+    assert not geo.is_empty
+
+
+def test_read_without_validation():
+    coords = [(0, 0), (2, 2), (2, 0), (0, 2), (0, 0)]
+    geoset = ds9regfile.read(_tagged_polygon('0,0,2,2,2,0,0,2'),
+                             validate=False)
+    geo = geoset.items[0].geos[0].geo
+    assert not geo.is_valid
+    assert list(geo.exterior.coords) == coords
+
+    contents = ds9regfile.iterread(_tagged_polygon('0,0,2,2,2,0,0,2'),
+                                   validate=False)
+    next(contents)
+    geo = next(contents).geos[0].geo
+    assert not geo.is_valid
+    assert list(geo.exterior.coords) == coords
+
+
+def _old_write(geoset, fmt='.15f'):
+    """The original DS9 writer, which formats each value with
+    `str.format`.
+
+    """
+    fmt = '{{0:{0:s}}}'.format(fmt)
+    lines = ['physical\n']
+    for i, item in enumerate(geoset.items):
+        itag = ' tag={{item {0:d}}}'.format(i)
+        for j, geo in enumerate(item.geos):
+            gtag = ' tag={{geo {0:d}}}'.format(j)
+            poly = geo.geo
+            poly = [poly] if poly.geom_type == 'Polygon' else poly.geoms
+            for k, subpoly in enumerate(poly):
+                ptag = ' tag={{poly {0:d}}}'.format(k)
+                xy = np.array(subpoly.exterior.coords)
+                xy = ','.join(fmt.format(v) for v in np.ravel(xy))
+                line = 'polygon({0:s}) #{1:s}{2:s}{3:s}\n'
+                lines.append(line.format(xy, itag, gtag, ptag))
+                for hole in subpoly.interiors:
+                    xy = np.array(hole.coords)
+                    xy = ','.join(fmt.format(v) for v in np.ravel(xy))
+                    line = 'polygon({0:s}) # background{1:s}{2:s}{3:s}\n'
+                    lines.append(line.format(xy, itag, gtag, ptag))
+    return ''.join(lines)
+
+
+def _writer_geoset():
+    rng = np.random.RandomState(0)
+    shell = geometry.Point(1234.5, -0.25).buffer(100.123456789, 8)
+    poly = shell.difference(geometry.Point(1234.5, -0.25).buffer(10, 4))
+    multi = geometry.MultiPolygon([
+        geometry.box(-1e-7, 3, 2.5, 4),
+        geometry.Polygon(rng.uniform(-1e6, 1e6, (3, 2)))])
+    box = geometry.box(0, 0, 1, 1)
+    return _geoset.Geoset([
+        _geoset.Item([_geoset.Geo(poly), _geoset.Geo(multi)]),
+        _geoset.Item(_geoset.Geo(box))])
+
+
+@pytest.mark.parametrize('fmt', ['.15f', '.3f', 'f', '+.2e', '12.4f',
+                                 '-.6g', ' .1F', '#.0f', '010.3E', ',.2f',
+                                 '>14.3f', '.5', ''])
+def test_write_matches_old_writer(fmt):
+    geoset = _writer_geoset()
+    buf = io.StringIO()
+    ds9regfile.write(geoset, buf, fmt=fmt)
+    assert buf.getvalue() == _old_write(geoset, fmt)
+
+
+@pytest.mark.parametrize('field', ['{:.3f}', '{0:.3f}'])
+def test_write_replacement_field(field):
+    geoset = _writer_geoset()
+    buf = io.StringIO()
+    ds9regfile.write(geoset, buf, fmt=field)
+    assert buf.getvalue() == _old_write(geoset, '.3f')
@@ -0,0 +1,125 @@
+import bz2
+import gzip
+import io
+import lzma
+
+import pytest
+from shapely import geometry
+
+from geoutil import (_fileio, _geoset, ds9regfile, geosetbin, geosetxml,
+                     polylistxml)
+
+COMPRESSIONS = ['gzip', 'bz2', 'xz']
+COMPRESS = {'gzip': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+EXTENSIONS = {None: '', 'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('a.xml', None), ('a.xml.gz', 'gzip'), ('a.GZIP', 'gzip'),
+    ('a.reg.bz2', 'bz2'), ('a.xz', 'xz'), ('a.lzma', 'xz'),
+    ('a.zst', 'zstd'), ('a.zstd', 'zstd'), ('a.gz.xml', None), ('a', None)])
+def test_infer_compression(filename, expected):
+    assert _fileio.infer_compression(filename) == expected
+
+
+def test_infer_compression_file_objects():
+    assert _fileio.infer_compression(io.BytesIO()) is None
+    buf = io.BytesIO()
+    buf.name = 'a.xml.bz2'
+    assert _fileio.infer_compression(buf) == 'bz2'
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_sniff_compression(compression):
+    head = COMPRESS[compression](b'<GEOSET/>')[:8]
+    assert _fileio.sniff_compression(head) == compression
+
+
+def test_sniff_compression_plain():
+    assert _fileio.sniff_compression(b'<GEOSET/>') is None
+    assert _fileio.sniff_compression(b'') is None
+    assert _fileio.sniff_compression(b'\x28\xb5\x2f\xfd\x00') == 'zstd'
+
+
+@pytest.mark.parametrize('compression', [None] + COMPRESSIONS)
+def test_open_file_path(tmpdir, compression):
+    path = str(tmpdir.join('a.txt' + EXTENSIONS[compression]))
+    text = u'caf\xe9\nline 2\n' * 100
+    with _fileio.open_file(path, 'w') as f:
+        f.write(text)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    assert _fileio.sniff_compression(raw[:8]) == compression
+    with _fileio.open_file(path, 'r') as f:
+        assert f.read() == text
+    with _fileio.open_file(path, 'rb') as f:
+        assert f.read() == text.encode('utf-8')
+
+
+@pytest.mark.parametrize('compression', [None] + COMPRESSIONS)
+def test_open_file_object_stays_open(compression):
+    buf = io.BytesIO()
+    with _fileio.open_file(buf, 'w', compression) as f:
+        f.write(u'abc\n')
+    assert not buf.closed
+    data = buf.getvalue()
+    if compression is not None:
+        assert _fileio.sniff_compression(data) == compression
+    buf.seek(0)
+    with _fileio.open_file(buf, 'r', compression) as f:
+        assert f.read() == u'abc\n'
+    assert not buf.closed
+
+
+def test_open_file_unknown_compression():
+    with pytest.raises(ValueError):
+        with _fileio.open_file(io.BytesIO(), 'rb', 'rar'):
+            pass
+
+
+@pytest.mark.parametrize('compression', [None] + COMPRESSIONS)
+def test_peek(tmpdir, compression):
+    data = b'<GEOSET>' + b'x' * 10000
+    if compression is not None:
+        data = COMPRESS[compression](data)
+    buf = io.BytesIO(data)
+    assert _fileio.peek(buf, size=8, compression=compression) == b'<GEOSET>'
+    assert buf.tell() == 0
+    assert buf.read() == data
+
+    path = str(tmpdir.join('a' + EXTENSIONS[compression]))
+    with open(path, 'wb') as f:
+        f.write(data)
+    assert _fileio.peek(path, size=8) == b'<GEOSET>'
+
+
+def _geoset_of(n):
+    return _geoset.Geoset([
+        _geoset.Item(_geoset.Geo(geometry.box(i, 0, i + 1, 1).difference(
+            geometry.box(i + 0.25, 0.25, i + 0.75, 0.75))))
+        for i in range(n)])
+
+
+@pytest.mark.parametrize('module, ext', [
+    (geosetxml, '.xml'), (polylistxml, '.xml'), (ds9regfile, '.reg'),
+    (geosetbin, '.gsb')])
+@pytest.mark.parametrize('compression', [None] + COMPRESSIONS)
+def test_interface_modules_roundtrip(tmpdir, module, ext, compression):
+    geoset = _geoset_of(3)
+
+    # By extension
+    path = str(tmpdir.join('a' + ext + EXTENSIONS[compression]))
+    module.write(geoset, path)
+    with open(path, 'rb') as f:
+        assert _fileio.sniff_compression(f.read(8)) == compression
+    out = module.read(path)
+    assert [item.geos[0].geo.equals(other.geos[0].geo)
+            for item, other in zip(out.items, geoset.items)] == [True] * 3
+
+    # File objects with an explicit compression
+    buf = io.BytesIO()
+    module.write(geoset, buf, compression=compression)
+    buf.seek(0)
+    out = module.read(buf, compression=compression)
+    assert len(out.items) == 3
+    assert out.items[2].geos[0].geo.equals(geoset.items[2].geos[0].geo)
@@ -0,0 +1,42 @@
+import io
+
+from shapely import geometry
+
+from geoutil.footprint import FootprintIndex
+
+
+def _index(names=None):
+    return FootprintIndex([geometry.box(0, 0, 1, 1),
+                           geometry.box(2, 0, 3, 1.5)], names=names)
+
+
+def _assert_equal(index, other):
+    assert len(index) == len(other)
+    assert index.names == other.names
+    for fp, other_fp in zip(index.footprints, other.footprints):
+        assert fp.equals(other_fp)
+
+
+def test_save_load_without_extension(tmpdir):
+    index = _index(names=['a.fits', 'b.fits'])
+    path = str(tmpdir.join('idx'))
+    index.save(path)
+    assert tmpdir.join('idx.npz').check()
+    _assert_equal(index, FootprintIndex.load(path))
+    _assert_equal(index, FootprintIndex.load(path + '.npz'))
+
+
+def test_save_load_with_extension(tmpdir):
+    index = _index()
+    path = str(tmpdir.join('idx.npz'))
+    index.save(path)
+    assert not tmpdir.join('idx.npz.npz').check()
+    _assert_equal(index, FootprintIndex.load(path))
+
+
+def test_save_load_file_object():
+    index = _index(names=['a', 'b'])
+    buf = io.BytesIO()
+    index.save(buf)
+    buf.seek(0)
+    _assert_equal(index, FootprintIndex.load(buf))
@@ -0,0 +1,461 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+from shapely import geometry
+
+from geoutil import _geoset, _utils, geosetxml
+
+fits = pytest.importorskip('astropy.io.fits')
+
+
+def _header():
+    hdr = fits.Header()
+    hdr['NAXIS'] = 2
+    hdr['NAXIS1'] = 100
+    hdr['NAXIS2'] = 100
+    hdr['CTYPE1'] = 'RA---TAN'
+    hdr['CTYPE2'] = 'DEC--TAN'
+    hdr['CRPIX1'] = 50.
+    hdr['CRPIX2'] = 50.
+    hdr['CRVAL1'] = 10.
+    hdr['CRVAL2'] = 20.
+    hdr['CDELT1'] = -1e-4
+    hdr['CDELT2'] = 1e-4
+    return hdr
+
+
+def test_read_headers_are_independent(tmpdir):
+    path = str(tmpdir.join('geoset.xml'))
+    geoset = _geoset.Geoset(
+        [_geoset.Item(_geoset.Geo(geometry.box(0, 0, 1, 1)))],
+        hdr=_header())
+    geosetxml.write(geoset, path)
+
+    first = geosetxml.read(path)
+    wcs = first.wcs
+    first.hdr['NAXIS1'] = 5
+    first.hdr['CRVAL1'] = 50.
+
+    second = geosetxml.read(path)
+    assert second.hdr is not first.hdr
+    assert second.hdr['NAXIS1'] == 100
+    assert second.wcs is not wcs
+    assert second.wcs.wcs.crval[0] == 10.
+
+    path2 = str(tmpdir.join('geoset2.xml'))
+    geosetxml.write(second, path2)
+    assert geosetxml.read(path2).hdr['NAXIS1'] == 100
+
+
+def test_nearest_items():
+    geoset = _geoset.Geoset([
+        _geoset.Item([_geoset.Geo(geometry.box(0, 0, 1, 1)),
+                      _geoset.Geo(geometry.box(10, 0, 11, 1))]),
+        _geoset.Item(None),
+        _geoset.Item(_geoset.Geo(geometry.box(4, 0, 5, 1)))])
+    idx, dist = geoset.nearest([2., 6., 0.5], [0.5, 0.5, 0.5])
+    assert idx.tolist() == [0, 2, 0]
+    assert dist.tolist() == [1., 1., 0.]
+
+    idx, dist = geoset.nearest([0.5], [0.5], k=3, boundary=True)
+    assert idx.tolist() == [[0, 2, -1]]
+    assert dist.tolist() == [[0.5, 3.5, float('inf')]]
+
+    idx, dist = geoset.nearest([7.5], [0.5], max_distance=2)
+    assert idx.tolist() == [-1]
+
+
+def test_validate_in_place():
+    bowtie = geometry.Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+    pinched = geometry.Polygon([(0, 0), (4, 0), (4, 4), (2, 0), (0, 4)])
+    box = geometry.box(0, 0, 1, 1)
+    geoset = _geoset.Geoset([
+        _geoset.Item([_geoset.Geo(box), _geoset.Geo(bowtie)]),
+        _geoset.Item(_geoset.Geo(None)),
+        _geoset.Item([_geoset.Geo(box), _geoset.Geo(box),
+                      _geoset.Geo(pinched)]),
+        ])
+    report = geoset.validate()
+    assert report == [(0, 1, 'Polygon', 'Polygon'),
+                      (2, 2, 'Polygon', 'MultiPolygon')]
+    assert all(geo.geo is None or geo.geo.is_valid for geo in geoset.geos)
+    assert geoset.items[0].geos[0].geo is box
+    assert geoset.items[2].geos[2].geo.equals(pinched.buffer(0))
+    assert geoset.validate() == []
+
+
+def _dissolve_geoset():
+    def geo(x, area):
+        return _geoset.Geo(geometry.box(x, 0, x + 2, 1),
+                           attrs=OrderedDict([('area', area), ('x', x)]))
+
+    return _geoset.Geoset([
+        _geoset.Item([geo(0, 2), geo(1, 2), geo(5, 2)],
+                     attrs=OrderedDict([('field', 'a'), ('n', 1)])),
+        _geoset.Item([geo(10, 2), _geoset.Geo(None)],
+                     attrs=OrderedDict([('field', 'b'), ('n', 2)])),
+        _geoset.Item([geo(11, 2)],
+                     attrs=OrderedDict([('field', 'a'), ('n', 3)])),
+        _geoset.Item(_geoset.Geo(None), attrs=OrderedDict([('n', 4)])),
+        ], attrs=OrderedDict([('survey', 'x')]))
+
+
+def _union_loop(geoms):
+    out = None
+    for geom in geoms:
+        if geom is not None:
+            out = geom if out is None else out.union(geom)
+    return out
+
+
+def test_item_dissolve():
+    item = _dissolve_geoset().items[0]
+    out = item.dissolve(reducers={'area': sum, 'x': min, 'missing': max})
+    assert len(out.geos) == 1
+    assert out.geos[0].geo.equals(_union_loop([geo.geo for geo in item.geos]))
+    assert out.geos[0].geo.area == 5
+    assert out.geos[0].attrs == OrderedDict([('area', 6), ('x', 0)])
+    assert out.attrs == item.attrs and out.attrs is not item.attrs
+    assert len(item.geos) == 3
+    assert item.dissolve().geos[0].attrs is None
+    assert _geoset.Item(None).dissolve().geos[0].geo is None
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_dissolve_items(workers):
+    geoset = _dissolve_geoset()
+    out = geoset.dissolve(reducers={'area': sum}, workers=workers)
+    assert len(out.items) == len(geoset.items)
+    for item, new in zip(geoset.items, out.items):
+        assert len(new.geos) == 1
+        expected = _union_loop([geo.geo for geo in item.geos])
+        if expected is None:
+            assert new.geos[0].geo is None
+        else:
+            assert new.geos[0].geo.equals(expected)
+        assert new.attrs == item.attrs
+    assert [new.geos[0].attrs for new in out.items] == [
+        {'area': 6}, {'area': 2}, {'area': 2}, None]
+    assert out.attrs == geoset.attrs
+
+
+def test_dissolve_by_key():
+    geoset = _dissolve_geoset()
+    out = geoset.dissolve(by='field', reducers={'n': list})
+    assert [item.attrs for item in out.items] == [
+        OrderedDict([('field', 'a'), ('n', [1, 3])]),
+        OrderedDict([('field', 'b'), ('n', [2])]),
+        OrderedDict([('field', None), ('n', [4])])]
+    assert all(len(item.geos) == 1 and item.geos[0].attrs is None
+               for item in out.items)
+    assert out.items[0].geos[0].geo.equals(_union_loop(
+        [geo.geo for i in (0, 2) for geo in geoset.items[i].geos]))
+    assert out.items[0].geos[0].geo.area == 5 + 2
+    assert out.items[2].geos[0].geo is None
+    out = geoset.dissolve(by='field')
+    assert [list(item.attrs.items()) for item in out.items] == [
+        [('field', 'a')], [('field', 'b')], [('field', None)]]
+
+
+def test_clean():
+    box = geometry.box(0, 0, 1, 1)
+    flat = geometry.Polygon([(0, 0), (1, 0), (2, 0)])
+    multi = geometry.MultiPolygon([box, flat])
+    geoset = _geoset.Geoset([
+        _geoset.Item([_geoset.Geo(box, attrs=OrderedDict([('id', 1)])),
+                      _geoset.Geo(multi)]),
+        _geoset.Item(_geoset.Geo(None)),
+        ], attrs=OrderedDict([('survey', 'x')]))
+    out = geoset.clean()
+    assert out is not geoset
+    assert out.attrs == geoset.attrs
+    geos = out.geos
+    assert geos[0].geo is box
+    assert geos[0].attrs == {'id': 1}
+    assert geos[1].geo.geom_type == 'Polygon' and geos[1].geo.equals(box)
+    assert geos[2].geo is None
+    assert geoset.items[0].geos[1].geo is multi
+
+
+def _lod_geoset():
+    star = geometry.Point(0, 0).buffer(10, 64).difference(
+        geometry.Point(0, 0).buffer(3, 32))
+    blob = geometry.Point(30, 5).buffer(6, 128)
+    return _geoset.Geoset([
+        _geoset.Item([_geoset.Geo(star), _geoset.Geo(None)]),
+        _geoset.Item(_geoset.Geo(blob)),
+        ])
+
+
+def _nvertices(geo_list):
+    return sum(len(geom.exterior.coords) +
+               sum(len(ring.coords) for ring in geom.interiors)
+               for geom in geo_list if geom is not None)
+
+
+def test_build_lod_and_lod():
+    geoset = _lod_geoset()
+    full = [geo.geo for geo in geoset.geos]
+    level, geo_list = geoset.lod(5)
+    assert level == 0 and geo_list == full
+
+    geoset.build_lod([1, 0.01, 0.2])
+    assert geoset.lod()[0] == 0
+    assert geoset.lod(0.005) == (0, full)
+    assert geoset.lod(0.01)[0] == 0.01
+    assert geoset.lod(0.5)[0] == 0.2
+    assert geoset.lod(100)[0] == 1
+    counts = [_nvertices(geoset.lod(tol)[1]) for tol in (0, 0.01, 0.2, 1)]
+    assert counts == sorted(counts, reverse=True)
+    assert counts[-1] < counts[0] / 4
+    level, geo_list = geoset.lod(1)
+    assert geo_list[1] is None
+    for geom, simple in zip(full, geo_list):
+        if geom is not None:
+            assert simple.is_valid
+            assert geom.hausdorff_distance(simple) <= 1 + 1e-9
+
+    # The cache is tied to the geometry objects
+    box = geometry.box(0, 0, 1, 1)
+    geoset.items[1].geos[0].geo = box
+    with pytest.raises(ValueError):
+        geoset.lod(1)
+    geoset.build_lod([1])
+    assert geoset.lod(1)[1][2].equals(box.simplify(1))
+
+
+def _points():
+    rng = np.random.RandomState(5)
+    x, y = rng.uniform(-12, 38, 20000), rng.uniform(-12, 12, 20000)
+    # Points on and very close to the boundaries
+    angles = np.linspace(0, 2 * np.pi, 1000)
+    for r in (3, 10, 10 - 1e-6, 10 + 1e-6):
+        x = np.concatenate([x, r * np.cos(angles)])
+        y = np.concatenate([y, r * np.sin(angles)])
+    return x, y
+
+
+def _contains_brute_force(geoset, x, y):
+    return np.array([any(geo.geo is not None and
+                         geo.geo.contains(geometry.Point(xi, yi))
+                         for geo in geoset.geos)
+                     for xi, yi in zip(x, y)])
+
+
+def test_contains_points_exact():
+    geoset = _lod_geoset()
+    x, y = _points()
+    expected = _contains_brute_force(geoset, x, y)
+    assert expected.any() and not expected.all()
+    assert np.array_equal(geoset.contains_points(x, y), expected)
+    geoset.build_lod([0.1, 1])
+    assert np.array_equal(geoset.contains_points(x, y), expected)
+
+
+def test_contains_points_tolerance():
+    geoset = _lod_geoset()
+    geoset.build_lod([1])
+    x, y = _points()
+    expected = _contains_brute_force(geoset, x, y)
+    out = geoset.contains_points(x, y, tolerance=1)
+    simple = _geoset.Geoset([_geoset.Item([
+        _geoset.Geo(geom) for geom in geoset.lod(1)[1]])])
+    assert np.array_equal(out, _contains_brute_force(simple, x, y))
+    # Misclassified points are close to a boundary
+    wrong = out != expected
+    assert wrong.any()
+    assert np.array_equal(geoset.contains_points(x, y, tolerance=0.5),
+                          expected)
+
+
+def _clip_geoset():
+    def item(geo_list, name):
+        return _geoset.Item([_geoset.Geo(geom, attrs=OrderedDict([('k', k)]))
+                             for k, geom in enumerate(geo_list)],
+                            attrs=OrderedDict([('name', name)]))
+
+    return _geoset.Geoset([
+        item([geometry.box(10, 10, 20, 20)], 'inside'),
+        item([geometry.box(90, 90, 110, 110), None], 'crossing'),
+        item([geometry.box(200, 200, 210, 210)], 'outside'),
+        item([geometry.box(100.5, 0, 120, 10),
+              geometry.box(40, 40, 50, 50)], 'touching'),
+        ], attrs=OrderedDict([('survey', 'x')]), hdr=_header())
+
+
+def _clip_brute_force(geoset, footprint):
+    out = []
+    for item in geoset.items:
+        geos = []
+        for geo in item.geos:
+            if geo.geo is not None:
+                clipped = geo.geo.intersection(footprint)
+                if clipped.area > 0:
+                    geos.append((geo.attrs, clipped))
+        if geos:
+            out.append((item.attrs, geos))
+    return out
+
+
+def _assert_clipped(out, expected):
+    assert len(out.items) == len(expected)
+    for item, (attrs, geos) in zip(out.items, expected):
+        assert item.attrs == attrs
+        assert len(item.geos) == len(geos)
+        for geo, (geo_attrs, geom) in zip(item.geos, geos):
+            assert geo.attrs == geo_attrs
+            assert geo.geo.equals(geom)
+
+
+def test_clip_pixel_coordinates():
+    geoset = _clip_geoset()
+    out = geoset.clip(_header(), world=False)
+    expected = _clip_brute_force(geoset, geometry.box(0.5, 0.5, 100.5, 100.5))
+    _assert_clipped(out, expected)
+    assert [item.attrs['name'] for item in out.items] == [
+        'inside', 'crossing', 'touching']
+    assert out.items[0].geos[0].geo is geoset.items[0].geos[0].geo
+    assert out.items[0].attrs is not geoset.items[0].attrs
+    assert out.attrs == geoset.attrs
+    assert out.hdr['CRVAL1'] == 10.
+    assert len(geoset.items) == 4
+
+
+def test_clip_world_coordinates():
+    wcs = pytest.importorskip('astropy.wcs')
+    hdr = _header()
+    pixels = _clip_geoset()
+    world = _geoset.Geoset([
+        _geoset.Item([_geoset.Geo(_utils.poly_pix2world([geo.geo], hdr)[0]
+                                  if geo.geo is not None else None,
+                                  attrs=geo.attrs) for geo in item.geos],
+                     attrs=item.attrs) for item in pixels.items])
+    footprint = _utils.header_footprint(hdr)
+    expected = _clip_brute_force(world, footprint)
+    _assert_clipped(world.clip(hdr), expected)
+    w = wcs.WCS(hdr)
+    w.pixel_shape = (hdr['NAXIS1'], hdr['NAXIS2'])
+    _assert_clipped(world.clip(w), expected)
+
+
+def test_clip_many():
+    geoset = _clip_geoset()
+    hdr2 = _header()
+    hdr2['NAXIS1'] = 15
+    hdr3 = _header()
+    hdr3['NAXIS1'] = 1000
+    hdr3['NAXIS2'] = 1000
+    hdr_list = [_header(), hdr2, hdr3]
+    out = geoset.clip_many(hdr_list, world=False, workers=2)
+    assert len(out) == 3
+    for clipped, hdr in zip(out, hdr_list):
+        _assert_clipped(clipped, _clip_brute_force(
+            geoset, _utils.header_footprint(hdr, world=False)))
+    assert [item.attrs['name'] for item in out[1].items] == ['inside']
+    assert len(out[2].items) == 4
+    assert geoset.clip_many([], world=False) == []
+
+
+def _sort_geoset():
+    xs = [7, 2, 9, 0, 4, 1, 8, 3, 6, 5]
+    items = [_geoset.Item(_geoset.Geo(geometry.box(x, x % 3, x + 1,
+                                                   x % 3 + 1)),
+                          attrs=OrderedDict([('x', x)])) for x in xs]
+    items.insert(3, _geoset.Item(_geoset.Geo(None),
+                                 attrs=OrderedDict([('x', 10)])))
+    items.insert(6, _geoset.Item(_geoset.Geo(geometry.box(0, 5, 1, 6))))
+    return _geoset.Geoset(items, attrs=OrderedDict([('survey', 'x')]),
+                          hdr=_header())
+
+
+@pytest.mark.parametrize('curve', ['hilbert', 'morton'])
+def test_sort_curve(curve):
+    geoset = _sort_geoset()
+    out = geoset.sort(curve)
+    assert len(out.items) == len(geoset.items)
+    assert out.items[-1] is geoset.items[3]  # no geometries
+    spatial = [item for item in geoset.items if item is not geoset.items[3]]
+    x = np.array([item.geos[0].geo.centroid.x for item in spatial])
+    y = np.array([item.geos[0].geo.centroid.y for item in spatial])
+    keys = _utils.curve_keys(x, y, curve=curve)
+    expected = [spatial[i] for i in np.argsort(keys, kind='stable')]
+    assert all(a is b for a, b in zip(out.items, expected))
+    reverse = geoset.sort(curve, reverse=True)
+    assert all(a is b for a, b in zip(reverse.items, expected[::-1]))
+    assert reverse.items[-1] is geoset.items[3]
+    assert out.attrs == geoset.attrs and out.hdr['CRVAL1'] == 10.
+
+
+def test_sort_coordinates_and_key_function():
+    geoset = _sort_geoset()
+    order = geoset.items[:]
+    # Centroid x; the item without geometries comes last
+    out = geoset.sort('x')
+    assert [item.attrs and item.attrs['x'] for item in out.items] == [
+        0, None, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    out = geoset.sort('y')
+    ys = [item.geos[0].geo.centroid.y for item in out.items[:-1]]
+    assert ys == sorted(ys)
+
+    out = geoset.sort(key=lambda item: -(item.attrs or {}).get('x', 0))
+    assert [item.attrs and item.attrs['x'] for item in out.items][:3] == [
+        10, 9, 8]
+    assert out.items[-1] is geoset.items[6]
+    assert geoset.items == order
+
+
+def test_sort_by_attribute():
+    geoset = _sort_geoset()
+    geoset.items[0].attrs['name'] = 'b'
+    geoset.items[5].attrs['name'] = 'a'
+    geoset.items[7].attrs['name'] = 'c'
+    out = geoset.sort('name')
+    assert out.items[:3] == [geoset.items[i] for i in (5, 0, 7)]
+    assert out.items[3:] == [item for i, item in enumerate(geoset.items)
+                             if i not in (0, 5, 7)]
+    out = geoset.sort('name', reverse=True)
+    assert out.items[:3] == [geoset.items[i] for i in (7, 0, 5)]
+
+
+def test_difference():
+    box = geometry.box(0, 0, 4, 4)
+    geoset = _geoset.Geoset([
+        _geoset.Item([_geoset.Geo(box, attrs=OrderedDict([('id', 1)])),
+                      _geoset.Geo(None)],
+                     attrs=OrderedDict([('name', 'a')])),
+        _geoset.Item(_geoset.Geo(geometry.box(10, 10, 11, 11))),
+        ], attrs=OrderedDict([('survey', 'x')]))
+    masks = [geometry.box(-1, -1, 1, 1), geometry.box(3, 3, 5, 5),
+             geometry.box(0, 1, 4, 3)]
+    expected = box.difference(masks[0]).difference(masks[1]).difference(
+        masks[2])
+    mask_geoset = _geoset.Geoset([_geoset.Item(
+        [_geoset.Geo(mask) for mask in masks])])
+    for mask_arg in (masks, mask_geoset):
+        out = geoset.difference(mask_arg)
+        geos = out.geos
+        assert geos[0].geo.equals(expected)
+        assert geos[0].geo.geom_type == 'MultiPolygon'
+        assert geos[0].attrs == {'id': 1}
+        assert geos[1].geo is None
+        assert geos[2].geo.equals(geometry.box(10, 10, 11, 11))
+        assert out.items[0].attrs == {'name': 'a'}
+        assert out.attrs == geoset.attrs
+    assert geoset.items[0].geos[0].geo is box
+
+
+def test_copies_do_not_share_attrs():
+    geoset = _geoset.Geoset(
+        [_geoset.Item([_geoset.Geo(geometry.box(0, 0, 1, 1),
+                                   attrs={'id': 1})],
+                      attrs=OrderedDict([('name', 'a')]))],
+        attrs={'survey': 'x'})
+    for out in (geoset.copy(), geoset.translate(1, 1)):
+        assert out.attrs == geoset.attrs
+        assert out.attrs is not geoset.attrs
+        assert isinstance(out.attrs, OrderedDict)
+        item, other = out.items[0], geoset.items[0]
+        assert item.attrs is not other.attrs
+        assert item.geos[0].attrs is not other.geos[0].attrs
+        assert item.geos[0].attrs == {'id': 1}
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+import io
+import json
+
+import numpy as np
+import pytest
+from shapely import geometry
+
+from geoutil import _geoset, geosetbin
+
+
+def _geoset_for_roundtrip(hdr=None):
+    poly = geometry.box(0, 0, 4, 4).difference(geometry.box(1, 1, 2, 2))
+    multi = geometry.MultiPolygon([geometry.box(10, 0, 11, 1),
+                                   geometry.box(12, 0, 13.5, 1.25)])
+    items = [
+        _geoset.Item([_geoset.Geo(poly, attrs=OrderedDict([('id', 1)])),
+                      _geoset.Geo(multi)],
+                     attrs=OrderedDict([('name', u'caf\xe9'), ('flag', True),
+                                        ('value', 1.5)])),
+        _geoset.Item(_geoset.Geo(None, attrs=OrderedDict([('id', 2)]))),
+        _geoset.Item(None, attrs=OrderedDict([('name', 'empty')])),
+        _geoset.Item([_geoset.Geo(geometry.Point(1, 2)),
+                      _geoset.Geo(geometry.LineString([(0, 0), (1, 1)])),
+                      _geoset.Geo(geometry.Polygon())]),
+        ]
+    return _geoset.Geoset(items, attrs=OrderedDict([('survey', 'test')]),
+                          hdr=hdr)
+
+
+def _assert_same_geosets(out, geoset):
+    assert out.attrs == geoset.attrs
+    assert len(out.items) == len(geoset.items)
+    for item1, item2 in zip(out.items, geoset.items):
+        assert item1.attrs == item2.attrs
+        assert len(item1.geos) == len(item2.geos)
+        for geo1, geo2 in zip(item1.geos, item2.geos):
+            assert geo1.attrs == geo2.attrs
+            if geo2.geo is None:
+                assert geo1.geo is None
+            else:
+                assert geo1.geo.geom_type == geo2.geo.geom_type
+                assert geo1.geo.equals_exact(geo2.geo, 0) or (
+                    geo1.geo.is_empty and geo2.geo.is_empty)
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_roundtrip(tmpdir, mmap):
+    path = str(tmpdir.join('geoset.gsb'))
+    geoset = _geoset_for_roundtrip()
+    geosetbin.write(geoset, path)
+    out = geosetbin.read(path, mmap=mmap)
+    assert all(isinstance(geo, _geoset.LazyGeo) for geo in out.geos)
+    assert not any(geo.is_loaded for geo in out.geos)
+    _assert_same_geosets(out, geoset)
+    assert not out.has_hdr
+
+
+def test_roundtrip_header(tmpdir):
+    fits = pytest.importorskip('astropy.io.fits')
+    hdr = fits.Header()
+    hdr['NAXIS'] = 2
+    hdr['CRVAL1'] = 10.
+    hdr['CTYPE1'] = 'RA---TAN'
+    path = str(tmpdir.join('geoset.gsb'))
+    geosetbin.write(_geoset_for_roundtrip(hdr=hdr), path)
+    out = geosetbin.read(path)
+    assert out.has_hdr
+    assert out.hdr['CRVAL1'] == 10.
+    assert out.hdr['CTYPE1'] == 'RA---TAN'
+
+
+def test_read_memmaps_arrays(tmpdir):
+    path = str(tmpdir.join('geoset.gsb'))
+    geosetbin.write(_geoset_for_roundtrip(), path)
+
+    out = geosetbin.read(path)
+    store = out.items[0].geos[0]._loader.func.__self__
+    assert isinstance(store.coords, np.memmap)
+    assert not store.coords.flags.writeable
+
+    out = geosetbin.read(path, mmap=False)
+    store = out.items[0].geos[0]._loader.func.__self__
+    assert not isinstance(store.coords, np.memmap)
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip', 'xz'])
+def test_roundtrip_file_object(compression):
+    geoset = _geoset_for_roundtrip()
+    buf = io.BytesIO()
+    geosetbin.write(geoset, buf, compression=compression)
+    buf.seek(0)
+    _assert_same_geosets(geosetbin.read(buf, compression=compression),
+                         geoset)
+
+
+def test_roundtrip_compressed_path(tmpdir):
+    path = str(tmpdir.join('geoset.gsb.gz'))
+    geoset = _geoset_for_roundtrip()
+    geosetbin.write(geoset, path)
+    with open(path, 'rb') as f:
+        assert f.read(2) == b'\x1f\x8b'
+    _assert_same_geosets(geosetbin.read(path), geoset)
+
+
+def test_arrays_are_aligned(tmpdir):
+    path = str(tmpdir.join('geoset.gsb'))
+    geosetbin.write(_geoset_for_roundtrip(), path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    nmeta = int(np.frombuffer(data[8:16], dtype='<u8')[0])
+    meta = json.loads(data[16:16 + nmeta].decode('utf-8'))
+    assert meta['data_start'] % 64 == 0
+    assert all(offset % 64 == 0 for offset in meta['offsets'].values())
+
+
+def test_read_not_a_binary_geoset(tmpdir):
+    path = str(tmpdir.join('geoset.gsb'))
+    with open(path, 'wb') as f:
+        f.write(b'<GEOSET></GEOSET>')
+    with pytest.raises(ValueError):
+        geosetbin.read(path)
@@ -0,0 +1,62 @@
+import os
+from collections import OrderedDict
+
+import pytest
+from shapely import geometry
+
+from geoutil import _geoset
+
+geosetfits = pytest.importorskip('geoutil.geosetfits')
+
+
+def _geoset_with(attrs_list):
+    return _geoset.Geoset([
+        _geoset.Item(_geoset.Geo(geometry.box(i, 0, i + 1, 1)),
+                     attrs=attrs)
+        for i, attrs in enumerate(attrs_list)])
+
+
+def _open_files():
+    return sorted(os.listdir('/proc/self/fd'))
+
+
+@pytest.mark.parametrize('values', [
+    ['', 'a', None],
+    [float('nan'), 1.5, None],
+    [False, True, None],
+    [[], {'a': 1}, None],
+    ])
+def test_missing_and_fill_values_roundtrip(tmpdir, values):
+    attrs_list = [None if val is None else OrderedDict([('x', val)])
+                  for val in values]
+    path = str(tmpdir.join('geoset.fits'))
+    geosetfits.write(_geoset_with(attrs_list), path)
+    out = [item.attrs for item in geosetfits.read(path).items]
+    assert len(out) == len(attrs_list)
+    for attrs, expected in zip(out, attrs_list):
+        if expected is None:
+            assert attrs is None
+        elif isinstance(expected['x'], float) and expected['x'] != 1.5:
+            assert list(attrs) == ['x'] and attrs['x'] != attrs['x']
+        else:
+            assert attrs == expected
+
+
+def test_no_mask_column_without_missing_values(tmpdir):
+    path = str(tmpdir.join('geoset.fits'))
+    geosetfits.write(_geoset_with([{'x': ''}, {'x': 'a'}]), path)
+    assert list(geosetfits.read_columns(path, None)) == [
+        'ITEM', 'GEO', 'TYPE', 'XMIN', 'YMIN', 'XMAX', 'YMAX', 'ITEM_x']
+    assert [item.attrs for item in geosetfits.read(path).items] == [
+        {'x': ''}, {'x': 'a'}]
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'),
+                    reason='requires /proc/self/fd')
+def test_read_closes_file(tmpdir):
+    path = str(tmpdir.join('geoset.fits'))
+    geosetfits.write(_geoset_with([None, None]), path)
+    before = _open_files()
+    geoset = geosetfits.read(path, memmap=False)
+    assert _open_files() == before
+    assert geoset.items[1].geos[0].geo.equals(geometry.box(1, 0, 2, 1))
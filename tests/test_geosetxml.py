@@ -0,0 +1,33 @@
+from collections import OrderedDict
+
+import pytest
+from shapely import geometry
+
+from geoutil import _geoset, geosetxml
+
+
+def _geoset_of(nitems):
+    items = []
+    for i in range(nitems):
+        attrs = OrderedDict([('index', i)])
+        geos = [_geoset.Geo(geometry.Point(i, j).buffer(0.4, 4),
+                            attrs=OrderedDict([('j', j)]))
+                for j in range(i % 3)]
+        items.append(_geoset.Item(geos, attrs=attrs))
+    return _geoset.Geoset(items, attrs=OrderedDict([('survey', 'test')]))
+
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_parallel_read_matches_serial(tmpdir, pool):
+    path = str(tmpdir.join('geoset.xml'))
+    geosetxml.write(_geoset_of(50), path)
+    serial = geosetxml.read(path)
+    out = geosetxml.read(path, workers=3, pool=pool)
+    assert out.attrs == serial.attrs
+    assert [item.attrs for item in out.items] == [
+        OrderedDict([('index', i)]) for i in range(50)]
+    for item, other in zip(out.items, serial.items):
+        assert [geo.attrs for geo in item.geos] == [
+            geo.attrs for geo in other.geos]
+        assert all(geo.geo.equals(o.geo)
+                   for geo, o in zip(item.geos, other.geos))
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _imported_after(code, modules):
+    """Run `code` in a fresh interpreter and return which of `modules`
+    ended up in `sys.modules`.
+
+    """
+    script = ('import sys\n{0:s}\n'
+              'print(" ".join(m for m in {1!r} if m in sys.modules))'
+              ).format(code, list(modules))
+    out = subprocess.check_output([sys.executable, '-c', script], cwd=ROOT)
+    return out.decode().split()
+
+
+def test_import_is_lazy():
+    assert _imported_after('import geoutil', ['astropy', 'lxml']) == []
+
+
+@pytest.mark.parametrize('name', ['geosetxml', 'ds9regfile', 'footprint'])
+def test_submodule_on_first_access(name):
+    code = 'import geoutil\ngeoutil.{0:s}'.format(name)
+    assert _imported_after(code, ['geoutil.' + name]) == ['geoutil.' + name]
+
+
+def _import_time(code):
+    """Return the time (s) needed to run `code` in a fresh interpreter."""
+    script = ('import time\nt0 = time.perf_counter()\n{0:s}\n'
+              'print(time.perf_counter() - t0)').format(code)
+    out = subprocess.check_output([sys.executable, '-W', 'ignore', '-c',
+                                   script], cwd=ROOT)
+    return float(out.decode().split()[-1])
+
+
+def test_lazy_import_is_faster():
+    pytest.importorskip('astropy')
+    eager = ('import geoutil, geoutil.geosetxml, geoutil.ds9regfile, '
+             'geoutil.polylistxml, astropy.io.fits, astropy.wcs')
+    lazy = min(_import_time('import geoutil') for n in range(3))
+    assert lazy < min(_import_time(eager) for n in range(3))
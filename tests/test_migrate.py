@@ -0,0 +1,59 @@
+import os
+
+from shapely import geometry
+
+from geoutil import _geoset, geosetxml, migrate, polylistxml
+
+
+def _polylist_file(path):
+    geoset = _geoset.Geoset(
+        [_geoset.Item(_geoset.Geo(geometry.box(i, 0, i + 1, 1)),
+                      attrs={'name': 'item{0:d}'.format(i)})
+         for i in range(3)],
+        attrs={'survey': 'test'})
+    polylistxml.write(geoset, path)
+    return geoset
+
+
+def test_convert_in_place(tmpdir):
+    path = str(tmpdir.join('regions.xml'))
+    _polylist_file(path)
+    expected = str(tmpdir.join('expected.xml'))
+    geosetxml.write(polylistxml.read(path), expected)
+
+    assert migrate.convert(path, path)
+    with open(path, 'rb') as f:
+        converted = f.read()
+    with open(expected, 'rb') as f:
+        assert converted == f.read()
+
+    # Already converted: skipped, even when forced
+    assert not migrate.convert(path, path)
+    assert not migrate.convert(path, path, force=True)
+    with open(path, 'rb') as f:
+        assert f.read() == converted
+
+
+def test_convert_tree_in_place(tmpdir):
+    tmpdir.mkdir('sub')
+    paths = [str(tmpdir.join('a.xml')), str(tmpdir.join('sub', 'b.xml'))]
+    for path in paths:
+        _polylist_file(path)
+
+    results = migrate.convert_tree(str(tmpdir), str(tmpdir), workers=1)
+    assert [converted for src, dst, converted in results] == [True, True]
+    for path in paths:
+        assert len(geosetxml.read(path).items) == 3
+
+    results = migrate.convert_tree(str(tmpdir), str(tmpdir), force=True,
+                                   workers=1)
+    assert [converted for src, dst, converted in results] == [False, False]
+
+
+def test_convert_skips_up_to_date_output(tmpdir):
+    src, dst = str(tmpdir.join('src.xml')), str(tmpdir.join('dst.xml'))
+    _polylist_file(src)
+    assert migrate.convert(src, dst)
+    os.utime(dst, (os.path.getmtime(src) + 10,) * 2)
+    assert not migrate.convert(src, dst)
+    assert migrate.convert(src, dst, force=True)
@@ -0,0 +1,187 @@
+from collections import OrderedDict
+import gzip
+import io
+
+import pytest
+
+from geoutil import _geoset, polylistxml
+
+
+def _old_attrs(element):
+    """Decode attributes as the original `get_XML_attrs` did."""
+    def guess(val):
+        try:
+            val = int(val)
+        except ValueError:
+            try:
+                val = float(val)
+            except ValueError:
+                if val == 'True':
+                    val = True
+                elif val == 'False':
+                    val = False
+        return val
+
+    attr_list = [(attr, guess(val)) for attr, val in element.attrib.items()]
+    return None if not attr_list else OrderedDict(attr_list)
+
+
+# Each column starts with a value of the "expected" type and mixes in
+# values of other types, special floats, and whitespace
+COLUMNS = OrderedDict([
+    ('int', ['1', '-2', ' 3 ', '+4', '1_000', '5.0', 'x', '7', 'True']),
+    ('float', ['1.5', '-2e3', 'nan', 'inf', '-Infinity', '3', ' 4.25 ',
+               '1e', 'False', '.5']),
+    ('bool', ['True', 'False', 'True', 'true', '0', '2.5', 'no']),
+    ('str', ['abc', '', ' ', 'False', '12', '1.5', 'n/a', 'inf', 'x y']),
+    ('pure_int', ['1', '2', '3']),
+    ('pure_float', ['1.5', '2.', '1e10']),
+    ('pure_bool', ['False', 'True']),
+    ('pure_str', ['a', 'b c', 'Nothing']),
+    ])
+
+
+def _elements():
+    elements = []
+    n = max(len(vals) for vals in COLUMNS.values())
+    for i in range(n + 2):
+        element = polylistxml.etree.Element('ITEM')
+        for key, vals in COLUMNS.items():
+            # Some elements lack some keys, and the key order varies
+            if i < len(vals) and (i + len(key)) % 5:
+                element.set(key, vals[i])
+        if i % 2:
+            element.set('first', str(i))
+        elements.append(element)
+    return elements
+
+
+def _typed(attrs):
+    if attrs is None:
+        return None
+    return [(key, type(val), repr(val)) for key, val in attrs.items()]
+
+
+@pytest.mark.parametrize('method', ['decode', 'decode_many'])
+def test_attr_decoder_matches_old_decoder(method):
+    elements = _elements()
+    expected = [_typed(_old_attrs(element)) for element in elements]
+    decoder = polylistxml.AttrDecoder()
+    if method == 'decode':
+        out = [decoder.decode(element) for element in elements]
+    else:
+        out = decoder.decode_many(elements)
+    assert [_typed(attrs) for attrs in out] == expected
+    assert [_typed(polylistxml.get_XML_attrs(element))
+            for element in elements] == expected
+
+
+def test_fromxml_decodes_attrs_per_level():
+    root = polylistxml.etree.fromstring(
+        '<POLYLIST survey="x" n="3"><HEADER NAXIS="2"/>'
+        '<ITEM name="a" id="1"><POLY flag="True">'
+        'POLYGON ((0 0, 1 0, 1 1, 0 0))</POLY><POLY flag="False"/></ITEM>'
+        '<ITEM/>'
+        '<ITEM id="2.5" name="7"><POLY flag="maybe"/></ITEM>'
+        '</POLYLIST>')
+    geoset = polylistxml.fromxml(root)
+    assert geoset.attrs == {'survey': 'x', 'n': 3}
+    items = geoset.items
+    assert [_typed(item.attrs) for item in items] == [
+        _typed(_old_attrs(item_xml)) for item_xml in root[1:]]
+    assert [[_typed(geo.attrs) for geo in item.geos] for item in items] == [
+        [_typed(_old_attrs(poly_xml)) for poly_xml in item_xml]
+        for item_xml in root[1:]]
+    assert items[0].geos[0].geo.area == 0.5
+    assert items[0].geos[1].geo is None
+
+
+_POLYLIST = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<POLYLIST survey="x"><HEADER NAXIS="2" CRVAL1="10.5"/>'
+    b'<ITEM name="a" id="1"><POLY flag="True">'
+    b'POLYGON ((0 0, 1 0, 1 1, 0 0))</POLY><POLY flag="False"/></ITEM>'
+    b'<ITEM/>'
+    b'<ITEM name="c" id="3"><POLY>'
+    b'MULTIPOLYGON (((2 0, 3 0, 3 1, 2 0)), ((4 0, 5 0, 5 1, 4 0)))'
+    b'</POLY></ITEM>'
+    b'</POLYLIST>')
+
+
+def _same_items(items1, items2):
+    assert len(items1) == len(items2)
+    for item1, item2 in zip(items1, items2):
+        assert _typed(item1.attrs) == _typed(item2.attrs)
+        assert len(item1.geos) == len(item2.geos)
+        for geo1, geo2 in zip(item1.geos, item2.geos):
+            assert _typed(geo1.attrs) == _typed(geo2.attrs)
+            if geo2.geo is None:
+                assert geo1.geo is None
+            else:
+                assert geo1.geo.equals_exact(geo2.geo, 0)
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_iterread_matches_fromxml(lazy):
+    expected = polylistxml.fromxml(polylistxml.etree.fromstring(
+        _POLYLIST.split(b'\n', 1)[1]))
+    out = list(polylistxml.iterread(io.BytesIO(_POLYLIST), lazy=lazy))
+    geoset, items = out[0], out[1:]
+    assert isinstance(geoset, _geoset.Geoset)
+    assert geoset.items == []
+    assert geoset.attrs == expected.attrs
+    assert geoset.hdr['CRVAL1'] == expected.hdr['CRVAL1'] == 10.5
+    assert all(isinstance(item, _geoset.Item) for item in items)
+    geos = [geo for item in items for geo in item.geos]
+    assert (all(isinstance(geo, _geoset.LazyGeo) for geo in geos
+                if geo.geo is not None) or not lazy)
+    _same_items(items, expected.items)
+
+
+def test_iterread_lazy_defers_parsing():
+    out = list(polylistxml.iterread(io.BytesIO(_POLYLIST), lazy=True))
+    geo = out[1].geos[0]
+    assert isinstance(geo, _geoset.LazyGeo)
+    assert not geo.is_loaded
+    assert geo.attrs['flag'] is True
+    assert geo.geo.area == 0.5
+    assert geo.is_loaded
+
+
+def test_iterread_without_header():
+    data = (b'<POLYLIST survey="x"><ITEM><POLY>'
+            b'POLYGON ((0 0, 1 0, 1 1, 0 0))</POLY></ITEM></POLYLIST>')
+    out = list(polylistxml.iterread(io.BytesIO(data)))
+    assert isinstance(out[0], _geoset.Geoset)
+    assert not out[0].has_hdr
+
+
+def test_iterread_clears_parsed_items():
+    # Items that have been converted are removed from the tree (the parser
+    # may read ahead, so later items can already be in it)
+    data = (b'<POLYLIST><HEADER/>' +
+            b'<ITEM id="1"><POLY>POLYGON ((0 0, 1 0, 1 1, 0 0))</POLY></ITEM>'
+            * 2000 + b'</POLYLIST>')
+    root = None
+    seen = []
+    for i, elem in enumerate(polylistxml._iterparse(io.BytesIO(data))):
+        if i == 0:
+            root = elem
+            continue
+        assert root[0] is elem
+        assert all(len(prev) == 0 and prev.getparent() is None
+                   for prev in seen[-10:])
+        seen.append(elem)
+    assert len(root) == 0
+    assert len(seen) == 2001
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_read_matches_iterread(tmpdir, lazy):
+    path = str(tmpdir.join('polylist.xml.gz'))
+    with gzip.open(path, 'wb') as f:
+        f.write(_POLYLIST)
+    geoset = polylistxml.read(path, lazy=lazy)
+    items = list(polylistxml.iterread(path))[1:]
+    _same_items(geoset.items, items)
+    assert geoset.attrs == {'survey': 'x'}
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+import io
+
+import pytest
+from shapely import geometry
+
+import geoutil
+from geoutil import _geoset, _registry, polylistxml
+
+
+def _geoset_of(n):
+    return _geoset.Geoset([
+        _geoset.Item(_geoset.Geo(geometry.box(i, i % 3, i + 1, i % 3 + 1)),
+                     attrs=OrderedDict([('index', i)]))
+        for i in range(n)])
+
+
+def _assert_same_items(out, geoset):
+    assert len(out.items) == len(geoset.items)
+    for item1, item2 in zip(out.items, geoset.items):
+        assert item1.geos[0].geo.equals(item2.geos[0].geo)
+
+
+@pytest.mark.parametrize('filename, format, magic', [
+    ('a.xml', 'geosetxml', b'<'),
+    ('a.xml.gz', 'geosetxml', b'\x1f\x8b'),
+    ('a.reg', 'ds9regfile', b'physical'),
+    ('a.reg.bz2', 'ds9regfile', b'BZh'),
+    ('a.gsb', 'geosetbin', b'GEOSETB1'),
+    ('a.gsb.xz', 'geosetbin', b'\xfd7zXZ'),
+    ('a.fits', 'geosetfits', b'SIMPLE'),
+    ('a.fits.gz', 'geosetfits', b'\x1f\x8b'),
+    ])
+def test_write_read_by_extension(tmpdir, filename, format, magic):
+    if format == 'geosetfits':
+        pytest.importorskip('astropy.io.fits')
+    path = str(tmpdir.join(filename))
+    geoset = _geoset_of(5)
+    geoutil.write(geoset, path)
+    with open(path, 'rb') as f:
+        assert f.read(len(magic)) == magic
+    assert _registry.detect_format(path) == format
+    _assert_same_items(geoutil.read(path), geoset)
+
+
+@pytest.mark.parametrize('filename, format', [
+    ('a.xml', 'geosetxml'), ('a.xml.gz', 'geosetxml'),
+    ('a.reg.bz2', 'ds9regfile'), ('a.gsb', 'geosetbin')])
+def test_detect_format_ignores_extension(tmpdir, filename, format):
+    # The contents decide, not the (misleading) file name
+    path = str(tmpdir.join(filename))
+    geoutil.write(_geoset_of(2), path)
+    moved = str(tmpdir.join('renamed.dat'))
+    tmpdir.join(filename).rename(moved)
+    assert _registry.detect_format(moved) == format
+    assert len(geoutil.read(moved).items) == 2
+
+
+def test_detect_format_file_object():
+    buf = io.BytesIO()
+    geoutil.write(_geoset_of(2), buf, format='geosetxml',
+                  compression='gzip')
+    buf.seek(0)
+    assert _registry.detect_format(buf) == 'geosetxml'
+    assert buf.tell() == 0
+    assert len(geoutil.read(buf).items) == 2
+
+
+def test_detect_format_unknown(tmpdir):
+    path = str(tmpdir.join('a.dat'))
+    tmpdir.join('a.dat').write('nothing to see here\n')
+    with pytest.raises(ValueError):
+        _registry.detect_format(path)
+    with pytest.raises(ValueError):
+        geoutil.write(_geoset_of(1), path)
+
+
+def test_xml_root():
+    head = (b'\xef\xbb\xbf<?xml version="1.0"?>\n<!-- comment -->\n'
+            b'<!DOCTYPE POLYLIST>\n<POLYLIST><ITEM>')
+    assert _registry._xml_root(head) == b'POLYLIST'
+    assert _registry._xml_root(b'polygon(1,2,3,4,5,6)') is None
+
+
+def test_polylist_detected_by_contents(tmpdir):
+    # polylist XML files have the same extension as geoset XML files, so
+    # they are only recognized by their root element
+    path = str(tmpdir.join('polylist.xml'))
+    geoset = _geoset_of(3)
+    polylistxml.write(geoset, path)
+    assert _registry.detect_format(path) == 'polylistxml'
+    _assert_same_items(geoutil.read(path), geoset)
+
+    path = str(tmpdir.join('polylist.xml.gz'))
+    geoutil.write(geoset, path, format='polylistxml')
+    assert _registry.detect_format(path) == 'polylistxml'
+    _assert_same_items(geoutil.read(path), geoset)
+
+
+def test_write_never_chooses_polylist(tmpdir):
+    path = str(tmpdir.join('a.xml'))
+    geoutil.write(_geoset_of(1), path)
+    assert _registry.detect_format(path) == 'geosetxml'
+
+
+def test_write_sort(tmpdir):
+    path = str(tmpdir.join('a.gsb'))
+    # Items in a scrambled order along a line
+    xs = [7, 2, 9, 0, 4, 1, 8, 3, 6, 5]
+    geoset = _geoset.Geoset([
+        _geoset.Item(_geoset.Geo(geometry.box(x, 0, x + 0.5, 0.5)),
+                     attrs=OrderedDict([('x', x)])) for x in xs])
+    geoutil.write(geoset, path, sort='hilbert')
+    assert [item.attrs['x'] for item in geoset.items] == xs
+    out = geoutil.read(path)
+    assert ([item.attrs['x'] for item in out.items] ==
+            [item.attrs['x'] for item in geoset.sort('hilbert').items])
+
+    geoutil.write(geoset, path, sort=lambda item: -item.attrs['x'])
+    out = geoutil.read(path)
+    assert [item.attrs['x'] for item in out.items] == sorted(xs)[::-1]
+
+
+def test_register_format(tmpdir):
+    class Module(object):
+        written = []
+
+        @staticmethod
+        def read(filename, compression=None):
+            return _geoset_of(4)
+
+        @staticmethod
+        def write(geoset, filename, compression=None):
+            Module.written.append((filename, compression))
+
+    _registry.register_format('test', Module, ['.tst'],
+                              lambda head: head.startswith(b'TST'))
+    try:
+        path = str(tmpdir.join('a.tst.gz'))
+        geoutil.write(_geoset_of(1), path)
+        assert Module.written == [(path, None)]
+        tmpdir.join('b.dat').write('TST')
+        assert _registry.detect_format(str(tmpdir.join('b.dat'))) == 'test'
+        assert len(geoutil.read(str(tmpdir.join('b.dat'))).items) == 4
+    finally:
+        del _registry.FORMATS['test']
@@ -0,0 +1,469 @@
+import numpy as np
+import pytest
+from shapely import geometry
+
+from geoutil import _utils
+
+GEOSException = pytest.importorskip('shapely.errors').GEOSException
+
+
+class _FailingPolygon(object):
+
+    """Polygon whose `difference` fails as in shapely 2 overlay errors."""
+
+    def __init__(self, poly):
+        self.poly = poly
+
+    def difference(self, other):
+        raise GEOSException('TopologyException: side location conflict')
+
+    def union(self, other):
+        return self.poly.union(other)
+
+
+def test_safe_difference_falls_back_on_geos_exception():
+    poly = geometry.box(0, 0, 4, 4)
+    mask = geometry.MultiPolygon([geometry.box(0, 0, 1, 1),
+                                  geometry.box(3, 3, 4, 4)])
+    out = _utils.safe_difference(_FailingPolygon(poly), mask)
+    assert out.equals(poly.difference(mask))
+
+
+def test_batch_difference_falls_back_on_geos_exception(monkeypatch):
+    def failing_union(geoms):
+        raise GEOSException('TopologyException: side location conflict')
+
+    monkeypatch.setattr(_utils.ops, 'unary_union', failing_union)
+    target = geometry.box(0, 0, 4, 4)
+    masks = [geometry.box(0, 0, 1, 1), geometry.box(3, 3, 4, 4)]
+    out, = _utils.batch_difference([target], masks)
+    expected = target.difference(masks[0]).difference(masks[1])
+    assert out.equals(expected)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batch_difference_matches_difference_loop(workers):
+    rng = np.random.RandomState(17)
+    targets = _random_polys(rng, 30) + [geometry.box(500, 500, 501, 501)]
+    masks = _random_polys(rng, 25)
+    out = _utils.batch_difference(targets, masks, workers=workers,
+                                  chunksize=4)
+    assert len(out) == len(targets)
+    for target, poly in zip(targets, out):
+        if target is None:
+            assert poly is None
+            continue
+        expected = target
+        for mask in masks:
+            if mask is not None:
+                expected = _utils.safe_difference(expected, mask)
+        if expected.is_empty:
+            assert poly.is_empty
+        else:
+            _assert_same_area(poly, expected)
+    assert out[-1].equals(targets[-1])
+
+
+def test_batch_difference_without_masks():
+    targets = [geometry.box(0, 0, 1, 1), None]
+    out = _utils.batch_difference(targets, [])
+    assert out[0].equals(targets[0]) and out[1] is None
+    out = _utils.batch_difference(targets, [None, geometry.box(0, 0, 2, 2)])
+    assert out[0].is_empty and out[1] is None
+
+
+def _old_consolidate_polys(poly_list, hole_list=None):
+    """The original `consolidate_polys`, which applies one hole at a
+    time.
+
+    """
+    if not poly_list:
+        poly = geometry.Polygon()
+    elif len(poly_list) == 1:
+        poly = poly_list[0]
+    else:
+        poly = geometry.MultiPolygon(poly_list)
+    if hole_list is not None:
+        for hole in hole_list:
+            if hole.within(poly):
+                poly = poly.difference(hole)
+            else:
+                poly = poly.union(hole)
+    return None if poly.is_empty else poly
+
+
+def _random_holes(rng, n, overlapping):
+    holes = []
+    while len(holes) < n:
+        hole = geometry.Point(rng.uniform(-6, 26), rng.uniform(-6, 6)).buffer(
+            rng.uniform(0.1, 1.), 4)
+        if overlapping or not any(hole.intersects(h) for h in holes):
+            holes.append(hole)
+    return holes
+
+
+def _assert_same_area(out, expected):
+    """Assert that two geometries are equal up to the rounding of overlay
+    operations.
+
+    """
+    assert out.is_valid
+    assert (out.equals(expected) or
+            out.symmetric_difference(expected).area < 1e-12 * expected.area)
+
+
+@pytest.mark.parametrize('overlapping', [False, True])
+def test_consolidate_polys_matches_old(overlapping):
+    rng = np.random.RandomState(42)
+    shell_list = [geometry.Point(i * 10, 0).buffer(4, 16) for i in range(3)]
+    for trial in range(10):
+        # Holes inside, straddling, and outside the shells
+        hole_list = _random_holes(rng, 40, overlapping)
+        out = _utils.consolidate_polys(shell_list, hole_list)
+        expected = _old_consolidate_polys(shell_list, hole_list)
+        _assert_same_area(out, expected)
+
+
+def test_consolidate_polys_overlapping_shells():
+    # The original algorithm fails for overlapping shells, which are now
+    # merged first
+    shell_list = [geometry.box(0, 0, 4, 4), geometry.box(2, 0, 6, 4)]
+    hole_list = [geometry.box(0.5, 0.5, 1, 1), geometry.box(3, 1, 3.5, 3),
+                 geometry.box(5, 3, 7, 5), geometry.box(8, 8, 9, 9)]
+    with pytest.raises(GEOSException):
+        _old_consolidate_polys(shell_list, hole_list)
+    out = _utils.consolidate_polys(shell_list, hole_list)
+    expected = _old_consolidate_polys(
+        [shell_list[0].union(shell_list[1])], hole_list)
+    _assert_same_area(out, expected)
+    assert abs(out.area - (24 - 0.25 - 1 + 3 + 1)) < 1e-12
+    # Without holes, the polygons are not modified
+    out = _utils.consolidate_polys(shell_list)
+    assert out.equals(geometry.MultiPolygon(shell_list))
+
+
+def test_consolidate_polys_edge_cases():
+    box = geometry.box(0, 0, 4, 4)
+    assert _utils.consolidate_polys([]) is None
+    assert _utils.consolidate_polys([], []) is None
+    assert _utils.consolidate_polys([box]).equals(box)
+    out = _utils.consolidate_polys([], [geometry.box(0, 0, 1, 1)])
+    assert out.equals(geometry.box(0, 0, 1, 1))
+    # A hole covering the whole polygon is not within it
+    hole = geometry.box(-1, -1, 5, 5)
+    assert _utils.consolidate_polys([box], [hole]).equals(hole)
+    # Holes sharing an edge
+    holes = [geometry.box(1, 1, 2, 2), geometry.box(2, 1, 3, 2)]
+    assert _utils.consolidate_polys([box], holes).equals(
+        _old_consolidate_polys([box], holes))
+
+
+def _brute_force_nearest(x, y, poly_list, k, max_distance, boundary,
+                         group_ids):
+    ngroups = max(group_ids) + 1 if len(group_ids) else 0
+    dist = np.full((len(x), ngroups), np.inf)
+    for poly, group in zip(poly_list, group_ids):
+        if poly is None:
+            continue
+        geom = poly.boundary if boundary else poly
+        for n, (xi, yi) in enumerate(zip(x, y)):
+            d = geom.distance(geometry.Point(xi, yi))
+            dist[n, group] = min(dist[n, group], d)
+    if max_distance is not None:
+        dist[dist > max_distance] = np.inf
+    dist = np.sort(dist, axis=1)[:, :k]
+    if dist.shape[1] < k:
+        dist = np.hstack([dist, np.full((len(x), k - dist.shape[1]),
+                                        np.inf)])
+    return dist, ngroups
+
+
+def _random_polys(rng, n):
+    polys = []
+    for i in range(n):
+        cx, cy = rng.uniform(0, 100, 2)
+        if i % 3:
+            poly = geometry.Point(cx, cy).buffer(rng.uniform(0.5, 5), 4)
+        else:
+            poly = geometry.box(cx, cy, cx + rng.uniform(0.1, 10),
+                                cy + rng.uniform(0.1, 10))
+        if i % 7 == 0:
+            poly = poly.difference(geometry.Point(cx, cy).buffer(0.3, 2))
+        polys.append(poly)
+    polys[5] = None
+    return polys
+
+
+@pytest.mark.parametrize('k', [1, 3])
+@pytest.mark.parametrize('boundary', [False, True])
+@pytest.mark.parametrize('max_distance', [None, 4.])
+@pytest.mark.parametrize('grouped', [False, True])
+def test_nearest_polys_matches_brute_force(k, boundary, max_distance,
+                                           grouped):
+    rng = np.random.RandomState(1234)
+    poly_list = _random_polys(rng, 40)
+    if grouped:
+        group_ids = rng.randint(0, 15, len(poly_list))
+        group_ids[:15] = np.arange(15)
+    else:
+        group_ids = np.arange(len(poly_list))
+    # Points inside, near, and far from the polygons
+    x = np.concatenate([rng.uniform(-50, 150, 150), [1000., np.nan]])
+    y = np.concatenate([rng.uniform(-50, 150, 150), [-1000., 0.]])
+    idx, dist = _utils.nearest_polys(
+        x, y, poly_list, k=k, max_distance=max_distance, boundary=boundary,
+        group_ids=group_ids if grouped else None, chunksize=40)
+
+    valid = ~np.isnan(x)
+    expected, ngroups = _brute_force_nearest(
+        x[valid], y[valid], poly_list, k, max_distance, boundary,
+        group_ids)
+    if k == 1:
+        assert idx.shape == dist.shape == (len(x),)
+        idx, dist = idx[:, None], dist[:, None]
+    else:
+        assert idx.shape == dist.shape == (len(x), k)
+    assert np.allclose(dist[valid], expected, rtol=1e-12, atol=1e-12)
+    assert (np.isinf(dist[valid]) == np.isinf(expected)).all()
+    assert (idx[np.isinf(dist)] == -1).all()
+
+    # Indices are consistent with the distances (ties may be ordered
+    # differently)
+    for n in np.nonzero(valid)[0]:
+        found = idx[n][idx[n] >= 0]
+        assert len(set(found)) == len(found)
+        assert ((found >= 0) & (found < ngroups)).all()
+        for i, d in zip(found, dist[n]):
+            polys = [poly_list[m] for m in np.nonzero(group_ids == i)[0]
+                     if poly_list[m] is not None]
+            point = geometry.Point(x[n], y[n])
+            true = min((poly.boundary if boundary else poly).distance(point)
+                       for poly in polys)
+            assert abs(true - d) < 1e-12
+
+
+def test_nearest_polys_workers():
+    rng = np.random.RandomState(5)
+    poly_list = _random_polys(rng, 30)
+    x, y = rng.uniform(0, 100, (2, 500))
+    serial = _utils.nearest_polys(x, y, poly_list, k=2, chunksize=100)
+    parallel = _utils.nearest_polys(x, y, poly_list, k=2, chunksize=100,
+                                    workers=3)
+    for a, b in zip(serial, parallel):
+        assert np.array_equal(a, b)
+
+
+def _polys_to_validate():
+    pinched = geometry.Polygon([(0, 0), (4, 0), (4, 4), (2, 0), (0, 4)])
+    bowtie = geometry.Polygon([(10, 0), (12, 2), (12, 0), (10, 2)])
+    overlapping = geometry.MultiPolygon([geometry.box(20, 0, 22, 2),
+                                         geometry.box(21, 1, 23, 3)])
+    return [geometry.box(0, 0, 1, 1), pinched, None, bowtie,
+            geometry.box(5, 5, 6, 7), overlapping]
+
+
+@pytest.mark.parametrize('workers, chunksize', [(1, None), (2, 2)])
+def test_validate_polys_matches_validate_poly(workers, chunksize):
+    polys = _polys_to_validate()
+    out, report = _utils.validate_polys(polys, workers=workers,
+                                        chunksize=chunksize)
+    assert len(out) == len(polys)
+    for poly, new in zip(polys, out):
+        if poly is None:
+            assert new is None
+        elif poly.is_valid:
+            assert new is poly
+        else:
+            assert new.is_valid
+            assert new.equals(_utils.validate_poly(poly))
+    assert [(i, old) for i, old, new in report] == [
+        (1, 'Polygon'), (3, 'Polygon'), (5, 'MultiPolygon')]
+    assert [new for i, old, new in report] == [
+        out[i].geom_type for i, old, new in report]
+    assert report[0][2] == 'MultiPolygon'
+
+
+def test_validate_polys_make_valid():
+    polys = _polys_to_validate()
+    out, report = _utils.validate_polys(polys, method='make_valid')
+    assert [i for i, old, new in report] == [1, 3, 5]
+    assert all(poly is None or poly.is_valid for poly in out)
+    # make_valid keeps both halves of the bowtie, unlike buffer(0)
+    assert out[3].area == pytest.approx(2.)
+    assert _utils.validate_poly(polys[3]).area < out[3].area
+
+
+def test_validate_polys_buffer_distance():
+    polys = _polys_to_validate()
+    out, report = _utils.validate_polys(polys, poly_buffer=0.1)
+    assert out[0] is polys[0]
+    assert out[1].equals(polys[1].buffer(0.1))
+    assert out[1].equals(_utils.validate_poly(polys[1], poly_buffer=0.1))
+
+
+def test_validate_polys_errors():
+    with pytest.raises(ValueError):
+        _utils.validate_polys([], method='unknown')
+    assert _utils.validate_polys([]) == ([], [])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_union_groups_matches_union_loop(workers):
+    rng = np.random.RandomState(3)
+    groups = [[], [geometry.box(0, 0, 2, 1)], _random_polys(rng, 10),
+              _random_polys(rng, 40)]
+    groups.append([None, geometry.box(0, 0, 1, 1), None])
+    groups.append([None])
+    out = _utils.union_groups(groups, workers=workers, chunksize=1)
+    assert len(out) == len(groups)
+    for group, union in zip(groups, out):
+        expected = None
+        for poly in group:
+            if poly is not None:
+                expected = (poly if expected is None
+                            else expected.union(poly))
+        if expected is None:
+            assert union is None
+        else:
+            _assert_same_area(union, expected)
+
+
+def _old_clean_poly(poly):
+    """`clean_poly` as originally written (a loop over the parts)."""
+    if poly.geom_type == 'Polygon':
+        poly = [poly]
+    else:
+        poly = getattr(poly, 'geoms', [])
+    poly_list = []
+    for p in poly:
+        if (p.geom_type != 'Polygon') or p.is_empty or (p.area == 0):
+            continue
+        poly_list.append(p)
+    if len(poly_list) > 1:
+        return geometry.MultiPolygon(poly_list)
+    elif len(poly_list) == 1:
+        return poly_list[0]
+    else:
+        return geometry.Polygon()
+
+
+def _polys_to_clean():
+    box1, box2 = geometry.box(0, 0, 1, 1), geometry.box(2, 0, 3, 1)
+    flat = geometry.Polygon([(0, 0), (1, 0), (2, 0)])
+    line = geometry.LineString([(0, 0), (1, 1)])
+    return [
+        box1,
+        flat,
+        geometry.Polygon(),
+        geometry.MultiPolygon([box1, box2]),
+        geometry.MultiPolygon([box1, flat]),
+        geometry.MultiPolygon([box1, flat, box2]),
+        geometry.MultiPolygon([flat]),
+        geometry.MultiPolygon(),
+        geometry.GeometryCollection([box1, line, geometry.Point(5, 5)]),
+        geometry.GeometryCollection([box1, line, box2]),
+        geometry.GeometryCollection([line]),
+        geometry.GeometryCollection(),
+        ]
+
+
+def test_clean_poly_matches_old():
+    for poly in _polys_to_clean():
+        expected = _old_clean_poly(poly)
+        for out in (_utils.clean_poly(poly), _utils.clean_polys([poly])[0]):
+            assert out.geom_type == expected.geom_type
+            assert out.equals(expected) or (out.is_empty and
+                                            expected.is_empty)
+
+
+def test_clean_polys_unchanged_and_none():
+    polys = _polys_to_clean()
+    out = _utils.clean_polys(polys + [None])
+    assert out[-1] is None
+    # Geometries with nothing to remove are returned as-is
+    assert out[0] is polys[0]
+    assert out[3] is polys[3]
+    assert out[4] is not polys[4]
+    assert _utils.clean_polys([]) == []
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_clip_polys_matches_intersection(workers):
+    rng = np.random.RandomState(11)
+    polys = _random_polys(rng, 60)
+    footprints = [geometry.box(10, 10, 60, 50),
+                  geometry.Polygon([(0, 0), (100, 0), (50, 80)]),
+                  geometry.box(200, 200, 210, 210),
+                  geometry.box(-10, -10, 110, 110)]
+    out = _utils.clip_polys(polys, footprints, workers=workers, chunksize=3)
+    assert len(out) == len(footprints)
+    for footprint, pairs in zip(footprints, out):
+        expected = {}
+        for i, poly in enumerate(polys):
+            if poly is None:
+                continue
+            clipped = poly.intersection(footprint)
+            if clipped.area > 0:
+                expected[i] = clipped
+        assert [i for i, poly in pairs] == sorted(expected)
+        for i, poly in pairs:
+            if footprint.contains(polys[i]):
+                assert poly is polys[i]
+            assert poly.geom_type in ('Polygon', 'MultiPolygon')
+            _assert_same_area(poly, expected[i])
+    assert out[2] == []
+    assert [i for i, poly in out[3]] == [
+        i for i, poly in enumerate(polys) if poly is not None]
+
+
+def test_clip_polys_touching():
+    box = geometry.box(0, 0, 1, 1)
+    out = _utils.clip_polys([box, geometry.box(1, 0, 2, 1)],
+                            [geometry.box(1, 0, 3, 1)])
+    assert [i for i, poly in out[0]] == [1]
+
+
+def _grid(order):
+    n = 1 << order
+    iy, ix = np.mgrid[:n, :n]
+    return ix.ravel().astype(float), iy.ravel().astype(float)
+
+
+@pytest.mark.parametrize('order', [1, 3, 5])
+def test_curve_keys_hilbert(order):
+    x, y = _grid(order)
+    keys = _utils.curve_keys(x, y, order=order)
+    # Every cell has a distinct position and consecutive cells along the
+    # curve are neighbors
+    assert sorted(keys) == list(range(len(x)))
+    idx = np.argsort(keys)
+    steps = np.abs(np.diff(x[idx])) + np.abs(np.diff(y[idx]))
+    assert (steps == 1).all()
+    assert keys[0] == 0
+
+
+@pytest.mark.parametrize('order', [1, 3, 5])
+def test_curve_keys_morton(order):
+    x, y = _grid(order)
+    keys = _utils.curve_keys(x, y, curve='morton', order=order)
+    # Interleaved bits, x in the lower bit of each pair
+    expected = [sum(((int(xi) >> b & 1) << (2 * b)) |
+                    ((int(yi) >> b & 1) << (2 * b + 1))
+                    for b in range(order)) for xi, yi in zip(x, y)]
+    assert list(keys) == expected
+
+
+def test_curve_keys_bounds_and_nan():
+    x = np.array([0., 10., np.nan, 5., 10.])
+    y = np.array([0., 10., 1., np.nan, 0.])
+    keys = _utils.curve_keys(x, y, order=1)
+    assert keys[2] == keys[3] == -1
+    assert keys.dtype == np.int64
+    assert len(set(keys[[0, 1, 4]])) == 3
+    # With wider bounds, all points fall in the lower left cell
+    keys = _utils.curve_keys(x, y, order=1, bounds=(0, 0, 40, 40))
+    assert list(keys) == [0, 0, -1, -1, 0]
+    assert list(_utils.curve_keys([np.nan], [np.nan])) == [-1]
+    assert list(_utils.curve_keys([3.], [4.])) == [0]
+    with pytest.raises(ValueError):
+        _utils.curve_keys(x, y, curve='peano')